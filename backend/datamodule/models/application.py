@@ -62,8 +62,18 @@ class Application(Model):
     def delete(self) -> int:
         try:
             with session_scope() as session:
-                from backend.datamodule.orm import AppDoc as AppDocORM
+                from backend.datamodule.orm import (
+                    AppDoc as AppDocORM,
+                    ApplicationReadiness as ApplicationReadinessORM,
+                    DocumentEvent as DocumentEventORM,
+                    RequirementReadiness as RequirementReadinessORM,
+                    ReviewQueueItem as ReviewQueueItemORM,
+                )
                 session.query(AppDocORM).filter_by(application_id=self.id).delete()
+                session.query(DocumentEventORM).filter_by(application_id=self.id).delete()
+                session.query(ReviewQueueItemORM).filter_by(application_id=self.id).delete()
+                session.query(RequirementReadinessORM).filter_by(application_id=self.id).delete()
+                session.query(ApplicationReadinessORM).filter_by(application_id=self.id).delete()
                 deleted = session.query(ApplicationORM).filter_by(id=self.id).delete()
                 return deleted
         except Exception as error:
@@ -11,6 +11,7 @@ import json
 from backend.datamodule.models.basemodel import *
 from backend.datamodule.orm import DocumentData as DocumentDataORM
 from backend.datamodule.sa import session_scope
+from backend.services.validation_issues import issue_rows
 
 
 class DocumentData(Model):
@@ -71,6 +72,9 @@ class DocumentData(Model):
                     ocr_full_text=self.ocr_full_text,
                     ocr_extracted_data=self.ocr_extracted_data,
                     ocr_source=self.ocr_source,
+                    check_ready=self.check_ready,
+                    validation_errors=self.validation_errors,
+                    issues=issue_rows(self.validation_errors),
                     layoutlm_full_text=self.layoutlm_full_text,
                     layout_lm_data=self.layout_lm_data,
                     review_status=self.review_status,
@@ -97,6 +101,7 @@ class DocumentData(Model):
                 orm_dd.ocr_source = values[4]
                 orm_dd.check_ready = values[5]
                 orm_dd.validation_errors = values[6]
+                orm_dd.issues = issue_rows(values[6])
                 orm_dd.layoutlm_full_text = values[7]
                 orm_dd.layout_lm_data = values[8]
                 orm_dd.review_status = values[9]
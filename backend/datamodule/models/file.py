@@ -13,11 +13,12 @@ from backend.datamodule.sa import session_scope
 
 
 class File(Model):
-    def __init__(self, filename: str = None, filepath: str = None, filetype_id: str = None, id: str = None):
+    def __init__(self, filename: str = None, filepath: str = None, filetype_id: str = None, id: str = None, sha256: str = None):
         self.id = id or str(uuid4())
         self.filename = filename
         self.filepath = filepath
         self.filetype_id = filetype_id
+        self.sha256 = sha256
 
     def insert(self) -> tuple:
         try:
@@ -27,6 +28,7 @@ class File(Model):
                     filename=self.filename,
                     filepath=self.filepath,
                     filetype_id=self.filetype_id,
+                    sha256=self.sha256,
                 )
                 session.add(orm_file)
                 session.flush()
@@ -95,8 +97,9 @@ class File(Model):
             filename=t[1],
             filepath=t[2],
             filetype_id=t[3],
+            sha256=t[5] if len(t) > 5 else None,
         )
 
     @staticmethod
     def _as_tuple(orm_file: FileORM) -> tuple:
-        return (orm_file.id, orm_file.filename, orm_file.filepath, orm_file.filetype_id, orm_file.uploaded_at)
+        return (orm_file.id, orm_file.filename, orm_file.filepath, orm_file.filetype_id, orm_file.uploaded_at, orm_file.sha256)
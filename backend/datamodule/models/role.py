@@ -58,9 +58,13 @@ class Role(Model):
                 orm_role.role_name = self.role_name
                 orm_role.description = self.description
                 session.flush()
-                return Role._as_tuple(orm_role)
+                role_tuple = Role._as_tuple(orm_role)
         except Exception as error:
             raise UpdateError(error)
+        # Cached principals carry the role name; dropped after the commit.
+        from backend.datamodule.models.user import User
+        User.invalidate_principal()
+        return role_tuple
 
     @staticmethod
     def from_json(data: dict):
@@ -16,9 +16,11 @@ from dotenv import load_dotenv
 
 from backend.datamodule.models.basemodel import *
 from backend.utils.creds import Creds
+from backend.services import password_hashing
 from backend.datamodule.orm import Role as RoleORM, User as UserORM
 from backend.datamodule.sa import session_scope
 from backend.datamodule.models.role import Role
+from backend.utils.ttl_cache import TTLCache
 
 #=== Load environment variables
 load_dotenv()
@@ -39,6 +41,13 @@ logger.addHandler(handler)
 
 creds = Creds()
 
+# Principals loaded by Flask-Login on every request, keyed by user_id.
+# Holds (user tuple, role_name); invalidated on user and role updates.
+principal_cache = TTLCache(
+    maxsize=int(os.getenv('USER_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '30')),
+)
+
 
 class User(Model, UserMixin):
     def __init__(
@@ -98,8 +107,8 @@ class User(Model, UserMixin):
                     logger.error('Default role candidate not found')
                     raise InsertError('Default role candidate not found')
 
-        hashed_pwd_salted = User.generate_hashed_password(self.password, self.salt)
-        hashed_pwd_peppered = User.generate_hashed_password(hashed_pwd_salted, self.pepper)
+        # may raise password_hashing.HashingOverloaded; callers answer with 429
+        hashed_password = password_hashing.hash_password(self.password)
 
         try:
             with session_scope() as session:
@@ -107,7 +116,7 @@ class User(Model, UserMixin):
                     user_id=self.id,
                     role_id=self.role_id,
                     username=self.username,
-                    password=hashed_pwd_peppered,
+                    password=hashed_password,
                     email=self.email,
                     b_admin=self.b_admin,
                     salt=self.salt,
@@ -168,11 +177,14 @@ class User(Model, UserMixin):
                 self.password = orm_user.password
                 self.email = orm_user.email
                 role = session.query(RoleORM).filter_by(role_id=self.role_id).first()
-                self.is_admin = (role.role_name == 'admin') if role else False
-                return User._as_tuple(orm_user)
+                self.role_name = role.role_name if role else None
+                user_tuple = User._as_tuple(orm_user)
         except Exception as error:
             logger.error(error)
             raise UpdateError(error)
+        # After the commit, so no reader can cache the old row again.
+        User.invalidate_principal(self.id)
+        return user_tuple
 
     def delete(self) -> int:
         """
@@ -182,10 +194,11 @@ class User(Model, UserMixin):
         try:
             with session_scope() as session:
                 deleted = session.query(UserORM).filter_by(user_id=self.id).delete()
-                return deleted
         except Exception as error:
             logger.error(error)
             raise DeleteError(error)
+        User.invalidate_principal(self.id)
+        return deleted
 
     def valid_password(self, password) -> bool:
         return creds.check_valid_password(password)['b_valid']
@@ -194,13 +207,32 @@ class User(Model, UserMixin):
         return creds.check_valid_email(email)['b_valid']
     
     def check_password(self, password):  
-        result = creds.check_hashed_password(
-            login_password=password,
-            db_password=self.password,
-            db_salt=self.salt,
-            db_pepper=self.pepper)
+        """
+        Verifies the password; legacy or outdated hashes are upgraded on success.
+        May raise password_hashing.HashingOverloaded.
+        """
+        result = password_hashing.verify_password(password, self.password, self.salt, self.pepper)
+        if result and password_hashing.needs_rehash(self.password):
+            self._upgrade_password_hash(password)
         return result
 
+    def _upgrade_password_hash(self, password):
+        try:
+            new_hash = password_hashing.hash_password(password)
+            with session_scope() as session:
+                # only replace the hash we verified against
+                session.query(UserORM).filter_by(user_id=self.id, password=self.password).update(
+                    {"password": new_hash}, synchronize_session=False
+                )
+            self.password = new_hash
+            User.invalidate_principal(self.id)
+            logger.info(f"Upgraded password hash for user {self.id}")
+        except password_hashing.HashingOverloaded:
+            # try again on the next login
+            pass
+        except Exception as error:
+            logger.error(f"Password hash upgrade failed: {error}")
+
     ### flask-login methods ###
     def get_id(self):
         return str(self.id)
@@ -215,23 +247,15 @@ class User(Model, UserMixin):
         return self.id is None
 
     #=== Role check methods
+    # role_name is resolved when the user is loaded (see get_principal).
     def is_admin(self) -> bool:
-        if self.is_admin:
-            role = Role.get_by_role_id(self.role_id)
-            return bool(role and role.role_name == 'admin')
-        return False
+        return self.role_name == 'admin'
 
     def is_candidate(self) -> bool:
-        if self.role_id:
-            role = Role.get_by_role_id(self.role_id)
-            return bool(role and role.role_name == 'candidate')
-        return False
+        return self.role_name == 'candidate'
         
     def is_recruiter(self) -> bool:
-        if self.role_id:
-            role = Role.get_by_role_id(self.role_id)
-            return bool(role and role.role_name == 'recruiter')
-        return False
+        return self.role_name == 'recruiter'
 
     ### STATIC METHODS ###
     @staticmethod
@@ -261,6 +285,7 @@ class User(Model, UserMixin):
             try:
                 with session_scope() as session:
                     session.query(UserORM).filter_by(username=username).delete()
+                User.invalidate_principal(user[0])
             except Exception as error:
                 logger.error(error)
                 raise DeleteError(error)
@@ -274,6 +299,43 @@ class User(Model, UserMixin):
             orm_user = session.query(UserORM).filter_by(user_id=id).first()
             return User._as_tuple(orm_user) if orm_user else None
 
+    @staticmethod
+    def get_principal(user_id):
+        """
+        Load the user with its role name in one query, cached per user_id.
+        Used by the Flask-Login user loader on every request.
+        return: User or None
+        """
+        key = str(user_id)
+        cached = principal_cache.get(key)
+        if cached is None:
+            # Taken before the read: an invalidation during it makes the set a no-op.
+            version = principal_cache.version(key)
+            with session_scope() as session:
+                row = (
+                    session.query(UserORM, RoleORM.role_name)
+                    .outerjoin(RoleORM, UserORM.role_id == RoleORM.role_id)
+                    .filter(UserORM.user_id == user_id)
+                    .first()
+                )
+                if not row:
+                    return None
+                cached = (User._as_tuple(row[0]), row[1])
+            principal_cache.set(key, cached, version=version)
+        user_tuple, role_name = cached
+        # role_name given, so __init__ does not look the role up again
+        return User.from_tuple(user_tuple, role_name=role_name)
+
+    @staticmethod
+    def invalidate_principal(user_id=None):
+        """
+        Drop a cached principal, or all of them when user_id is None.
+        """
+        if user_id is None:
+            principal_cache.clear()
+        else:
+            principal_cache.pop(str(user_id))
+
     @staticmethod
     def get_by_username(username):
         with session_scope() as session:
@@ -286,13 +348,18 @@ class User(Model, UserMixin):
             users = session.query(UserORM).all()
             return [User._as_tuple(u) for u in users]
 
+    @staticmethod
+    def hash_password(password):
+        return password_hashing.hash_password(password)
+
     @staticmethod
     def generate_hashed_password(password, salt):
         return creds.generate_hashed_password(password, salt)
     
     @staticmethod
-    def from_tuple(user_tuple):
+    def from_tuple(user_tuple, role_name: str = None):
         return User(
+            role_name = role_name,
             id = user_tuple[0],
             role_id = user_tuple[1],
             username = user_tuple[2],
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
-from datetime import datetime
-from sqlalchemy import Boolean, DateTime, ForeignKey, String, Text, func
+from datetime import date, datetime
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, ForeignKey, Index, Integer, SmallInteger, String, Text, func
 from sqlalchemy import JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from backend.datamodule.sa import Base
+from backend.datamodule.sa import Base, HOT_INDEXES
+
+
+def _hot_indexes(table_name: str) -> tuple:
+    return tuple(Index(name, *columns) for name, table, columns in HOT_INDEXES if table == table_name)
 
 
 class Role(Base):
@@ -18,6 +22,7 @@ class Role(Base):
 
 class User(Base):
     __tablename__ = "_users"
+    __table_args__ = _hot_indexes("_users")
 
     user_id: Mapped[str] = mapped_column(String(255), primary_key=True)
     role_id: Mapped[str] = mapped_column(String(255), ForeignKey("_roles.role_id"), nullable=False)
@@ -60,12 +65,15 @@ class FileType(Base):
 
 class File(Base):
     __tablename__ = "_files"
+    __table_args__ = _hot_indexes("_files")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     filename: Mapped[str] = mapped_column(String(255), nullable=False)
     filepath: Mapped[str] = mapped_column(Text, nullable=False)
     filetype_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("_file_types.id"))
     uploaded_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now())
+    # hex SHA-256 of the content, computed while the upload is spooled
+    sha256: Mapped[str | None] = mapped_column(String(64))
 
     filetype = relationship("FileType")
 
@@ -80,6 +88,7 @@ class DocumentType(Base):
 
 class DocumentData(Base):
     __tablename__ = "_document_datas"
+    __table_args__ = _hot_indexes("_document_datas")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     ocr_doc_type_prediction_str: Mapped[str | None] = mapped_column(Text)
@@ -96,6 +105,22 @@ class DocumentData(Base):
     reviewed_by: Mapped[str | None] = mapped_column(String(36))
     reviewed_at: Mapped[datetime | None] = mapped_column(DateTime)
 
+    # validation_errors as rows; see backend.services.validation_issues
+    issues = relationship("ValidationIssue", cascade="all, delete-orphan")
+
+
+class ValidationIssue(Base):
+    __tablename__ = "_validation_issues"
+    __table_args__ = _hot_indexes("_validation_issues")
+
+    document_data_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("_document_datas.id", ondelete="CASCADE"), primary_key=True
+    )
+    field: Mapped[str] = mapped_column(String(100), primary_key=True)
+    # missing, invalid, expired, name_mismatch or other
+    code: Mapped[str] = mapped_column(String(50), primary_key=True)
+    message: Mapped[str | None] = mapped_column(Text)
+
 
 class Status(Base):
     __tablename__ = "_statuses"
@@ -107,6 +132,7 @@ class Status(Base):
 
 class Document(Base):
     __tablename__ = "_documents"
+    __table_args__ = _hot_indexes("_documents")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     file_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("_files.id"))
@@ -154,6 +180,7 @@ class Profession(Base):
 
 class Requirement(Base):
     __tablename__ = "_requirements"
+    __table_args__ = _hot_indexes("_requirements")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     profession_id: Mapped[str | None] = mapped_column(String(36), ForeignKey("_professions.id"))
@@ -173,6 +200,7 @@ class Requirement(Base):
 
 class Application(Base):
     __tablename__ = "_applications"
+    __table_args__ = _hot_indexes("_applications")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     user_id: Mapped[str] = mapped_column(String(36), ForeignKey("_users.user_id"), nullable=False)
@@ -189,6 +217,7 @@ class Application(Base):
 
 class AppDoc(Base):
     __tablename__ = "_app_docs"
+    __table_args__ = _hot_indexes("_app_docs")
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     application_id: Mapped[str] = mapped_column(String(36), ForeignKey("_applications.id"), nullable=False)
@@ -198,3 +227,97 @@ class AppDoc(Base):
     application = relationship("Application")
     document = relationship("Document")
     requirement = relationship("Requirement")
+
+
+# Materialised readiness, maintained by backend.services.readiness.
+class RequirementReadiness(Base):
+    __tablename__ = "_requirement_readiness"
+
+    application_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("_applications.id", ondelete="CASCADE"), primary_key=True
+    )
+    requirement_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    documents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    satisfied_documents: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    satisfied: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now())
+
+
+class ApplicationReadiness(Base):
+    __tablename__ = "_application_readiness"
+    __table_args__ = _hot_indexes("_application_readiness")
+
+    application_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("_applications.id", ondelete="CASCADE"), primary_key=True
+    )
+    ready: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    satisfied: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    required: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    missing: Mapped[list | None] = mapped_column(JSON)
+    advice: Mapped[list | None] = mapped_column(JSON)
+    # when the application last became ready (cleared while not ready)
+    ready_at: Mapped[datetime | None] = mapped_column(DateTime)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now())
+
+
+# Upload pipeline progress, written by backend.services.progress.
+class DocumentEvent(Base):
+    __tablename__ = "_document_events"
+    __table_args__ = _hot_indexes("_document_events")
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    application_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("_applications.id", ondelete="CASCADE"), nullable=False
+    )
+    upload_id: Mapped[str | None] = mapped_column(String(36))
+    filename: Mapped[str | None] = mapped_column(String(255))
+    document_id: Mapped[str | None] = mapped_column(String(36))
+    stage: Mapped[str] = mapped_column(String(30), nullable=False)
+    detail: Mapped[dict | None] = mapped_column(JSON)
+    created_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now())
+
+
+# Documents waiting for review, maintained by backend.services.review_queue.
+class ReviewQueueItem(Base):
+    __tablename__ = "_review_queue"
+    __table_args__ = _hot_indexes("_review_queue")
+
+    document_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    application_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("_applications.id", ondelete="CASCADE"), nullable=False
+    )
+    candidate_id: Mapped[str | None] = mapped_column(String(36))
+    requirement_id: Mapped[str | None] = mapped_column(String(36))
+    # 0: overdue or application otherwise ready, 1: close to ready, 2: other
+    priority: Mapped[int] = mapped_column(SmallInteger, nullable=False, default=2)
+    queued_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    claimed_by: Mapped[str | None] = mapped_column(String(36))
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime)
+
+
+# Insights rollups, refreshed by backend.services.metrics.
+class MetricsDaily(Base):
+    __tablename__ = "_metrics_daily"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    state_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    profession_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    applications_created: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # applications that became ready that day, and the sum of their time since creation
+    applications_ready: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    ready_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    documents_uploaded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    documents_check_ready: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # reviews decided that day, and the sum of their time since upload
+    documents_reviewed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    documents_approved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    documents_declined: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    decision_seconds: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+class MetricsWatermark(Base):
+    __tablename__ = "_metrics_watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime | None] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -133,6 +133,32 @@ def _ensure_document_ocr_source_column() -> None:
 
 _ensure_document_ocr_source_column()
 
+
+def _ensure_file_sha256_column() -> None:
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                cols = [row[1] for row in conn.execute(text("PRAGMA table_info(_files)")).fetchall()]
+                if "sha256" not in cols:
+                    conn.execute(text("ALTER TABLE _files ADD COLUMN sha256 VARCHAR(64)"))
+            else:
+                cols = {
+                    row[0]
+                    for row in conn.execute(
+                        text(
+                            "SELECT column_name FROM information_schema.columns "
+                            "WHERE table_name = '_files'"
+                        )
+                    ).fetchall()
+                }
+                if "sha256" not in cols:
+                    conn.execute(text("ALTER TABLE _files ADD COLUMN sha256 VARCHAR(64)"))
+    except Exception:
+        pass
+
+
+_ensure_file_sha256_column()
+
 def _ensure_document_check_ready_columns() -> None:
     try:
         with engine.begin() as conn:
@@ -218,6 +244,307 @@ def _ensure_user_profile_table() -> None:
 _ensure_user_profile_table()
 
 
+def _ensure_readiness_tables() -> None:
+    # Materialised readiness, maintained by backend.services.readiness.
+    cascade = ""
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name != "sqlite":
+                cascade = " REFERENCES _applications(id) ON DELETE CASCADE"
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _requirement_readiness ("
+                    f"application_id VARCHAR(36) NOT NULL{cascade}, "
+                    "requirement_id VARCHAR(36) NOT NULL, "
+                    "documents INTEGER NOT NULL DEFAULT 0, "
+                    "satisfied_documents INTEGER NOT NULL DEFAULT 0, "
+                    "satisfied BOOLEAN NOT NULL DEFAULT FALSE, "
+                    "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, "
+                    "PRIMARY KEY (application_id, requirement_id)"
+                    ")"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _application_readiness ("
+                    f"application_id VARCHAR(36) PRIMARY KEY{cascade}, "
+                    "ready BOOLEAN NOT NULL DEFAULT FALSE, "
+                    "satisfied INTEGER NOT NULL DEFAULT 0, "
+                    "required INTEGER NOT NULL DEFAULT 0, "
+                    "missing JSON, "
+                    "advice JSON, "
+                    "ready_at TIMESTAMP, "
+                    "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+                    ")"
+                )
+            )
+    except Exception:
+        pass
+
+
+_ensure_readiness_tables()
+
+
+def _ensure_application_readiness_ready_at_column() -> None:
+    # When the application last became ready; feeds the time-to-ready metrics.
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                cols = [row[1] for row in conn.execute(text("PRAGMA table_info(_application_readiness)")).fetchall()]
+            else:
+                cols = [
+                    row[0]
+                    for row in conn.execute(
+                        text(
+                            "SELECT column_name FROM information_schema.columns "
+                            "WHERE table_name = '_application_readiness'"
+                        )
+                    ).fetchall()
+                ]
+            if cols and "ready_at" not in cols:
+                conn.execute(text("ALTER TABLE _application_readiness ADD COLUMN ready_at TIMESTAMP"))
+    except Exception:
+        pass
+
+
+_ensure_application_readiness_ready_at_column()
+
+
+def _ensure_document_events_table() -> None:
+    # Upload pipeline progress events, written by backend.services.progress.
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                id_column = "id INTEGER PRIMARY KEY AUTOINCREMENT"
+                cascade = ""
+            else:
+                id_column = "id BIGSERIAL PRIMARY KEY"
+                cascade = " REFERENCES _applications(id) ON DELETE CASCADE"
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _document_events ("
+                    f"{id_column}, "
+                    f"application_id VARCHAR(36) NOT NULL{cascade}, "
+                    "upload_id VARCHAR(36), "
+                    "filename VARCHAR(255), "
+                    "document_id VARCHAR(36), "
+                    "stage VARCHAR(30) NOT NULL, "
+                    "detail JSON, "
+                    "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+                    ")"
+                )
+            )
+    except Exception:
+        pass
+
+
+_ensure_document_events_table()
+
+
+def _ensure_review_queue_table() -> None:
+    # Pending reviews with their priority and claim, maintained by backend.services.review_queue.
+    cascade = ""
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name != "sqlite":
+                cascade = " REFERENCES _applications(id) ON DELETE CASCADE"
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _review_queue ("
+                    "document_id VARCHAR(36) PRIMARY KEY, "
+                    f"application_id VARCHAR(36) NOT NULL{cascade}, "
+                    "candidate_id VARCHAR(36), "
+                    "requirement_id VARCHAR(36), "
+                    "priority SMALLINT NOT NULL DEFAULT 2, "
+                    "queued_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+                    "claimed_by VARCHAR(36), "
+                    "claimed_at TIMESTAMP"
+                    ")"
+                )
+            )
+    except Exception:
+        pass
+
+
+_ensure_review_queue_table()
+
+
+def _ensure_metrics_tables() -> None:
+    # Daily rollups for the insights dashboard, refreshed by scripts/refresh_metrics.py.
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _metrics_daily ("
+                    "day DATE NOT NULL, "
+                    "state_id VARCHAR(36) NOT NULL, "
+                    "profession_id VARCHAR(36) NOT NULL, "
+                    "applications_created INTEGER NOT NULL DEFAULT 0, "
+                    "applications_ready INTEGER NOT NULL DEFAULT 0, "
+                    "ready_seconds BIGINT NOT NULL DEFAULT 0, "
+                    "documents_uploaded INTEGER NOT NULL DEFAULT 0, "
+                    "documents_check_ready INTEGER NOT NULL DEFAULT 0, "
+                    "documents_reviewed INTEGER NOT NULL DEFAULT 0, "
+                    "documents_approved INTEGER NOT NULL DEFAULT 0, "
+                    "documents_declined INTEGER NOT NULL DEFAULT 0, "
+                    "decision_seconds BIGINT NOT NULL DEFAULT 0, "
+                    "PRIMARY KEY (day, state_id, profession_id)"
+                    ")"
+                )
+            )
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _metrics_watermarks ("
+                    "name VARCHAR(50) PRIMARY KEY, "
+                    "value TIMESTAMP NOT NULL, "
+                    "updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+                    ")"
+                )
+            )
+    except Exception:
+        pass
+
+
+_ensure_metrics_tables()
+
+
+def _ensure_validation_issues_table() -> None:
+    # validation_errors of _document_datas as rows, maintained through DocumentData.issues.
+    cascade = ""
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name != "sqlite":
+                cascade = " REFERENCES _document_datas(id) ON DELETE CASCADE"
+            conn.execute(
+                text(
+                    "CREATE TABLE IF NOT EXISTS _validation_issues ("
+                    f"document_data_id VARCHAR(36) NOT NULL{cascade}, "
+                    "field VARCHAR(100) NOT NULL, "
+                    "code VARCHAR(50) NOT NULL, "
+                    "message TEXT, "
+                    "PRIMARY KEY (document_data_id, field, code)"
+                    ")"
+                )
+            )
+    except Exception:
+        pass
+
+
+_ensure_validation_issues_table()
+
+
+# Indexes for the hot lookup paths (name, table, columns). Declared once here:
+# orm.py builds __table_args__ from this list for fresh schemas, and
+# _ensure_hot_indexes() adds missing ones to existing databases.
+HOT_INDEXES: tuple[tuple[str, str, tuple[str, ...]], ...] = (
+    # candidate list: ORDER BY username LIMIT n
+    ("ix_users_username", "_users", ("username",)),
+    ("ix_users_role_id", "_users", ("role_id",)),
+    # documents of an application; upload looks up (application_id, requirements_id)
+    ("ix_app_docs_application_id_requirements_id", "_app_docs", ("application_id", "requirements_id")),
+    # delete_document unlinks app_docs by document_id
+    ("ix_app_docs_document_id", "_app_docs", ("document_id",)),
+    ("ix_documents_user_id", "_documents", ("user_id",)),
+    # delete_document checks whether the file / document data is still referenced
+    ("ix_documents_file_id", "_documents", ("file_id",)),
+    ("ix_documents_document_data_id", "_documents", ("document_data_id",)),
+    # upload deduplication by content hash
+    ("ix_files_sha256", "_files", ("sha256",)),
+    # applications of a user, newest first
+    ("ix_applications_user_id_time_created", "_applications", ("user_id", "time_created")),
+    # applicationsmanagement_save: requirements for country/state/profession
+    ("ix_requirements_country_state_profession", "_requirements", ("country_id", "state_id", "profession_id")),
+    # "ready applications" lists and recruiter filters
+    ("ix_application_readiness_ready_updated_at", "_application_readiness", ("ready", "updated_at")),
+    # metrics refresh: events since the watermark, by timestamp
+    ("ix_applications_time_created", "_applications", ("time_created",)),
+    ("ix_application_readiness_ready_at", "_application_readiness", ("ready_at",)),
+    ("ix_files_uploaded_at", "_files", ("uploaded_at",)),
+    ("ix_document_datas_reviewed_at", "_document_datas", ("reviewed_at",)),
+    # review queue: keyset pagination / claim next in priority order; "my claims"
+    ("ix_review_queue_priority_queued_at", "_review_queue", ("priority", "queued_at", "document_id")),
+    ("ix_review_queue_claimed_by", "_review_queue", ("claimed_by",)),
+    # recurring issues: documents per (code, field) without touching the table rows
+    ("ix_validation_issues_code_field", "_validation_issues", ("code", "field", "document_data_id")),
+    # progress streams read the events of an application after a given id
+    ("ix_document_events_application_id_id", "_document_events", ("application_id", "id")),
+)
+
+
+def _ensure_hot_indexes() -> None:
+    for name, table, columns in HOT_INDEXES:
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+        except Exception:
+            # Table not created yet or missing permissions; create_all picks it up from orm.py.
+            pass
+
+
+_ensure_hot_indexes()
+
+
+def _ensure_candidate_search_indexes() -> None:
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                # FTS5 fallback: external-content table over _users, kept in sync by triggers.
+                # The trigram tokenizer gives substring matching comparable to ILIKE '%q%'.
+                conn.execute(
+                    text(
+                        "CREATE VIRTUAL TABLE IF NOT EXISTS _users_fts USING fts5("
+                        "username, email, content='_users', content_rowid='rowid', tokenize='trigram')"
+                    )
+                )
+                triggers = {
+                    row[0]
+                    for row in conn.execute(
+                        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = '_users'")
+                    ).fetchall()
+                }
+                if not {"_users_fts_ai", "_users_fts_ad", "_users_fts_au"} <= triggers:
+                    conn.execute(
+                        text(
+                            "CREATE TRIGGER IF NOT EXISTS _users_fts_ai AFTER INSERT ON _users BEGIN "
+                            "INSERT INTO _users_fts(rowid, username, email) VALUES (new.rowid, new.username, new.email); "
+                            "END"
+                        )
+                    )
+                    conn.execute(
+                        text(
+                            "CREATE TRIGGER IF NOT EXISTS _users_fts_ad AFTER DELETE ON _users BEGIN "
+                            "INSERT INTO _users_fts(_users_fts, rowid, username, email) "
+                            "VALUES ('delete', old.rowid, old.username, old.email); "
+                            "END"
+                        )
+                    )
+                    conn.execute(
+                        text(
+                            "CREATE TRIGGER IF NOT EXISTS _users_fts_au AFTER UPDATE ON _users BEGIN "
+                            "INSERT INTO _users_fts(_users_fts, rowid, username, email) "
+                            "VALUES ('delete', old.rowid, old.username, old.email); "
+                            "INSERT INTO _users_fts(rowid, username, email) VALUES (new.rowid, new.username, new.email); "
+                            "END"
+                        )
+                    )
+                    # Triggers were missing (new index or _users was recreated): resync once.
+                    conn.execute(text("INSERT INTO _users_fts(_users_fts) VALUES ('rebuild')"))
+            else:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(
+                    text("CREATE INDEX IF NOT EXISTS ix_users_username_trgm ON _users USING gin (username gin_trgm_ops)")
+                )
+                conn.execute(
+                    text("CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON _users USING gin (email gin_trgm_ops)")
+                )
+    except Exception:
+        # Search falls back to unindexed ILIKE/LIKE when this is not possible.
+        pass
+
+
+_ensure_candidate_search_indexes()
+
+
 @contextmanager
 def session_scope() -> Iterator:
     session = SessionLocal()
@@ -0,0 +1,326 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.document_evaluation
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Normalizes extracted document fields and decides whether a document is
+# check ready. Runs at write time (upload, details save, review save,
+# profile save, backfill); read paths only show the stored result.
+
+#=== Imports
+
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from backend.datamodule.orm import (
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    UserProfile as UserProfileORM,
+)
+from backend.services.validation_issues import issue_rows
+from sqlalchemy.orm.attributes import flag_modified
+
+
+#=== Compiled Patterns
+
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+DOTTED_DATE_RE = re.compile(r"(\d{2})\.(\d{2})\.(\d{4})")
+SLASHED_DATE_RE = re.compile(r"(\d{2,4})/(\d{2})/(\d{2,4})")
+COUNTRY_CODE_RE = re.compile(r"[A-Z]{3}")
+PASSPORT_NUMBER_RE = re.compile(r"[A-Z0-9]{6,9}")
+SEX_VALUES = frozenset({"M", "F", "X"})
+
+PASSPORT_MANDATORY = (
+    "surname",
+    "given_names",
+    "nationality",
+    "passport_number",
+    "birth_date",
+    "sex",
+    "expiry_date",
+    "issuing_country",
+)
+DIPLOMA_MANDATORY = (
+    "holder_first_name",
+    "holder_last_name",
+    "institution_name",
+    "program_or_field",
+    "graduation_date",
+    "location",
+)
+
+
+#=== Field Rules
+
+@dataclass(frozen=True)
+class DocTypeRules:
+    mandatory: tuple[str, ...]
+    # Derive holder/institution/... from the OCR guesses and check the
+    # holder name against the candidate profile.
+    diploma: bool
+
+
+def _compile_rules(doc_type_name: str | None) -> DocTypeRules:
+    name = (doc_type_name or "").lower()
+    if "passport" in name or name == "id":
+        mandatory = PASSPORT_MANDATORY
+    elif "diploma" in name or "degree" in name or "certificate" in name:
+        mandatory = DIPLOMA_MANDATORY
+    else:
+        mandatory = ()
+    return DocTypeRules(mandatory=mandatory, diploma="diploma" in name or "degree" in name)
+
+
+def mandatory_fields_for_doc_type(doc_type_name: str | None) -> list[str]:
+    return list(_compile_rules(doc_type_name).mandatory)
+
+
+def needs_profile(doc_type_name: str | None) -> bool:
+    # Diplomas compare the holder's last name with the candidate profile.
+    return _compile_rules(doc_type_name).diploma
+
+
+def normalize_date_field(value: str) -> str | None:
+    cleaned = (value or "").strip()
+    if not cleaned:
+        return None
+    # Accept YYYY-MM-DD
+    if ISO_DATE_RE.fullmatch(cleaned):
+        return cleaned
+    # Accept DD.MM.YYYY
+    m = DOTTED_DATE_RE.fullmatch(cleaned)
+    if m:
+        return f"{m.group(3)}-{m.group(2)}-{m.group(1)}"
+    # Accept YYYY/MM/DD or DD/MM/YYYY
+    m = SLASHED_DATE_RE.fullmatch(cleaned)
+    if m:
+        a, b, c = m.group(1), m.group(2), m.group(3)
+        if len(a) == 4:
+            return f"{a}-{b}-{c.zfill(2)}"
+        if len(c) == 4:
+            return f"{c}-{b}-{a.zfill(2)}"
+    return None
+
+
+def split_full_name(value: str) -> tuple[str, str] | None:
+    cleaned = " ".join((value or "").replace(",", " ").split())
+    if not cleaned or " " not in cleaned:
+        return None
+    parts = cleaned.split()
+    if len(parts) < 2:
+        return None
+    return " ".join(parts[:-1]), parts[-1]
+
+
+def _parse_date(value: str, today: date) -> date | None:
+    if not value or not ISO_DATE_RE.fullmatch(value):
+        return None
+    try:
+        year, month, day = (int(part) for part in value.split("-"))
+        parsed = date(year, month, day)
+    except Exception:
+        return None
+    if year < today.year - 250 or year > today.year + 250:
+        return None
+    return parsed
+
+
+def is_valid_date(value: str) -> bool:
+    return _parse_date(value, datetime.utcnow().date()) is not None
+
+
+def is_future_date(value: str) -> bool:
+    today = datetime.utcnow().date()
+    parsed = _parse_date(value, today)
+    return parsed is not None and parsed > today
+
+
+#=== Evaluation
+
+class DocumentEvaluator:
+    """Evaluates extracted document fields against the per-doc-type rules.
+
+    Rules are compiled once per document type name. The evaluator takes the
+    owner's profile as an argument and never touches the request context or
+    the database, so web routes, CLIs and OCR workers share it.
+    """
+
+    def __init__(self) -> None:
+        self._rules: dict[str, DocTypeRules] = {}
+
+    def rules_for(self, doc_type_name: str | None) -> DocTypeRules:
+        key = doc_type_name or ""
+        rules = self._rules.get(key)
+        if rules is None:
+            rules = self._rules[key] = _compile_rules(doc_type_name)
+        return rules
+
+    def evaluate(
+        self,
+        doc_type_name: str | None,
+        fields: dict,
+        profile: dict | None = None,
+        today: date | None = None,
+    ) -> tuple[dict, bool, dict]:
+        """Return (normalized fields, check_ready, {"errors": [...]})."""
+        rules = self.rules_for(doc_type_name)
+        today = today or datetime.utcnow().date()
+        updated = dict(fields or {})
+        errors: list[str] = []
+
+        if rules.mandatory:
+            _normalize_identity_fields(updated)
+        if rules.diploma:
+            _derive_diploma_fields(updated)
+
+        if rules.mandatory:
+            for key in rules.mandatory:
+                if not updated.get(key):
+                    errors.append(f"{key} is missing")
+
+            if updated.get("nationality") and not COUNTRY_CODE_RE.fullmatch(updated["nationality"]):
+                errors.append("nationality is invalid")
+            if updated.get("issuing_country") and not COUNTRY_CODE_RE.fullmatch(updated["issuing_country"]):
+                errors.append("issuing_country is invalid")
+            if updated.get("passport_number") and not PASSPORT_NUMBER_RE.fullmatch(updated["passport_number"]):
+                errors.append("passport_number is invalid")
+            if updated.get("sex") and updated["sex"] not in SEX_VALUES:
+                errors.append("sex is invalid")
+            if updated.get("birth_date") and _parse_date(updated["birth_date"], today) is None:
+                errors.append("birth_date is invalid")
+            if updated.get("expiry_date"):
+                expiry = _parse_date(updated["expiry_date"], today)
+                if expiry is None:
+                    errors.append("expiry_date is invalid")
+                elif expiry <= today:
+                    errors.append("expiry_date must be in the future")
+
+        if rules.diploma:
+            profile_last = (profile.get("last_name") or "").strip() if profile else ""
+            holder_last = (updated.get("holder_last_name") or "").strip()
+            if profile_last and holder_last and holder_last.lower() != profile_last.lower():
+                if not updated.get("holder_birth_name"):
+                    errors.append("holder_birth_name is required when last name differs from profile")
+            if updated.get("graduation_date") and _parse_date(updated["graduation_date"], today) is None:
+                errors.append("graduation_date is invalid")
+
+        check_ready = (len(errors) == 0) if rules.mandatory else True
+        return updated, check_ready, {"errors": errors}
+
+    def evaluate_batch(self, items, profiles: dict[str, dict] | None = None) -> list[tuple[dict, bool, dict]]:
+        """Evaluate (doc_type_name, fields, user_id) items with a preloaded profile map.
+
+        Results come back in input order.
+        """
+        profiles = profiles or {}
+        today = datetime.utcnow().date()
+        return [
+            self.evaluate(doc_type_name, fields, profiles.get(user_id), today)
+            for doc_type_name, fields, user_id in items
+        ]
+
+
+def _normalize_identity_fields(updated: dict) -> None:
+    if not updated.get("birth_date") and updated.get("birth_date_raw"):
+        updated["birth_date"] = updated.get("birth_date_raw")
+    if not updated.get("expiry_date") and updated.get("expiry_date_raw"):
+        updated["expiry_date"] = updated.get("expiry_date_raw")
+
+    for key in ("birth_date", "expiry_date"):
+        if key in updated:
+            normalized = normalize_date_field(str(updated.get(key) or ""))
+            if normalized:
+                updated[key] = normalized
+
+    for key in ("nationality", "issuing_country", "passport_number", "sex"):
+        if key in updated and updated.get(key):
+            updated[key] = str(updated[key]).upper().strip()
+
+
+def _derive_diploma_fields(updated: dict) -> None:
+    if not updated.get("holder_first_name") or not updated.get("holder_last_name"):
+        full_value = updated.get("holder_name") or updated.get("full_name")
+        split = split_full_name(str(full_value or ""))
+        if split:
+            first_name, last_name = split
+            updated.setdefault("holder_first_name", first_name)
+            updated.setdefault("holder_last_name", last_name)
+    if not updated.get("institution_name"):
+        updated["institution_name"] = (
+            updated.get("institution_guess")
+            or updated.get("institution_label")
+            or updated.get("institution")
+            or ""
+        )
+    if not updated.get("program_or_field"):
+        updated["program_or_field"] = updated.get("program_guess") or updated.get("field_of_study") or ""
+    if not updated.get("location"):
+        updated["location"] = updated.get("location_guess") or ""
+    if not updated.get("graduation_date"):
+        dates = updated.get("dates_detected") or updated.get("dates") or updated.get("issue_date_guess")
+        if isinstance(dates, list):
+            updated["graduation_date"] = dates[0] if dates else ""
+        else:
+            updated["graduation_date"] = dates or ""
+    if updated.get("graduation_date"):
+        normalized = normalize_date_field(str(updated.get("graduation_date") or ""))
+        if normalized:
+            updated["graduation_date"] = normalized
+
+
+evaluator = DocumentEvaluator()
+
+
+def evaluate_document_fields(doc_type_name: str | None, fields: dict, profile: dict | None = None) -> tuple[dict, bool, dict]:
+    """Return (normalized fields, check_ready, {"errors": [...]}).
+
+    profile is the document owner's profile dict; only diplomas use it
+    (see needs_profile).
+    """
+    return evaluator.evaluate(doc_type_name, fields, profile)
+
+
+#=== Persistence Helpers
+
+def load_profiles(session, user_ids) -> dict[str, dict]:
+    """Load the evaluation-relevant profile data for many users in one query."""
+    ids = {uid for uid in user_ids if uid}
+    if not ids:
+        return {}
+    rows = (
+        session.query(UserProfileORM.user_id, UserProfileORM.first_name, UserProfileORM.last_name)
+        .filter(UserProfileORM.user_id.in_(ids))
+        .all()
+    )
+    return {row.user_id: {"first_name": row.first_name, "last_name": row.last_name} for row in rows}
+
+
+def store_evaluation(dd: DocumentDataORM, result: tuple[dict, bool, dict]) -> bool:
+    """Write an evaluator result (and its issue rows) onto dd. Returns check_ready."""
+    updated, check_ready, errors = result
+    dd.ocr_extracted_data = updated
+    dd.check_ready = check_ready
+    dd.validation_errors = errors
+    dd.issues = issue_rows(errors)
+    flag_modified(dd, "ocr_extracted_data")
+    return check_ready
+
+
+def apply_evaluation(dd: DocumentDataORM, doc_type_name: str | None, profile: dict | None = None) -> bool:
+    """Evaluate dd.ocr_extracted_data and store the result on dd. Returns check_ready."""
+    if dd.ocr_extracted_data is None:
+        return bool(dd.check_ready)
+    return store_evaluation(dd, evaluator.evaluate(doc_type_name, dd.ocr_extracted_data, profile))
+
+
+def reevaluate_document(session, doc: DocumentORM, dd: DocumentDataORM | None = None) -> bool:
+    """Re-evaluate one document inside an open session, using its owner's profile."""
+    dd = dd or (session.query(DocumentDataORM).filter_by(id=doc.document_data_id).first() if doc.document_data_id else None)
+    if dd is None:
+        return False
+    doc_type_name = doc.document_type.name if doc.document_type else None
+    profile = load_profiles(session, [doc.user_id]).get(doc.user_id) if needs_profile(doc_type_name) else None
+    return apply_evaluation(dd, doc_type_name, profile)
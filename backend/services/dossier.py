@@ -0,0 +1,852 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.dossier
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Upload pipeline shared by the single and the batch document upload:
+# analyse files (OCR, field fallbacks, evaluation) on a bounded thread pool,
+# assign each to one of the application's requirements, store the blobs,
+# then insert all rows and links in one transaction.
+#
+# Files with the same content (SHA-256) as another file of the batch, or as
+# a document already linked to the application, are reported as duplicates.
+# ZIP archives (agency dossiers) feed their entries into the same pipeline,
+# each extracted only when the analysis window reaches it; see zip_entries()
+# and analyze_all().
+#
+# Assignment order: requirement chosen in the form, filename keywords
+# (validator.classify_filenames / doc_hint_from_filename), then the document
+# type OCR detected. Files that match no requirement are reported and not
+# stored. A requirement that accepts a single document keeps the first file.
+
+#=== Imports
+
+import logging
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from uuid import uuid4
+
+import requests
+from werkzeug.utils import secure_filename
+
+from backend.datamodule.orm import (
+    AppDoc,
+    Application as ApplicationORM,
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    DocumentType,
+    File as FileORM,
+    FileType,
+    Requirement,
+    State as StateORM,
+    Status as StatusORM,
+)
+from backend.datamodule.sa import session_scope
+from backend.services.document_evaluation import evaluate_document_fields, load_profiles, needs_profile
+from backend.services.validation_issues import issue_rows
+from backend.services.ingest import SpooledUpload, spool_upload
+from backend.services.model_registry import model_dir
+from backend.services.ocr_facade import (
+    analyze_bytes_with_layoutlm_fields,
+    extract_diploma_fields,
+    extract_mrz_from_text,
+    postprocess_passport_fields,
+)
+from backend.services.readiness import refresh, stored_readiness
+from backend.services.rules_engine import state_code_for
+from backend.services.validator import classify_filenames
+from backend.utils.storage import delete_uris
+
+logger = logging.getLogger(__name__)
+
+#=== Configuration
+
+# OCR is CPU-bound in tesseract / torch (both release the GIL), so a few
+# threads per worker process use the dyno's cores without starving other
+# requests. The threads are shared by all uploads of the process (_get_pool),
+# so concurrent batches queue for them instead of adding threads.
+UPLOAD_WORKERS = int(os.getenv("BATCH_UPLOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Per batch: files handed to the pool at a time, and the spooled bytes those
+# may hold on disk (a single larger file still goes through on its own).
+UPLOAD_WINDOW = int(os.getenv("BATCH_UPLOAD_WINDOW", str(2 * UPLOAD_WORKERS)))
+UPLOAD_INFLIGHT_MB = int(os.getenv("BATCH_UPLOAD_INFLIGHT_MB", "100"))
+
+# Canonical documents (validator.CANONICAL_DOCS) -> requirement names they
+# can satisfy (_requirements.name, case-insensitive).
+CANONICAL_REQUIREMENTS = {
+    "Passport": ("id", "passport"),
+    "ID Card": ("id", "passport"),
+    "Nursing Diploma": ("qualificationcertificate",),
+    "Diploma Transcript": ("transcript",),
+    "License/Registration": ("licenseregistration",),
+    "CV (German)": ("cv",),
+    "Work Experience": ("professionalexperience",),
+    "Proof of Language B2": ("languagecertificate",),
+    "Proof of Language B2 Pflege": ("languagecertificate",),
+    "Good Standing Certificate": ("goodstanding",),
+    "Apostille/Legalization (if required)": ("apostille",),
+}
+
+# ZIP archives. zip_entries() checks the entries by their headers; each one
+# is decompressed into the upload folder (chunked, like request uploads) only
+# when it enters the analysis window, so disk use per archive stays within
+# UPLOAD_INFLIGHT_MB. ZIP_MAX_TOTAL_MB bounds the declared uncompressed total.
+# zipfile stops each entry at its declared size (and fails the CRC check if
+# the data is longer), so the header sizes can be trusted for the limits.
+ZIP_MAX_ENTRIES = int(os.getenv("ZIP_MAX_ENTRIES", "200"))
+ZIP_MAX_ENTRY_MB = int(os.getenv("ZIP_MAX_ENTRY_MB", "25"))
+ZIP_MAX_TOTAL_MB = int(os.getenv("ZIP_MAX_TOTAL_MB", "200"))
+# Uncompressed / compressed size above which an entry is treated as a zip bomb.
+ZIP_MAX_RATIO = int(os.getenv("ZIP_MAX_RATIO", "100"))
+ZIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png")
+
+# Document hint / OCR document type -> requirement names.
+HINT_REQUIREMENTS = {
+    "passport": ("id", "passport"),
+    "diploma": ("qualificationcertificate", "transcript"),
+}
+
+
+#=== File helpers
+
+def infer_filetype(filename: str, sniffed: str | None = None) -> str:
+    if sniffed in ("PDF", "JPEG", "PNG"):
+        return sniffed
+    ext = os.path.splitext(filename.lower())[1]
+    if ext in (".jpg", ".jpeg"):
+        return "JPEG"
+    if ext == ".png":
+        return "PNG"
+    return "PDF"
+
+
+def doc_hint_from_filename(filename: str) -> str | None:
+    name = (filename or "").lower()
+    if "passport" in name or name.startswith("pass"):
+        return "passport"
+    if "diploma" in name or "degree" in name or "certificate" in name or "transcript" in name:
+        return "diploma"
+    return None
+
+
+def doc_hint_from_requirement_name(name: str | None) -> str | None:
+    if not name:
+        return None
+    name = name.lower()
+    if "id" in name or "passport" in name:
+        return "passport"
+    if "qualification" in name or "diploma" in name or "certificate" in name or "transcript" in name:
+        return "diploma"
+    return None
+
+
+def map_doc_type(doc_type: str | None, requirement_name: str | None) -> str | None:
+    if doc_type:
+        if doc_type.lower().startswith("passport"):
+            return "passport"
+        if "degree" in doc_type.lower() or "diploma" in doc_type.lower():
+            return "diploma"
+    # fallback: use requirement name
+    if requirement_name and "id" in requirement_name.lower():
+        return "passport"
+    return None
+
+
+def select_token_model_dir(doc_type_name: str | None) -> str | None:
+    # Active version from the model registry first; the env vars remain for
+    # setups without a versioned model cache.
+    if not doc_type_name:
+        return os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
+    if "passport" in doc_type_name.lower():
+        return (
+            model_dir("passport")
+            or os.getenv("CAESAR_PASSPORT_TOKEN_MODEL_DIR")
+            or os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
+        )
+    if "diploma" in doc_type_name.lower():
+        return (
+            model_dir("diploma")
+            or os.getenv("CAESAR_DIPLOMA_TOKEN_MODEL_DIR")
+            or os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
+        )
+    return os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
+
+
+#=== OCR
+
+def call_ocr_service(base_url: str, upload: SpooledUpload, filename: str, doc_hint: str | None) -> dict:
+    url = base_url.rstrip("/") + "/analyze"
+    params = {}
+    if doc_hint:
+        params["doc_hint"] = doc_hint
+    timeout_s = int(os.getenv("OCR_SERVICE_TIMEOUT", "15"))
+    with upload.open() as fh:
+        files = {"file": (filename, fh, upload.content_type or "application/octet-stream")}
+        resp = requests.post(url, params=params, files=files, timeout=(5, timeout_s))
+    resp.raise_for_status()
+    data = resp.json()
+    if not isinstance(data, dict):
+        raise ValueError("OCR service response must be JSON object")
+    return data
+
+
+def coerce_remote_ocr(remote: dict) -> SimpleNamespace:
+    doc_type = remote.get("doc_type") or remote.get("document_type") or "unknown"
+    ocr_text = remote.get("ocr_text") or remote.get("text") or remote.get("full_text") or ""
+    predictions = remote.get("predictions") or remote.get("labels") or []
+    return SimpleNamespace(doc_type=doc_type, ocr_text=ocr_text, predictions=predictions)
+
+
+def extract_passport_text_fields(ocr_text: str) -> dict:
+    if not ocr_text:
+        return {}
+    out: dict = {}
+    m = re.search(r"\bname\s*[:\-]\s*([A-ZÄÖÜ][A-Za-zÄÖÜäöüß.\-\s]{2,80})", ocr_text, re.I)
+    if m:
+        full = " ".join(m.group(1).split())
+        parts = full.split()
+        if parts:
+            out["surname"] = parts[-1]
+            out["given_names"] = " ".join(parts[:-1]) if len(parts) > 1 else ""
+            out["full_name"] = full
+    m = re.search(r"\bnationality\s*[:\-]\s*([A-Z]{3})\b", ocr_text, re.I)
+    if m:
+        out["nationality"] = m.group(1).upper()
+    m = re.search(r"\b(passport|passnummer|passport no)\s*[:\-]?\s*([A-Z0-9]{6,9})\b", ocr_text, re.I)
+    if m:
+        out["passport_number"] = m.group(2).upper()
+    return out
+
+
+def drop_mrz_fields(fields: dict) -> dict:
+    if not isinstance(fields, dict):
+        return {}
+    cleaned = dict(fields)
+    for key in (
+        "document_code",
+        "issuing_country",
+        "passport_number",
+        "passport_number_check",
+        "nationality",
+        "birth_date",
+        "birth_date_check",
+        "expiry_date",
+        "expiry_date_check",
+        "sex",
+        "personal_number",
+        "personal_number_check",
+        "final_check",
+        "surname",
+        "given_names",
+        "full_name",
+    ):
+        cleaned.pop(key, None)
+    return cleaned
+
+
+def run_ocr(upload: SpooledUpload, filename: str, doc_hint: str | None):
+    """OCR one spooled file (OCR service if configured, else local). Returns (result, fields, source)."""
+    token_model_dir = select_token_model_dir(doc_hint)
+    ocr_service_url = os.getenv("OCR_SERVICE_URL")
+    ocr_res = None
+    fields = {}
+    ocr_source = "local"
+    with upload.mapped() as file_buf:
+        if ocr_service_url:
+            try:
+                remote = call_ocr_service(ocr_service_url, upload, filename, doc_hint)
+                fields = remote.get("fields", remote)
+                ocr_res = coerce_remote_ocr(remote)
+                ocr_source = "remote"
+            except Exception:
+                logger.warning("OCR service failed; using local OCR.", exc_info=True)
+        if ocr_res is None:
+            ocr_res, fields = analyze_bytes_with_layoutlm_fields(
+                file_buf, path=upload.path, token_model_dir=token_model_dir
+            )
+    if not fields and getattr(ocr_res, "fields", None):
+        fields = ocr_res.fields
+    ocr_text = getattr(ocr_res, "ocr_text", "") or ""
+    logger.warning(
+        "OCR result (%s) for %s: doc_type=%s text_len=%s fields=%s",
+        ocr_source,
+        filename,
+        getattr(ocr_res, "doc_type", "unknown"),
+        len(ocr_text),
+        len(fields or {}),
+    )
+    if not ocr_text:
+        logger.warning("OCR text is empty for %s", filename)
+    if not fields:
+        logger.warning("OCR extracted fields are empty for %s", filename)
+        if ocr_text:
+            mrz_fields = extract_mrz_from_text(ocr_text)
+            if mrz_fields:
+                fields = postprocess_passport_fields(mrz_fields)
+                if fields.get("mrz_checksum_ok") is False:
+                    fields = drop_mrz_fields(fields)
+                    fields.update(extract_passport_text_fields(ocr_text))
+                logger.info("OCR fallback extracted MRZ fields for %s", filename)
+            elif doc_hint in ("diploma", "degree"):
+                diploma_fields = extract_diploma_fields(ocr_text)
+                if diploma_fields:
+                    fields = diploma_fields
+                    logger.info("OCR fallback extracted diploma fields for %s", filename)
+            if not fields:
+                fields = {"ocr_text": ocr_text}
+    return ocr_res, fields, ocr_source
+
+
+#=== Requirements of an application
+
+@dataclass(frozen=True)
+class RequirementSlot:
+    id: str
+    name: str
+    allow_multiple: bool
+
+
+class RequirementIndex:
+    def __init__(self, rows):
+        self.by_id = {row.id: row for row in rows}
+        self._by_name: dict[str, list] = {}
+        for row in rows:
+            self._by_name.setdefault(row.name.strip().casefold(), []).append(row)
+
+    def by_names(self, names) -> RequirementSlot | None:
+        for name in names:
+            rows = self._by_name.get(name)
+            if rows:
+                return rows[0]
+        return None
+
+    def for_canonical(self, canonical_docs) -> RequirementSlot | None:
+        for canon in sorted(canonical_docs):
+            slot = self.by_names(CANONICAL_REQUIREMENTS.get(canon, ()))
+            if slot:
+                return slot
+        return None
+
+    def for_hint(self, hint: str | None) -> RequirementSlot | None:
+        return self.by_names(HINT_REQUIREMENTS.get(hint, ())) if hint else None
+
+
+def load_requirements(session, application_id: str) -> RequirementIndex:
+    rows = (
+        session.query(Requirement.id, Requirement.name, Requirement.allow_multiple)
+        .join(AppDoc, AppDoc.requirements_id == Requirement.id)
+        .filter(AppDoc.application_id == application_id)
+        .distinct()
+        .all()
+    )
+    slots = []
+    for row in rows:
+        name = row.name or ""
+        allow_multiple = row.allow_multiple
+        if allow_multiple is None:
+            allow_multiple = name.lower() not in ("id", "cv", "proofofberlinresponsibility", "passport")
+        slots.append(RequirementSlot(row.id, name, bool(allow_multiple)))
+    return RequirementIndex(sorted(slots, key=lambda slot: slot.name))
+
+
+#=== Pipeline
+
+@dataclass
+class DossierFile:
+    filename: str
+    upload: SpooledUpload | None
+    requirement_id: str | None = None
+    assigned_by: str | None = None
+    status: str = "pending"
+    error: str | None = None
+    doc_hint: str | None = None
+    ocr_doc_type: str | None = None
+    ocr_res: object = None
+    fields: dict = field(default_factory=dict)
+    ocr_source: str | None = None
+    doc_type_name: str | None = None
+    check_ready: bool = False
+    validation_errors: dict | None = None
+    stored_path: str | None = None
+    document_id: str | None = None
+    # ZIP member not extracted yet (upload is None until analyze_all spools it).
+    entry: "ZipEntry | None" = None
+
+    def fail(self, status: str, error: str) -> "DossierFile":
+        self.status = status
+        self.error = error
+        return self
+
+    def report(self, requirements: RequirementIndex | None = None) -> dict:
+        slot = requirements.by_id.get(self.requirement_id) if requirements and self.requirement_id else None
+        return {
+            "filename": self.filename,
+            "status": self.status,
+            "requirement_id": self.requirement_id,
+            "requirement": slot.name if slot else None,
+            "assigned_by": self.assigned_by,
+            "doc_type": self.doc_type_name or self.ocr_doc_type,
+            "check_ready": bool(self.check_ready),
+            "document_id": self.document_id,
+            "error": self.error,
+        }
+
+
+class Duplicates:
+    """Content hashes already linked to the application, and the first file of the batch per hash."""
+
+    def __init__(self, session, application_id: str):
+        self.linked = {
+            row.sha256
+            for row in session.query(FileORM.sha256)
+            .join(DocumentORM, DocumentORM.file_id == FileORM.id)
+            .join(AppDoc, AppDoc.document_id == DocumentORM.id)
+            .filter(AppDoc.application_id == application_id, FileORM.sha256.isnot(None))
+            .distinct()
+        }
+        self.first: dict[str, str] = {}
+
+    def check(self, item: DossierFile) -> None:
+        """Flag a spooled file whose content is already linked or occurred earlier in the batch."""
+        if item.status != "pending" or not item.upload or not item.upload.size:
+            return
+        digest = item.upload.sha256
+        if digest in self.linked:
+            item.fail("duplicate", "Already uploaded for this application.")
+        elif digest in self.first:
+            item.fail("duplicate", f"Same content as {self.first[digest]}.")
+        else:
+            self.first[digest] = item.filename
+
+
+def assign_by_filename(items, requirements: RequirementIndex, state: str | None = None) -> None:
+    """Pre-OCR assignment from filename keywords for files without a chosen requirement."""
+    for item in items:
+        if item.requirement_id and item.requirement_id not in requirements.by_id:
+            item.fail("unmatched", "Requirement is not part of this application.")
+    pending = [item for item in items if item.status == "pending" and not item.requirement_id]
+    # Keywords match whole words and "_" is a word character, so also try the
+    # name with separators as spaces ("transcript_of_records.pdf").
+    names = [item.filename for item in pending]
+    spaced = classify_filenames([re.sub(r"[_\-.]+", " ", name) for name in names], state)
+    for item, canonical, extra in zip(pending, classify_filenames(names, state), spaced):
+        canonical = canonical | extra
+        slot = requirements.for_canonical(canonical) or requirements.for_hint(doc_hint_from_filename(item.filename))
+        if slot:
+            item.requirement_id = slot.id
+            item.assigned_by = "filename"
+    for item in items:
+        slot = requirements.by_id.get(item.requirement_id)
+        item.doc_hint = doc_hint_from_requirement_name(slot.name if slot else None) or doc_hint_from_filename(
+            item.filename
+        )
+
+
+def analyze_file(
+    item: DossierFile, requirements: RequirementIndex, profile: dict | None, storage, user_id: str, on_stage=None
+) -> DossierFile:
+    """OCR, assign (by detected type if still open), evaluate and store one file. Thread-safe."""
+    upload = item.upload
+    try:
+        if item.status != "pending":
+            return item
+        if upload is None or not upload.size:
+            return item.fail("empty", "Empty file.")
+        try:
+            item.ocr_res, item.fields, item.ocr_source = run_ocr(upload, item.filename, item.doc_hint)
+        except Exception as exc:
+            logger.warning("OCR failed for %s", item.filename, exc_info=True)
+            return item.fail("failed", f"OCR failed: {exc}")
+        item.ocr_doc_type = getattr(item.ocr_res, "doc_type", None)
+        if on_stage:
+            on_stage(item, "ocr", doc_type=item.ocr_doc_type)
+        if not item.requirement_id:
+            slot = requirements.for_hint(map_doc_type(item.ocr_doc_type, None))
+            if not slot:
+                return item.fail("unmatched", "No matching requirement; upload it on the requirement directly.")
+            item.requirement_id = slot.id
+            item.assigned_by = "ocr"
+        slot = requirements.by_id.get(item.requirement_id)
+        item.doc_type_name = map_doc_type(item.ocr_doc_type, slot.name if slot else None)
+        item.fields, item.check_ready, item.validation_errors = evaluate_document_fields(
+            item.doc_type_name, item.fields, profile if needs_profile(item.doc_type_name) else None
+        )
+        if on_stage:
+            on_stage(item, "evaluated", requirement=slot.name if slot else None, check_ready=bool(item.check_ready))
+        # Store after OCR so a failed analysis leaves no blob behind.
+        stored_key = f"{user_id}/{uuid4().hex}_{item.filename}"
+        item.stored_path = storage.put_file(upload.path, stored_key, content_type=upload.content_type, move=True)
+        item.status = "analysed"
+        if on_stage:
+            on_stage(item, "stored")
+        return item
+    except Exception as exc:
+        logger.exception("Processing %s failed", item.filename)
+        return item.fail("failed", str(exc))
+    finally:
+        if upload is not None:
+            # No-op when the storage backend took over the spooled file.
+            upload.discard()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool, _pool_pid
+    # Threads do not survive a fork (gunicorn preload): one pool per process.
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="dossier")
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _pending_size(item: DossierFile) -> int:
+    if item.upload is not None:
+        return item.upload.size
+    return item.entry.size if item.entry is not None else 0
+
+
+def analyze_all(
+    items,
+    requirements,
+    profile,
+    storage,
+    user_id,
+    *,
+    duplicates: Duplicates | None = None,
+    window: int = UPLOAD_WINDOW,
+    max_bytes: int = UPLOAD_INFLIGHT_MB * 1024 * 1024,
+    on_progress=None,
+    on_stage=None,
+):
+    """
+    Run analyze_file over items on the process-wide pool, with at most `window`
+    files and `max_bytes` of content in flight. ZIP entries are extracted and
+    checked for duplicates as they enter the window. on_progress(item, done,
+    total) per finished file, on_stage(item, stage, **detail) per pipeline stage.
+    """
+    total = len(items)
+    done = 0
+    lock = threading.Lock()
+
+    def finished(item):
+        nonlocal done
+        with lock:
+            done += 1
+            current = done
+        if on_stage and item.status != "analysed":
+            on_stage(item, item.status)
+        if on_progress:
+            on_progress(item, current, total)
+
+    def admit(item):
+        if item.status == "pending" and item.upload is None and item.entry is not None:
+            try:
+                item.upload = item.entry.spool(item.filename)
+            except Exception as exc:
+                # CRC mismatch, unsupported compression, truncated archive.
+                item.fail("failed", f"Could not extract: {exc}")
+        if duplicates is not None:
+            duplicates.check(item)
+
+    pool = _get_pool() if UPLOAD_WORKERS > 1 and total > 1 else None
+    running = {}
+    in_flight = 0
+
+    def collect():
+        nonlocal in_flight
+        ready, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in ready:
+            _, size = running.pop(future)
+            in_flight -= size
+            finished(future.result())
+
+    try:
+        for item in items:
+            size = _pending_size(item)
+            while running and (len(running) >= window or in_flight + size > max_bytes):
+                collect()
+            admit(item)
+            if pool is None or item.status != "pending":
+                # Inline, or already settled: analyze_file only reports and discards it.
+                finished(analyze_file(item, requirements, profile, storage, user_id, on_stage))
+                continue
+            future = pool.submit(analyze_file, item, requirements, profile, storage, user_id, on_stage)
+            running[future] = (item, size)
+            in_flight += size
+        while running:
+            collect()
+    except BaseException:
+        # Files still queued in the pool are dropped; running ones clean up
+        # after themselves. Remove what is spooled and will never be analysed.
+        busy = {id(item) for future, (item, _) in running.items() if not future.cancel()}
+        for item in items:
+            if item.upload is not None and id(item) not in busy:
+                item.upload.discard()
+        raise
+    return items
+
+
+def _lookup_ids(session, model, names) -> dict:
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return dict(session.query(model.name, model.id).filter(model.name.in_(names)).all())
+
+
+def store_documents(session, user_id: str, application_id: str, items, requirements: RequirementIndex) -> list:
+    """Insert file, data, document rows and requirement links for analysed items in one flush."""
+    analysed = [item for item in items if item.status == "analysed"]
+    links = {}
+    for link in session.query(AppDoc).filter(AppDoc.application_id == application_id).all():
+        links.setdefault(link.requirements_id, link)
+    # A requirement accepting one document keeps the first file of the batch.
+    # Only a file chosen for it explicitly replaces a document it already has.
+    taken = set()
+    for item in analysed:
+        slot = requirements.by_id.get(item.requirement_id)
+        if slot and not slot.allow_multiple:
+            if slot.id in taken:
+                item.fail("skipped", f"{slot.name} accepts one document; another file in this upload was used.")
+                continue
+            link = links.get(slot.id)
+            if item.assigned_by != "form" and link is not None and link.document_id:
+                item.fail("skipped", f"{slot.name} already has a document; replace it on the requirement directly.")
+                continue
+            taken.add(slot.id)
+    analysed = [item for item in analysed if item.status == "analysed"]
+    if not analysed:
+        return []
+
+    file_types = _lookup_ids(session, FileType, {infer_filetype(i.filename, i.upload.filetype if i.upload else None) for i in analysed})
+    doc_types = _lookup_ids(session, DocumentType, {i.doc_type_name for i in analysed})
+    status_id = _lookup_ids(session, StatusORM, {"new"}).get("new")
+
+    rows = []
+    for item in analysed:
+        data_id, file_id, document_id = str(uuid4()), str(uuid4()), str(uuid4())
+        ocr_res = item.ocr_res
+        predictions = getattr(ocr_res, "predictions", None)
+        rows.append(
+            DocumentDataORM(
+                id=data_id,
+                ocr_doc_type_prediction_str=item.ocr_doc_type,
+                ocr_predictions_str="\n".join(predictions) if isinstance(predictions, list) else predictions,
+                ocr_full_text=getattr(ocr_res, "ocr_text", None),
+                ocr_extracted_data=item.fields,
+                ocr_source=item.ocr_source,
+                check_ready=item.check_ready,
+                validation_errors=item.validation_errors,
+                issues=issue_rows(item.validation_errors),
+                review_status="pending",
+            )
+        )
+        rows.append(
+            FileORM(
+                id=file_id,
+                filename=item.filename,
+                filepath=item.stored_path,
+                filetype_id=file_types.get(infer_filetype(item.filename, item.upload.filetype if item.upload else None)),
+                sha256=item.upload.sha256 if item.upload else None,
+            )
+        )
+        rows.append(
+            DocumentORM(
+                id=document_id,
+                file_id=file_id,
+                document_type_id=doc_types.get(item.doc_type_name),
+                document_data_id=data_id,
+                user_id=user_id,
+                status_id=status_id,
+            )
+        )
+        slot = requirements.by_id[item.requirement_id]
+        link = links.get(slot.id)
+        if link is not None and not slot.allow_multiple:
+            link.document_id = document_id
+        else:
+            rows.append(
+                AppDoc(id=str(uuid4()), application_id=application_id, document_id=document_id, requirements_id=slot.id)
+            )
+        item.document_id = document_id
+        item.status = "stored"
+    session.add_all(rows)
+    session.flush()
+    refresh(session, application_id, {item.requirement_id for item in analysed})
+    return analysed
+
+
+def process(
+    user_id: str, application_id: str, items, *, storage, state: str | None = None, on_progress=None, on_stage=None
+) -> dict:
+    """
+    Assign, analyse in parallel and store a batch of DossierFile items; returns
+    the report. on_stage(item, stage, **detail) follows each file through the
+    pipeline (see services.progress), then gets (None, "done", ...) once.
+    """
+    with session_scope() as session:
+        requirements = load_requirements(session, application_id)
+        if state is None:
+            state = _application_state(session, application_id)
+        profile = load_profiles(session, [user_id]).get(user_id)
+        duplicates = Duplicates(session, application_id)
+    assign_by_filename(items, requirements, state)
+    if on_stage:
+        for item in items:
+            if item.status == "pending":
+                on_stage(item, "queued", requirement=_slot_name(requirements, item.requirement_id))
+    analyze_all(
+        items, requirements, profile, storage, user_id, duplicates=duplicates, on_progress=on_progress, on_stage=on_stage
+    )
+    analysed = [item for item in items if item.status == "analysed"]
+    readiness = None
+    try:
+        with session_scope() as session:
+            store_documents(session, user_id, application_id, items, requirements)
+            readiness = stored_readiness(session, [application_id]).get(application_id)
+    except Exception as exc:
+        logger.exception("Storing uploaded documents failed")
+        for item in items:
+            if item.status in ("analysed", "stored"):
+                item.fail("failed", f"Saving failed: {exc}")
+    # Blobs of files that were not linked (skipped, failed while saving).
+    orphaned = [item.stored_path for item in items if item.stored_path and item.status != "stored"]
+    if orphaned:
+        delete_uris(orphaned)
+    report = build_report(items, requirements, readiness)
+    if on_stage:
+        for item in analysed:
+            if item.status == "stored":
+                on_stage(
+                    item,
+                    "saved",
+                    requirement=_slot_name(requirements, item.requirement_id),
+                    check_ready=bool(item.check_ready),
+                )
+            else:
+                on_stage(item, item.status)
+        on_stage(None, "done", counts=report["counts"], readiness=report["readiness"])
+        if readiness and readiness.ready:
+            on_stage(None, "ready", readiness=report["readiness"])
+    return report
+
+
+def _slot_name(requirements: RequirementIndex, requirement_id: str | None) -> str | None:
+    slot = requirements.by_id.get(requirement_id) if requirement_id else None
+    return slot.name if slot else None
+
+
+def _application_state(session, application_id: str) -> str | None:
+    row = (
+        session.query(StateORM.name, StateORM.abbreviation)
+        .join(ApplicationORM, ApplicationORM.state_id == StateORM.id)
+        .filter(ApplicationORM.id == application_id)
+        .first()
+    )
+    return state_code_for(row.name, row.abbreviation) if row else None
+
+
+def build_report(items, requirements: RequirementIndex, readiness=None) -> dict:
+    files = [item.report(requirements) for item in items]
+    counts: dict[str, int] = {}
+    for entry in files:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    covered = {item.requirement_id for item in items if item.status == "stored"}
+    return {
+        "files": files,
+        "counts": counts,
+        "requirements_covered": sorted(requirements.by_id[r].name for r in covered),
+        "requirements_open": sorted(slot.name for slot in requirements.by_id.values() if slot.id not in covered),
+        # Whole application after this upload (rules engine), incl. what is still missing.
+        "readiness": readiness.as_dict() if readiness else None,
+    }
+
+
+#=== ZIP archives
+
+class ArchiveError(ValueError):
+    pass
+
+
+def _entry_name(info: zipfile.ZipInfo) -> str | None:
+    """Flat, safe filename of a ZIP entry; None for entries to pass over silently."""
+    if info.is_dir():
+        return None
+    parts = info.filename.replace("\\", "/").split("/")
+    if parts[0] == "__MACOSX" or parts[-1].startswith("."):
+        return None
+    return secure_filename(parts[-1]) or None
+
+
+class ZipEntry:
+    """A document in an open ZIP archive, extracted when the pipeline reaches it."""
+
+    def __init__(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo, upload_dir: str):
+        self.zf = zf
+        self.info = info
+        self.upload_dir = upload_dir
+        self.size = info.file_size
+
+    def spool(self, filename: str) -> SpooledUpload:
+        with self.zf.open(self.info) as stream:
+            return spool_upload(stream, filename, directory=self.upload_dir)
+
+
+@contextmanager
+def zip_entries(archive, upload_dir: str):
+    """
+    Open a ZIP archive (path or binary file) and yield its documents as
+    DossierFile items. Nothing is extracted here: accepted entries carry a
+    ZipEntry that analyze_all spools, so process them inside the with block.
+    """
+    try:
+        zf = zipfile.ZipFile(archive)
+    except (zipfile.BadZipFile, OSError) as exc:
+        raise ArchiveError(f"Not a readable ZIP archive: {exc}") from exc
+    items = []
+    budget = ZIP_MAX_TOTAL_MB * 1024 * 1024
+    with zf:
+        infos = zf.infolist()
+        if len(infos) > ZIP_MAX_ENTRIES:
+            raise ArchiveError(f"Archive has {len(infos)} entries; at most {ZIP_MAX_ENTRIES} are accepted.")
+        for info in infos:
+            filename = _entry_name(info)
+            if filename is None:
+                continue
+            item = DossierFile(filename, None)
+            items.append(item)
+            if not filename.lower().endswith(ZIP_EXTENSIONS):
+                item.fail("rejected", "Unsupported file type.")
+            elif info.flag_bits & 0x1:
+                item.fail("rejected", "Encrypted entry.")
+            elif info.file_size > ZIP_MAX_ENTRY_MB * 1024 * 1024:
+                item.fail("rejected", f"Larger than {ZIP_MAX_ENTRY_MB} MB.")
+            elif info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RATIO:
+                item.fail("rejected", "Suspicious compression ratio.")
+            elif info.file_size > budget:
+                item.fail("rejected", f"Archive exceeds {ZIP_MAX_TOTAL_MB} MB uncompressed.")
+            else:
+                item.entry = ZipEntry(zf, info, upload_dir)
+                budget -= info.file_size
+        yield items
+
+
+def ingest_zip(
+    user_id: str, application_id: str, archive, *, storage, upload_dir: str, on_progress=None, on_stage=None
+) -> dict:
+    """Extract, deduplicate, classify, analyse and link the documents of a ZIP dossier."""
+    with zip_entries(archive, upload_dir) as items:
+        return process(user_id, application_id, items, storage=storage, on_progress=on_progress, on_stage=on_stage)
@@ -0,0 +1,123 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.ingest
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Streaming ingest for uploaded files.
+#
+# The request stream is copied in fixed-size chunks into a temp file next to
+# the final upload location; the SHA-256 and the file type are computed on
+# the way through, so the upload is never held in memory as a whole.
+# Consumers then read from that file: S3 uploads stream it, local storage
+# renames it into place, and OCR maps it with mmap instead of copying it.
+
+#=== Imports
+
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+
+#=== Configuration
+
+CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_KB", "1024")) * 1024
+SNIFF_BYTES = 16
+
+# (magic prefix, file type name as stored in _file_types, MIME type)
+_SIGNATURES = (
+    (b"%PDF", "PDF", "application/pdf"),
+    (b"\xff\xd8\xff", "JPEG", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "PNG", "image/png"),
+    (b"II*\x00", "TIFF", "image/tiff"),
+    (b"MM\x00*", "TIFF", "image/tiff"),
+)
+
+
+def sniff_filetype(head: bytes) -> tuple[str, str] | tuple[None, None]:
+    """Return (file type name, MIME type) from the leading bytes of a file."""
+    for magic, name, mime in _SIGNATURES:
+        if head.startswith(magic):
+            return name, mime
+    return None, None
+
+
+#=== Spooled upload
+
+class SpooledUpload:
+    """An upload spooled to disk, with its size, SHA-256 and sniffed type."""
+
+    def __init__(self, path: str, filename: str, size: int, sha256: str, head: bytes):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.head = head
+        self.filetype, self.content_type = sniff_filetype(head)
+        self._owned = True
+
+    def open(self):
+        return open(self.path, "rb")
+
+    @contextmanager
+    def mapped(self):
+        """Read-only mmap of the file. Supports slicing and the buffer protocol."""
+        with open(self.path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield buf
+            finally:
+                buf.close()
+
+    def persist(self, dest_path: str) -> str:
+        """Move the spooled file to its final location (a rename, not a copy)."""
+        os.replace(self.path, dest_path)
+        self.path = dest_path
+        self._owned = False
+        return dest_path
+
+    def discard(self) -> None:
+        """Remove the temp file unless it was persisted."""
+        if self._owned:
+            self._owned = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
+        return False
+
+
+def spool_upload(stream, filename: str, *, directory: str | None = None, chunk_size: int = CHUNK_SIZE) -> SpooledUpload:
+    """Copy a readable binary stream to a temp file in `directory`.
+
+    Spool into the upload folder so persisting is a rename on the same
+    filesystem. The caller owns the result and must persist() or discard() it.
+    """
+    suffix = os.path.splitext(filename)[1]
+    fd, path = tempfile.mkstemp(prefix=".upload-", suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledUpload(path, filename, size, digest.hexdigest(), head)
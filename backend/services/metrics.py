@@ -0,0 +1,288 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.metrics
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Insights metrics: daily rollups per state and profession in _metrics_daily.
+#
+# refresh() (scripts/refresh_metrics.py, run on a schedule) recomputes the
+# days from the day of the stored watermark up to today and moves the
+# watermark to the start of the run. Each day is rebuilt as a whole from
+# the source rows of that day, found through the timestamp indexes
+# (application created, became ready, file uploaded, review decided), so a
+# run is idempotent and a partially counted day is simply counted again.
+#
+# Known approximations, because the source rows keep the current state only
+# (there is no review or evaluation history):
+#   - A decision counts on the day of the document's latest reviewed_at. A
+#     document re-reviewed on a later day counts again on that day, while
+#     the earlier day keeps its count once it is behind the watermark, so
+#     decisions over a period can exceed the documents decided (until a
+#     --rebuild recomputes all days from the current rows).
+#   - documents_check_ready is counted on the upload day with the document's
+#     check_ready as of the last refresh that recomputed that day; later
+#     corrections or revalidations do not move it (again, until --rebuild).
+#
+# insights() reads only the rollups (plus the small state / profession
+# catalogues for names), so the dashboard cost depends on the number of
+# days and groups shown, not on the history behind them.
+
+#=== Imports
+
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, func, insert, select
+
+from backend.datamodule.orm import (
+    AppDoc,
+    Application as ApplicationORM,
+    ApplicationReadiness,
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    File as FileORM,
+    MetricsDaily,
+    MetricsWatermark,
+)
+
+#=== Configuration
+
+WATERMARK = "metrics_daily"
+INSIGHTS_DAYS = int(os.getenv("INSIGHTS_DAYS", "90"))
+
+COUNTERS = (
+    "applications_created",
+    "applications_ready",
+    "ready_seconds",
+    "documents_uploaded",
+    "documents_check_ready",
+    "documents_reviewed",
+    "documents_approved",
+    "documents_declined",
+    "decision_seconds",
+)
+
+
+#=== Helpers
+
+def _seconds_between(session, end, start):
+    if session.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+
+def _as_date(value) -> date:
+    # func.date() returns a date on PostgreSQL and an ISO string on SQLite.
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _start_of(day: date | None) -> datetime | None:
+    return datetime.combine(day, datetime.min.time()) if day is not None else None
+
+
+#=== Aggregation
+
+def _linked_documents(session, timestamp, since: datetime | None):
+    """Distinct (document, state, profession) rows whose timestamp is on or after since."""
+    query = (
+        select(
+            DocumentORM.id.label("document_id"),
+            ApplicationORM.state_id,
+            ApplicationORM.profession_id,
+            FileORM.uploaded_at,
+            DocumentDataORM.check_ready,
+            DocumentDataORM.review_status,
+            DocumentDataORM.reviewed_at,
+        )
+        .distinct()
+        .join(AppDoc, AppDoc.document_id == DocumentORM.id)
+        .join(ApplicationORM, AppDoc.application_id == ApplicationORM.id)
+        .join(FileORM, DocumentORM.file_id == FileORM.id, isouter=True)
+        .join(DocumentDataORM, DocumentORM.document_data_id == DocumentDataORM.id, isouter=True)
+        .where(timestamp.isnot(None))
+    )
+    if since is not None:
+        query = query.where(timestamp >= since)
+    return query.subquery()
+
+
+def aggregate(session, since: datetime | None = None) -> list[dict]:
+    """Rollup rows for every day on or after since (all days when None), from the source tables."""
+    rows: dict[tuple, dict] = {}
+
+    def add(day, state_id, profession_id, **counts):
+        key = (_as_date(day), state_id, profession_id)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = {"day": key[0], "state_id": state_id, "profession_id": profession_id}
+            row.update(dict.fromkeys(COUNTERS, 0))
+        for name, value in counts.items():
+            row[name] += int(value or 0)
+
+    created_day = func.date(ApplicationORM.time_created)
+    created = session.query(
+        created_day, ApplicationORM.state_id, ApplicationORM.profession_id, func.count(ApplicationORM.id)
+    ).filter(ApplicationORM.time_created.isnot(None))
+    if since is not None:
+        created = created.filter(ApplicationORM.time_created >= since)
+    for day, state_id, profession_id, count in created.group_by(
+        created_day, ApplicationORM.state_id, ApplicationORM.profession_id
+    ):
+        add(day, state_id, profession_id, applications_created=count)
+
+    ready_day = func.date(ApplicationReadiness.ready_at)
+    ready = (
+        session.query(
+            ready_day,
+            ApplicationORM.state_id,
+            ApplicationORM.profession_id,
+            func.count(ApplicationReadiness.application_id),
+            func.sum(_seconds_between(session, ApplicationReadiness.ready_at, ApplicationORM.time_created)),
+        )
+        .join(ApplicationORM, ApplicationReadiness.application_id == ApplicationORM.id)
+        .filter(ApplicationReadiness.ready_at.isnot(None))
+    )
+    if since is not None:
+        ready = ready.filter(ApplicationReadiness.ready_at >= since)
+    for day, state_id, profession_id, count, seconds in ready.group_by(
+        ready_day, ApplicationORM.state_id, ApplicationORM.profession_id
+    ):
+        add(day, state_id, profession_id, applications_ready=count, ready_seconds=seconds)
+
+    uploads = _linked_documents(session, FileORM.uploaded_at, since)
+    upload_day = func.date(uploads.c.uploaded_at)
+    for day, state_id, profession_id, count, check_ready in session.execute(
+        select(
+            upload_day,
+            uploads.c.state_id,
+            uploads.c.profession_id,
+            func.count(),
+            func.sum(case((uploads.c.check_ready.is_(True), 1), else_=0)),
+        ).group_by(upload_day, uploads.c.state_id, uploads.c.profession_id)
+    ):
+        add(day, state_id, profession_id, documents_uploaded=count, documents_check_ready=check_ready)
+
+    reviews = _linked_documents(session, DocumentDataORM.reviewed_at, since)
+    review_day = func.date(reviews.c.reviewed_at)
+    decided = reviews.c.review_status.in_(("approved", "declined"))
+    for day, state_id, profession_id, count, approved, declined, seconds in session.execute(
+        select(
+            review_day,
+            reviews.c.state_id,
+            reviews.c.profession_id,
+            func.count(),
+            func.sum(case((reviews.c.review_status == "approved", 1), else_=0)),
+            func.sum(case((reviews.c.review_status == "declined", 1), else_=0)),
+            func.sum(_seconds_between(session, reviews.c.reviewed_at, reviews.c.uploaded_at)),
+        )
+        .where(decided)
+        .group_by(review_day, reviews.c.state_id, reviews.c.profession_id)
+    ):
+        add(
+            day,
+            state_id,
+            profession_id,
+            documents_reviewed=count,
+            documents_approved=approved,
+            documents_declined=declined,
+            decision_seconds=seconds,
+        )
+
+    return list(rows.values())
+
+
+def watermark(session) -> datetime | None:
+    row = session.get(MetricsWatermark, WATERMARK)
+    return row.value if row is not None else None
+
+
+def refresh(session, *, rebuild: bool = False, now: datetime | None = None) -> tuple[date | None, int]:
+    """Recompute the days since the watermark (all with rebuild); returns (first day, rows written)."""
+    # Taken before reading: whatever commits during the run is in a day the
+    # next run recomputes anyway.
+    now = now or datetime.utcnow()
+    mark = None if rebuild else watermark(session)
+    first_day = mark.date() if mark is not None else None
+    rows = aggregate(session, _start_of(first_day))
+    stale = session.query(MetricsDaily)
+    if first_day is not None:
+        stale = stale.filter(MetricsDaily.day >= first_day)
+    stale.delete(synchronize_session=False)
+    if rows:
+        session.execute(insert(MetricsDaily), rows)
+    stored = session.get(MetricsWatermark, WATERMARK)
+    if stored is None:
+        session.add(MetricsWatermark(name=WATERMARK, value=now))
+    else:
+        stored.value = now
+    return first_day, len(rows)
+
+
+#=== Reads
+
+def _rates(totals: dict) -> dict:
+    reviewed = totals["documents_reviewed"]
+    ready = totals["applications_ready"]
+    uploaded = totals["documents_uploaded"]
+    return {
+        "avg_decision_hours": round(totals["decision_seconds"] / reviewed / 3600, 1) if reviewed else None,
+        "avg_days_to_ready": round(totals["ready_seconds"] / ready / 86400, 1) if ready else None,
+        "approval_rate": round(totals["documents_approved"] / reviewed, 3) if reviewed else None,
+        "check_ready_rate": round(totals["documents_check_ready"] / uploaded, 3) if uploaded else None,
+    }
+
+
+def insights(session, *, days: int = INSIGHTS_DAYS, state_id=None, profession_id=None, today: date | None = None) -> dict:
+    """Dashboard figures for the last `days` days, from the rollups only."""
+    today = today or date.today()
+    first_day = today - timedelta(days=days - 1)
+    sums = [func.coalesce(func.sum(getattr(MetricsDaily, name)), 0) for name in COUNTERS]
+    query = session.query(MetricsDaily).filter(MetricsDaily.day >= first_day)
+    if state_id:
+        query = query.filter(MetricsDaily.state_id == state_id)
+    if profession_id:
+        query = query.filter(MetricsDaily.profession_id == profession_id)
+
+    def grouped(*keys):
+        return [
+            (tuple(row[: len(keys)]), dict(zip(COUNTERS, (int(v) for v in row[len(keys):]))))
+            for row in query.with_entities(*keys, *sums).group_by(*keys).order_by(*keys)
+        ]
+
+    daily = [{"day": _as_date(key[0]).isoformat(), **totals} for key, totals in grouped(MetricsDaily.day)]
+    totals = dict.fromkeys(COUNTERS, 0)
+    for entry in daily:
+        for name in COUNTERS:
+            totals[name] += entry[name]
+
+    groups = []
+    for (group_state_id, group_profession_id), group_totals in grouped(MetricsDaily.state_id, MetricsDaily.profession_id):
+        rates = _rates(group_totals)
+        # A new application in this group is expected to be complete after
+        # the average time the group's applications needed to become ready.
+        predicted = (
+            (today + timedelta(days=rates["avg_days_to_ready"])).isoformat()
+            if rates["avg_days_to_ready"] is not None
+            else None
+        )
+        groups.append(
+            {
+                "state_id": group_state_id,
+                "profession_id": group_profession_id,
+                **group_totals,
+                **rates,
+                "predicted_completion": predicted,
+            }
+        )
+
+    mark = watermark(session)
+    return {
+        "from": first_day.isoformat(),
+        "to": today.isoformat(),
+        "refreshed_at": mark.isoformat() if mark else None,
+        "totals": {**totals, **_rates(totals)},
+        "daily": daily,
+        "groups": groups,
+    }
@@ -0,0 +1,169 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.model_registry
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Versioned local model cache, shared by all workers on a dyno.
+#
+#   $CAESAR_MODEL_CACHE_DIR/<domain>/<version>/             model files
+#   $CAESAR_MODEL_CACHE_DIR/<domain>/<version>/.sync.json   manifest: source, sha256/size per file
+#   $CAESAR_MODEL_CACHE_DIR/<domain>/current                symlink to the active version
+#
+# scripts/fetch_models.py fills the cache and activates versions;
+# scripts/model_versions.py lists them and switches (rollback).
+#
+# Workers resolve the active version through model_dir(). The symlink is
+# re-read at most every CAESAR_MODEL_REFRESH_SECONDS; when it points to a new
+# version, the new files are read once in a background thread (page cache
+# warm-up) while requests keep using the old version, then model_dir()
+# switches. Returned paths are the versioned directories, never the symlink,
+# so path-keyed model caches load the new version instead of reusing the old.
+
+#=== Imports
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+#=== Configuration
+
+CACHE_DIR = Path(os.getenv("CAESAR_MODEL_CACHE_DIR", "/app/models"))
+REFRESH_SECONDS = float(os.getenv("CAESAR_MODEL_REFRESH_SECONDS", "30"))
+CURRENT = "current"
+MANIFEST = ".sync.json"
+DOMAINS = ("passport", "diploma")
+
+
+#=== Layout helpers
+
+def active_version(domain: str, base: Path = CACHE_DIR) -> str | None:
+    try:
+        version = os.readlink(base / domain / CURRENT)
+    except OSError:
+        return None
+    return version if (base / domain / version).is_dir() else None
+
+
+def list_versions(domain: str, base: Path = CACHE_DIR) -> list[dict]:
+    """Installed versions, newest first, with their manifest summary."""
+    domain_dir = base / domain
+    if not domain_dir.is_dir():
+        return []
+    active = active_version(domain, base)
+    versions = []
+    for path in domain_dir.iterdir():
+        if not path.is_dir() or path.is_symlink() or path.name.startswith("."):
+            continue
+        manifest = read_manifest(path)
+        versions.append(
+            {
+                "version": path.name,
+                "active": path.name == active,
+                "source": manifest.get("source"),
+                "files": len(manifest.get("files", {})),
+                "bytes": sum(f.get("size", 0) for f in manifest.get("files", {}).values()),
+                "installed_at": datetime.fromtimestamp(path.stat().st_mtime, timezone.utc).isoformat(),
+            }
+        )
+    versions.sort(key=lambda v: v["installed_at"], reverse=True)
+    return versions
+
+
+def read_manifest(version_dir: Path) -> dict:
+    try:
+        with (version_dir / MANIFEST).open() as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def activate(domain: str, version: str, base: Path = CACHE_DIR) -> None:
+    """Point <domain>/current at an installed version (atomic rename)."""
+    domain_dir = base / domain
+    if not (domain_dir / version).is_dir():
+        raise ValueError(f"{domain} version {version} is not installed")
+    link = domain_dir / CURRENT
+    tmp = domain_dir / f".{CURRENT}.{os.getpid()}"
+    if tmp.is_symlink() or tmp.exists():
+        tmp.unlink()
+    tmp.symlink_to(version)
+    os.replace(tmp, link)
+
+
+def _warm(path: Path) -> None:
+    # Read every file once so the first request on the new version does not
+    # wait for cold disk reads of several hundred MB of weights.
+    for file in path.rglob("*"):
+        if file.is_file():
+            with file.open("rb") as f:
+                while f.read(4 * 1024 * 1024):
+                    pass
+
+
+#=== Registry
+
+class ModelRegistry:
+    def __init__(self, base: Path = CACHE_DIR, refresh_seconds: float = REFRESH_SECONDS):
+        self.base = Path(base)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        # domain -> (version, checked_at monotonic)
+        self._active: dict[str, tuple[str | None, float]] = {}
+        self._warming: set[tuple[str, str]] = set()
+
+    def model_dir(self, domain: str) -> str | None:
+        """Directory of the active version of a domain, or None if none is installed."""
+        entry = self._active.get(domain)
+        now = time.monotonic()
+        if entry is None or now - entry[1] >= self.refresh_seconds:
+            entry = self._refresh(domain, now)
+        version = entry[0]
+        return str(self.base / domain / version) if version else None
+
+    def _refresh(self, domain: str, now: float) -> tuple[str | None, float]:
+        target = active_version(domain, self.base)
+        with self._lock:
+            entry = self._active.get(domain)
+            serving = entry[0] if entry else None
+            if serving is None or target is None or not (self.base / domain / serving).is_dir():
+                # Nothing usable to keep serving: switch right away.
+                entry = (target, now)
+            elif target != serving:
+                if (domain, target) not in self._warming:
+                    self._warming.add((domain, target))
+                    threading.Thread(
+                        target=self._warm_and_switch, args=(domain, target), name=f"model-warm-{domain}", daemon=True
+                    ).start()
+                entry = (serving, now)
+            else:
+                entry = (serving, now)
+            self._active[domain] = entry
+            return entry
+
+    def _warm_and_switch(self, domain: str, version: str) -> None:
+        try:
+            _warm(self.base / domain / version)
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._warming.discard((domain, version))
+                # Only switch if the symlink still points there.
+                if active_version(domain, self.base) == version:
+                    self._active[domain] = (version, time.monotonic())
+
+    def active_versions(self) -> dict[str, str | None]:
+        """Version each domain is served from in this process."""
+        return {domain: (self._active.get(domain) or (None,))[0] for domain in DOMAINS}
+
+
+registry = ModelRegistry()
+
+
+def model_dir(domain: str) -> str | None:
+    return registry.model_dir(domain)
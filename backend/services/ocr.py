@@ -15,7 +15,7 @@ import pytesseract
 from typing import Dict, Any
 import re
 from dataclasses import dataclass
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_bytes, convert_from_path
 import pathlib
 import json
 try:
@@ -29,13 +29,31 @@ except Exception:
     caesar_analyze_document_bytes = None
 
 #=== Helpers =============================================================
-def _load_image_from_bytes(b: bytes) -> Image.Image:
-    """Load image from bytes, normalize mode to RGB or L as PIL Image."""
-    im = Image.open(io.BytesIO(b))
+# file_bytes may be any bytes-like object (bytes, mmap, memoryview). When the
+# caller also passes the path of the same file, PDFs and images are opened
+# from disk directly instead of being copied into another buffer.
+
+def _load_image_from_bytes(b: bytes, path: str | None = None) -> Image.Image:
+    """Load image from bytes (or path), normalize mode to RGB or L as PIL Image."""
+    im = Image.open(path) if path else Image.open(io.BytesIO(b))
     if im.mode not in ("RGB", "L"):  # normalize
         im = im.convert("RGB")
     return im
 
+def _first_pdf_page(file_bytes: bytes, path: str | None = None) -> Image.Image:
+    """Render only the first page; the rest were never used."""
+    if path:
+        pages = convert_from_path(path, dpi=400, first_page=1, last_page=1)  # higher DPI for MRZ accuracy
+    else:
+        pages = convert_from_bytes(file_bytes, dpi=400, first_page=1, last_page=1)
+    if not pages:
+        raise ValueError("Empty PDF")
+    return pages[0]
+
+def _as_bytes(file_bytes) -> bytes:
+    """caesar_ocr expects real bytes; copy a mapped buffer only at that boundary."""
+    return file_bytes if isinstance(file_bytes, bytes) else bytes(file_bytes)
+
 def _to_cv(im: Image.Image) -> np.ndarray:
     """Convert PIL Image to OpenCV BGR format."""
     return cv2.cvtColor(np.array(im), cv2.COLOR_RGB2BGR)
@@ -287,10 +305,10 @@ class OcrResult:
     fields: Dict[str, Any]
 
 
-def analyze_bytes(file_bytes: bytes) -> OcrResult:
+def analyze_bytes(file_bytes: bytes, *, path: str | None = None) -> OcrResult:
     _ensure_tesseract_env()
     if caesar_analyze_bytes is not None:
-        res = caesar_analyze_bytes(file_bytes, lang="eng+deu")
+        res = caesar_analyze_bytes(_as_bytes(file_bytes), lang="eng+deu")
         rules_paths = _resolve_rules_paths(file_bytes)
         if rules_paths and caesar_load_rules is not None and caesar_run_rules is not None:
             for rules_path in rules_paths:
@@ -310,14 +328,10 @@ def analyze_bytes(file_bytes: bytes) -> OcrResult:
         )
     # Detect file type
     if file_bytes[:4] == b'%PDF':  # quick check for PDF magic number
-        # Convert PDF pages to images
-        pages = convert_from_bytes(file_bytes, dpi=400)  # higher DPI for MRZ accuracy
-        if not pages:
-            raise ValueError("Empty PDF")
         # Take the first page for PoC (you can loop later)
-        im = pages[0]
+        im = _first_pdf_page(file_bytes, path)
     else:
-        im = _load_image_from_bytes(file_bytes)
+        im = _load_image_from_bytes(file_bytes, path)
 
     pim = preprocess_image(im)
     predictions = _ocr_predictions(pim)
@@ -389,6 +403,7 @@ def _apply_doc_type_hints(res) -> None:
 def analyze_bytes_with_layoutlm_fields(
     file_bytes: bytes,
     *,
+    path: str | None = None,
     lang: str = "eng+deu",
     token_model_dir: str | None = None,
 ) -> tuple[OcrResult, dict]:
@@ -397,7 +412,7 @@ def analyze_bytes_with_layoutlm_fields(
     Returns (ocr_result, extracted_fields).
     """
     if caesar_analyze_document_bytes is None:
-        res = analyze_bytes(file_bytes)
+        res = analyze_bytes(file_bytes, path=path)
         if res.ocr_text:
             res.fields.update(_extract_mrz_from_text(res.ocr_text))
             res.fields = _postprocess_passport_fields(res.fields)
@@ -405,7 +420,7 @@ def analyze_bytes_with_layoutlm_fields(
 
     token_model_dir = token_model_dir or os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
     if not token_model_dir:
-        res = analyze_bytes(file_bytes)
+        res = analyze_bytes(file_bytes, path=path)
         if res.ocr_text:
             res.fields.update(_extract_mrz_from_text(res.ocr_text))
             res.fields = _postprocess_passport_fields(res.fields)
@@ -415,7 +430,7 @@ def analyze_bytes_with_layoutlm_fields(
     regex_path = regex_paths[0] if regex_paths else None
 
     tool_res = caesar_analyze_document_bytes(
-        file_bytes,
+        _as_bytes(file_bytes),
         layoutlm_model_dir=os.getenv("CAESAR_LAYOUTLM_MODEL_DIR"),
         layoutlm_token_model_dir=token_model_dir,
         lang=lang,
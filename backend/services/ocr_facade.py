@@ -0,0 +1,69 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.ocr_facade
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Lazy entry points into services.ocr.
+#
+# services.ocr imports cv2, numpy, PIL, pytesseract (which pulls in pandas),
+# pdf2image and the optional caesar_ocr/LayoutLM stack at module level:
+# several hundred ms and a large share of a worker's RSS. Web code imports
+# this facade instead, so the stack is only loaded by the first upload a
+# worker handles. Set OCR_PRELOAD=1 on processes that do OCR anyway to load
+# it up front (gunicorn.conf.py calls preload() before forking).
+
+#=== Imports
+
+import importlib
+import os
+import threading
+
+#=== Loader
+
+_module = None
+_lock = threading.Lock()
+
+
+def _ocr():
+    global _module
+    if _module is None:
+        with _lock:
+            if _module is None:
+                _module = importlib.import_module("backend.services.ocr")
+    return _module
+
+
+def is_loaded() -> bool:
+    return _module is not None
+
+
+def preload() -> None:
+    _ocr()
+
+
+def preload_enabled() -> bool:
+    return os.getenv("OCR_PRELOAD", "").lower() in ("1", "true", "yes")
+
+
+#=== Facade
+
+def analyze_bytes(file_bytes, **kwargs):
+    return _ocr().analyze_bytes(file_bytes, **kwargs)
+
+
+def analyze_bytes_with_layoutlm_fields(file_bytes, **kwargs):
+    return _ocr().analyze_bytes_with_layoutlm_fields(file_bytes, **kwargs)
+
+
+def extract_diploma_fields(ocr_text: str) -> dict:
+    return _ocr().extract_diploma_fields(ocr_text)
+
+
+def extract_mrz_from_text(ocr_text: str) -> dict:
+    return _ocr()._extract_mrz_from_text(ocr_text)
+
+
+def postprocess_passport_fields(fields: dict) -> dict:
+    return _ocr()._postprocess_passport_fields(fields)
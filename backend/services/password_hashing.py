@@ -0,0 +1,172 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.password_hashing
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Memory-hard password hashing (scrypt) off the request thread.
+#
+# Hashing and verification run in a small process pool so a burst of logins
+# or registrations cannot stall the web workers. At most
+# PASSWORD_HASH_QUEUE_DEPTH jobs may be in flight per web process; beyond
+# that callers get HashingOverloaded right away and answer with 429.
+#
+# Stored format:  scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+# Anything else is a legacy double-SHA256 hash (Creds.generate_hashed_password
+# with salt, then pepper); it still verifies and is upgraded on the next
+# successful login (see needs_rehash).
+#
+# Keep this module free of app/database imports: pool workers import it.
+
+#=== Imports
+
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+#=== Configuration
+
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+# 0 hashes inline in the calling thread (development, tests, scripts).
+WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", str(max(1, WORKERS) * 8)))
+TIMEOUT_S = float(os.getenv("PASSWORD_HASH_TIMEOUT", "5"))
+
+PREFIX = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HashingOverloaded(Exception):
+    """Raised when too many hashing jobs are queued; answer with 429."""
+
+
+#=== Pure functions (run in the pool)
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # maxmem must cover 128 * n * r bytes plus some headroom
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES, maxmem=256 * n * r + 1024 * 1024
+    )
+
+
+def _hash(password: str, n: int, r: int, p: int) -> str:
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return "$".join(
+        (PREFIX, str(n), str(r), str(p), base64.b64encode(salt).decode("ascii"), base64.b64encode(key).decode("ascii"))
+    )
+
+
+def _verify(password: str, stored: str) -> bool:
+    try:
+        _, n, r, p, salt_b64, key_b64 = stored.split("$")
+        salt = base64.b64decode(salt_b64)
+        expected = base64.b64decode(key_b64)
+        key = _scrypt(password, salt, int(n), int(r), int(p))
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(key, expected)
+
+
+def _legacy_hash(password: str, salt: str, pepper: str) -> str:
+    salted = hashlib.sha256((salt + password).encode("utf-8")).hexdigest()
+    return hashlib.sha256((pepper + salted).encode("utf-8")).hexdigest()
+
+
+#=== Pool
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(QUEUE_DEPTH)
+
+
+def _mp_context():
+    # Forking is cheap and never re-imports __main__ (setup_db.py has no main
+    # guard), but it is only safe while this process has a single thread.
+    # Threaded servers (gthread workers, the dev server) spawn instead.
+    if threading.active_count() == 1 and "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("spawn")
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_pid
+    # A pool created before a fork (gunicorn preload) is unusable in the child.
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=_mp_context())
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _run(fn, *args):
+    if WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        raise HashingOverloaded("password hashing queue is full")
+    try:
+        future = _get_pool().submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # The slot is held until the job is finished or cancelled, not until the
+    # caller stops waiting: cancel() cannot stop a job that already runs.
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=TIMEOUT_S)
+    except FutureTimeout:
+        future.cancel()
+        raise HashingOverloaded("password hashing timed out")
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+#=== Public API
+
+def is_legacy_hash(stored: str | None) -> bool:
+    return not (stored or "").startswith(PREFIX + "$")
+
+
+def needs_rehash(stored: str | None) -> bool:
+    """True for legacy hashes and scrypt hashes with outdated cost parameters."""
+    if is_legacy_hash(stored):
+        return True
+    try:
+        _, n, r, p, _, _ = stored.split("$")
+    except ValueError:
+        return True
+    return (int(n), int(r), int(p)) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def hash_password(password: str) -> str:
+    """Hash with the configured scrypt cost. May raise HashingOverloaded."""
+    return _run(_hash, password, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def verify_password(password: str, stored: str | None, salt: str = "", pepper: str = "") -> bool:
+    """Check password against a stored hash. May raise HashingOverloaded.
+
+    salt and pepper are only used for legacy double-SHA256 hashes.
+    """
+    if not stored or password is None:
+        return False
+    if is_legacy_hash(stored):
+        # Cheap; no need for the pool.
+        return hmac.compare_digest(_legacy_hash(password, salt or "", pepper or ""), stored)
+    return _run(_verify, password, stored)
@@ -0,0 +1,291 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.progress
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Progress events of the upload pipeline, per application.
+#
+# The upload's emitter() collects events and stores them in batches (one
+# transaction per FLUSH_EVENTS events or FLUSH_SECONDS, and at once for
+# done / ready) in _document_events, which gives them their ids, then hands
+# them to subscribers in this process through the ProgressBus.
+#
+# The page polls wait() (candidate document_events_poll) once a second with
+# a short or zero wait, so a watching tab costs one indexed query per
+# request instead of a worker thread: with gthread workers a held-open
+# request occupies one of the worker's few threads. listen() backs the SSE
+# endpoint, which holds its request for up to STREAM_SECONDS and is meant
+# for deployments on an async worker class (GUNICORN_WORKER_CLASS=gevent).
+# Both read the backlog from the table, wake up on the bus for local
+# events, and re-read the table when the bus stays quiet for POLL_SECONDS.
+#
+# Stages per file: queued, ocr, evaluated, stored, saved, and the final
+# statuses of dossier.DossierFile (duplicate, unmatched, failed, ...).
+# Per upload: done (counts and readiness), and ready when the application
+# became check ready.
+
+#=== Imports
+
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.datamodule.orm import DocumentEvent
+from backend.datamodule.sa import session_scope
+
+logger = logging.getLogger(__name__)
+
+#=== Configuration
+
+POLL_SECONDS = float(os.getenv("PROGRESS_POLL_SECONDS", "2"))
+STREAM_SECONDS = float(os.getenv("PROGRESS_STREAM_SECONDS", "55"))
+RETENTION_HOURS = int(os.getenv("PROGRESS_RETENTION_HOURS", "24"))
+# Longest wait a poll request may ask for; keep it short on gthread workers.
+MAX_WAIT_SECONDS = float(os.getenv("PROGRESS_MAX_WAIT_SECONDS", "2"))
+FLUSH_SECONDS = float(os.getenv("PROGRESS_FLUSH_SECONDS", "0.5"))
+FLUSH_EVENTS = 50
+FLUSH_STAGES = frozenset({"done", "ready"})
+BATCH_SIZE = 200
+
+
+#=== In-process bus
+
+class ProgressBus:
+    """Fan-out of events to the subscribers of an application in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set] = {}
+
+    def subscribe(self, application_id: str) -> queue.SimpleQueue:
+        inbox = queue.SimpleQueue()
+        with self._lock:
+            self._subscribers.setdefault(application_id, set()).add(inbox)
+        return inbox
+
+    def unsubscribe(self, application_id: str, inbox: queue.SimpleQueue) -> None:
+        with self._lock:
+            inboxes = self._subscribers.get(application_id)
+            if inboxes is not None:
+                inboxes.discard(inbox)
+                if not inboxes:
+                    del self._subscribers[application_id]
+
+    def publish(self, application_id: str, event: dict) -> None:
+        with self._lock:
+            inboxes = list(self._subscribers.get(application_id, ()))
+        for inbox in inboxes:
+            inbox.put(event)
+
+
+bus = ProgressBus()
+
+
+#=== Writing
+
+def _as_event(row: DocumentEvent) -> dict:
+    return {
+        "id": row.id,
+        "upload_id": row.upload_id,
+        "filename": row.filename,
+        "document_id": row.document_id,
+        "stage": row.stage,
+        "detail": row.detail or {},
+        "at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def _event(stage: str, upload_id=None, filename=None, document_id=None, detail=None) -> dict:
+    return {
+        "id": None,
+        "upload_id": upload_id,
+        "filename": filename,
+        "document_id": document_id,
+        "stage": stage,
+        "detail": detail or {},
+        "at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _store(application_id: str, events: list[dict]) -> None:
+    """Insert events in one transaction, then notify local subscribers. Never raises: progress is best effort."""
+    try:
+        with session_scope() as session:
+            rows = [
+                DocumentEvent(
+                    application_id=application_id,
+                    upload_id=event["upload_id"],
+                    filename=event["filename"],
+                    document_id=event["document_id"],
+                    stage=event["stage"],
+                    detail=event["detail"] or None,
+                )
+                for event in events
+            ]
+            session.add_all(rows)
+            session.flush()
+            for event, row in zip(events, rows):
+                event["id"] = row.id
+    except Exception:
+        logger.warning("Could not store %s progress events for %s", len(events), application_id, exc_info=True)
+    for event in events:
+        bus.publish(application_id, event)
+
+
+def publish(application_id: str, stage: str, *, upload_id=None, filename=None, document_id=None, **detail) -> dict:
+    """Record a single event and notify local subscribers."""
+    event = _event(stage, upload_id, filename, document_id, detail)
+    _store(application_id, [event])
+    return event
+
+
+class EventBatcher:
+    """Buffers the events of one upload and stores them in batches."""
+
+    def __init__(self, application_id: str):
+        self.application_id = application_id
+        self._lock = threading.Lock()
+        # Held while a batch is written, so batches get their ids in order.
+        self._store_lock = threading.Lock()
+        self._pending: list[dict] = []
+        self._timer = None
+
+    def add(self, event: dict, *, flush: bool = False) -> None:
+        with self._lock:
+            self._pending.append(event)
+            due = flush or len(self._pending) >= FLUSH_EVENTS
+            if not due and self._timer is None:
+                # Called from pool threads; the timer flushes what a slow
+                # OCR step leaves waiting.
+                self._timer = threading.Timer(FLUSH_SECONDS, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._store_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if batch:
+                _store(self.application_id, batch)
+
+
+def emitter(application_id: str, upload_id: str):
+    """on_stage callback for dossier.process: events stored in batches; prunes old events when done."""
+    batcher = EventBatcher(application_id)
+
+    def emit(item, stage: str, **detail) -> None:
+        if item is not None and item.error and "error" not in detail:
+            detail["error"] = item.error
+        event = _event(
+            stage,
+            upload_id,
+            item.filename if item is not None else None,
+            item.document_id if item is not None else None,
+            detail,
+        )
+        batcher.add(event, flush=stage in FLUSH_STAGES)
+        if stage == "done":
+            try:
+                with session_scope() as session:
+                    prune(session, application_id)
+            except Exception:
+                logger.warning("Could not prune progress events of %s", application_id, exc_info=True)
+
+    return emit
+
+
+def prune(session, application_id: str | None = None) -> int:
+    """Delete events older than RETENTION_HOURS (of one application, or all)."""
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=RETENTION_HOURS)
+    query = session.query(DocumentEvent).filter(DocumentEvent.created_at < cutoff)
+    if application_id is not None:
+        query = query.filter(DocumentEvent.application_id == application_id)
+    return query.delete(synchronize_session=False)
+
+
+#=== Reading
+
+def events_after(application_id: str, after_id: int = 0, upload_id: str | None = None) -> list[dict]:
+    with session_scope() as session:
+        query = session.query(DocumentEvent).filter(
+            DocumentEvent.application_id == application_id, DocumentEvent.id > after_id
+        )
+        if upload_id:
+            query = query.filter(DocumentEvent.upload_id == upload_id)
+        return [_as_event(row) for row in query.order_by(DocumentEvent.id).limit(BATCH_SIZE)]
+
+
+def _batches(application_id: str, after_id: int, upload_id: str | None, seconds: float):
+    """Yield lists of new events for up to `seconds`; an empty list after POLL_SECONDS without any."""
+    # Subscribe before reading the backlog so nothing falls in between.
+    inbox = bus.subscribe(application_id)
+    last_id = after_id
+    # Ids already sent: pool threads may publish out of id order, and the
+    # table poll can return events the bus delivered before.
+    seen = set()
+    started = time.monotonic()
+    # NaN / inf from a caller would never compare as expired.
+    seconds = min(max(seconds, 0), STREAM_SECONDS) if math.isfinite(seconds) else 0
+    deadline = started + seconds
+    # Independent of the caller's value: no request is held past a stream's length.
+    hard_stop = started + STREAM_SECONDS
+    try:
+        pending = events_after(application_id, last_id, upload_id)
+        while True:
+            batch = []
+            for event in pending:
+                if event["id"] is not None:
+                    if event["id"] in seen or event["id"] <= after_id:
+                        continue
+                    seen.add(event["id"])
+                    last_id = max(last_id, event["id"])
+                batch.append(event)
+            if batch:
+                yield batch
+            now = time.monotonic()
+            remaining = deadline - now
+            if not remaining > 0 or now >= hard_stop:
+                return
+            try:
+                event = inbox.get(timeout=min(POLL_SECONDS, remaining))
+                pending = [event] if not upload_id or event["upload_id"] == upload_id else []
+            except queue.Empty:
+                # Quiet here; the upload may run on another worker.
+                pending = events_after(application_id, last_id, upload_id)
+                if not pending:
+                    yield []
+    finally:
+        bus.unsubscribe(application_id, inbox)
+
+
+def listen(application_id: str, after_id: int = 0, upload_id: str | None = None, *, seconds: float = STREAM_SECONDS):
+    """
+    Yield events after after_id for up to `seconds`, and None as a heartbeat
+    when nothing happened for POLL_SECONDS. Local events come from the bus,
+    others from the table.
+    """
+    for batch in _batches(application_id, after_id, upload_id, seconds):
+        if not batch:
+            yield None
+        yield from batch
+
+
+def wait(application_id: str, after_id: int = 0, upload_id: str | None = None, *, seconds: float = 0) -> list[dict]:
+    """Poll: the events after after_id, waiting up to `seconds` (0: none) until there are any."""
+    if not (math.isfinite(seconds) and seconds > 0):
+        return events_after(application_id, after_id, upload_id)
+    for batch in _batches(application_id, after_id, upload_id, seconds):
+        if batch:
+            return batch
+    return []
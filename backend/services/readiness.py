@@ -0,0 +1,228 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.readiness
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Materialised readiness: _requirement_readiness holds, per application and
+# requirement, how many linked documents there are and how many satisfy it;
+# _application_readiness holds the rules engine result for the application.
+#
+# Writers call refresh() / document_changed() inside the session that made
+# the change (upload, details save, review, delete, relink, profile save),
+# so the stored readiness commits or rolls back with it. Only the requirement
+# rows touched by the change are recounted; the application row is then
+# re-evaluated from the requirement rows, without reading documents.
+# Readers (document page, recruiter list, filters) only select stored rows;
+# scripts/backfill_readiness.py fills them for existing applications.
+# Each refresh also re-syncs the application's rows in the review queue
+# (services/review_queue.py), whose priority depends on the readiness.
+
+#=== Imports
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.datamodule.orm import (
+    AppDoc,
+    ApplicationReadiness,
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    RequirementReadiness,
+)
+from backend.services.review_queue import forget_application, sync_application
+from backend.services.rules_engine import Evaluation, Readiness, load_plans
+
+#=== Helpers
+
+
+def _upsert(session, model, rows: list[dict], keys: tuple[str, ...], sticky: tuple[str, ...] = ()) -> None:
+    """Insert or update rows; sticky columns keep their stored value unless the new one is NULL."""
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(model).values(rows)
+    updates = {c: stmt.excluded[c] for c in rows[0] if c not in keys}
+    for c in sticky:
+        updates[c] = case((stmt.excluded[c].is_(None), None), else_=func.coalesce(model.__table__.c[c], stmt.excluded[c]))
+    updates["updated_at"] = func.now()
+    session.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=updates))
+
+
+def _satisfying():
+    # Same rule as rules_engine.document_satisfies, in SQL.
+    return case(
+        (
+            and_(
+                DocumentDataORM.check_ready.is_(True),
+                func.coalesce(DocumentDataORM.review_status, "pending") != "declined",
+            ),
+            1,
+        ),
+        else_=0,
+    )
+
+
+def _counts(session, application_id: str, requirement_ids=None):
+    """Query of (requirement id, linked documents, satisfying documents), counted from the documents."""
+    counts = (
+        session.query(
+            AppDoc.requirements_id,
+            func.count(AppDoc.document_id),
+            func.coalesce(func.sum(_satisfying()), 0),
+        )
+        .outerjoin(DocumentORM, AppDoc.document_id == DocumentORM.id)
+        .outerjoin(DocumentDataORM, DocumentORM.document_data_id == DocumentDataORM.id)
+        .filter(AppDoc.application_id == application_id)
+        .group_by(AppDoc.requirements_id)
+    )
+    if requirement_ids is not None:
+        counts = counts.filter(AppDoc.requirements_id.in_(requirement_ids))
+    return counts
+
+
+def _evaluate(plan, counts) -> Readiness:
+    evaluation = Evaluation(plan)
+    for requirement_id, documents, satisfied in counts:
+        # One stand-in document per requirement: the plan only needs "has a
+        # document" (for advice) and "is satisfied".
+        if documents:
+            evaluation.apply(requirement_id, "*", bool(satisfied))
+    return evaluation.result()
+
+
+def _recount(session, application_id: str, requirement_ids=None) -> None:
+    counts = _counts(session, application_id, requirement_ids)
+    stale = session.query(RequirementReadiness).filter(RequirementReadiness.application_id == application_id)
+    if requirement_ids is not None:
+        stale = stale.filter(RequirementReadiness.requirement_id.in_(requirement_ids))
+    rows = [
+        {
+            "application_id": application_id,
+            "requirement_id": requirement_id,
+            "documents": int(documents),
+            "satisfied_documents": int(satisfied),
+            "satisfied": bool(satisfied),
+        }
+        for requirement_id, documents, satisfied in counts.all()
+    ]
+    # Requirements no longer linked (relink, application change) lose their row.
+    stale.filter(RequirementReadiness.requirement_id.notin_([r["requirement_id"] for r in rows])).delete(
+        synchronize_session=False
+    )
+    _upsert(session, RequirementReadiness, rows, ("application_id", "requirement_id"))
+
+
+#=== Refresh
+
+def refresh(session, application_id: str, requirement_ids=None) -> Readiness | None:
+    """Recount the given requirements (all when None) and re-evaluate the application."""
+    session.flush()
+    plan = load_plans(session, [application_id]).get(application_id)
+    if plan is None:
+        # Application is gone.
+        session.query(RequirementReadiness).filter_by(application_id=application_id).delete()
+        session.query(ApplicationReadiness).filter_by(application_id=application_id).delete()
+        forget_application(session, application_id)
+        return None
+    _recount(session, application_id, list(requirement_ids) if requirement_ids is not None else None)
+
+    rows = (
+        session.query(RequirementReadiness.requirement_id, RequirementReadiness.documents, RequirementReadiness.satisfied)
+        .filter(RequirementReadiness.application_id == application_id)
+        .all()
+    )
+    result = _evaluate(plan, rows)
+    _upsert(
+        session,
+        ApplicationReadiness,
+        [
+            {
+                "application_id": application_id,
+                "ready": result.ready,
+                "satisfied": result.satisfied,
+                "required": result.required,
+                "missing": list(result.missing),
+                "advice": list(result.advice),
+                "ready_at": func.now() if result.ready else None,
+            }
+        ],
+        ("application_id",),
+        sticky=("ready_at",),
+    )
+    sync_application(session, application_id, result)
+    return result
+
+
+def refresh_links(session, links) -> None:
+    """Refresh after changes to (application_id, requirement_id) pairs."""
+    by_application: dict[str, set] = {}
+    for application_id, requirement_id in links:
+        by_application.setdefault(application_id, set()).add(requirement_id)
+    for application_id, requirement_ids in by_application.items():
+        refresh(session, application_id, requirement_ids)
+
+
+def links_for_documents(session, document_ids) -> list[tuple[str, str]]:
+    """(application_id, requirement_id) pairs a set of documents is linked to."""
+    document_ids = list(document_ids)
+    if not document_ids:
+        return []
+    return [
+        (row.application_id, row.requirements_id)
+        for row in session.query(AppDoc.application_id, AppDoc.requirements_id)
+        .filter(AppDoc.document_id.in_(document_ids))
+        .distinct()
+    ]
+
+
+def document_changed(session, document_id: str) -> None:
+    """check_ready or review status of a document changed."""
+    refresh_links(session, links_for_documents(session, [document_id]))
+
+
+def documents_of_data_changed(session, document_data_ids) -> None:
+    """Evaluation of document data rows changed (profile save, backfill)."""
+    document_ids = [
+        row.id
+        for row in session.query(DocumentORM.id).filter(DocumentORM.document_data_id.in_(list(document_data_ids)))
+    ]
+    refresh_links(session, links_for_documents(session, document_ids))
+
+
+#=== Reads
+
+def _as_readiness(row: ApplicationReadiness) -> Readiness:
+    return Readiness(
+        ready=bool(row.ready),
+        satisfied=row.satisfied,
+        required=row.required,
+        missing=tuple(row.missing or ()),
+        advice=tuple(row.advice or ()),
+    )
+
+
+def stored_readiness(session, application_ids) -> dict[str, Readiness]:
+    """
+    Stored readiness of applications. Applications without a row yet are
+    evaluated from their documents but not stored: filling rows is left to
+    the writers and scripts/backfill_readiness.py.
+    """
+    application_ids = list(application_ids)
+    if not application_ids:
+        return {}
+    rows = session.query(ApplicationReadiness).filter(ApplicationReadiness.application_id.in_(application_ids)).all()
+    found = {row.application_id: _as_readiness(row) for row in rows}
+    missing = [application_id for application_id in application_ids if application_id not in found]
+    if missing:
+        plans = load_plans(session, missing)
+        for application_id, plan in plans.items():
+            found[application_id] = _evaluate(plan, _counts(session, application_id))
+    return found
+
+
+def ready_application_ids(ready: bool = True):
+    """SELECT of application ids by stored readiness, for IN filters (uses the ready index)."""
+    return select(ApplicationReadiness.application_id).where(ApplicationReadiness.ready.is_(ready))
@@ -0,0 +1,244 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.review_queue
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Review queue: one row per document waiting for review (review_status
+# pending) in _review_queue, with a priority tier and the recruiter who
+# claimed it.
+#
+# readiness.refresh() calls sync_application() for every change it
+# records, so the queue follows uploads, reviews, deletes and relinks in the
+# same transaction. Priority tiers (lower first):
+#   0  waiting longer than REVIEW_SLA_HOURS, or the application is otherwise
+#      ready, so this review is what stands between it and a decision
+#   1  application misses at most CLOSE_TO_READY requirements
+#   2  everything else
+# Within a tier the oldest upload comes first. The listing pages with a
+# keyset cursor over (priority, queued_at, document_id), which the
+# ix_review_queue_priority_queued_at index serves directly.
+#
+# claim_next() hands each reviewer a different document: on PostgreSQL with
+# SELECT ... FOR UPDATE SKIP LOCKED, elsewhere with a conditional UPDATE
+# that only succeeds while the row is still unclaimed. Claims expire after
+# REVIEW_CLAIM_MINUTES. Neither the listing nor claiming escalates: rows
+# that age past the SLA move to tier 0 in escalate_overdue(), run on a
+# schedule by scripts/escalate_review_queue.py, so reviewer requests never
+# run a queue-wide UPDATE that waits on rows other claimers hold locked.
+
+#=== Imports
+
+import base64
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from backend.datamodule.orm import (
+    AppDoc,
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    File as FileORM,
+    ReviewQueueItem,
+)
+
+#=== Configuration
+
+REVIEW_SLA_HOURS = int(os.getenv("REVIEW_SLA_HOURS", "48"))
+REVIEW_CLAIM_MINUTES = int(os.getenv("REVIEW_CLAIM_MINUTES", "30"))
+CLOSE_TO_READY = 2
+CLAIM_ATTEMPTS = 5
+
+ORDER = (ReviewQueueItem.priority, ReviewQueueItem.queued_at, ReviewQueueItem.document_id)
+
+
+def _now() -> datetime:
+    # Naive UTC, like CURRENT_TIMESTAMP / func.now() in the other tables.
+    return datetime.utcnow()
+
+
+def priority_for(readiness, queued_at: datetime | None, now: datetime | None = None) -> int:
+    now = now or _now()
+    if queued_at is not None and queued_at < now - timedelta(hours=REVIEW_SLA_HOURS):
+        return 0
+    if readiness is None:
+        return 2
+    if readiness.ready:
+        return 0
+    return 1 if len(readiness.missing) <= CLOSE_TO_READY else 2
+
+
+#=== Maintenance
+
+def sync_application(session, application_id: str, readiness) -> None:
+    """Match the queue rows of an application to its pending documents (called by readiness.refresh)."""
+    pending = (
+        session.query(
+            AppDoc.document_id,
+            func.min(AppDoc.requirements_id).label("requirement_id"),
+            DocumentORM.user_id,
+            FileORM.uploaded_at,
+        )
+        .join(DocumentORM, AppDoc.document_id == DocumentORM.id)
+        .outerjoin(DocumentDataORM, DocumentORM.document_data_id == DocumentDataORM.id)
+        .outerjoin(FileORM, DocumentORM.file_id == FileORM.id)
+        .filter(
+            AppDoc.application_id == application_id,
+            func.coalesce(DocumentDataORM.review_status, "pending") == "pending",
+        )
+        .group_by(AppDoc.document_id, DocumentORM.user_id, FileORM.uploaded_at)
+        .all()
+    )
+    now = _now()
+    rows = [
+        {
+            "document_id": row.document_id,
+            "application_id": application_id,
+            "candidate_id": row.user_id,
+            "requirement_id": row.requirement_id,
+            "priority": priority_for(readiness, row.uploaded_at, now),
+            "queued_at": row.uploaded_at or now,
+        }
+        for row in pending
+    ]
+    session.query(ReviewQueueItem).filter(
+        ReviewQueueItem.application_id == application_id,
+        ReviewQueueItem.document_id.notin_([r["document_id"] for r in rows]),
+    ).delete(synchronize_session=False)
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(ReviewQueueItem).values(rows)
+    # queued_at and the claim survive re-prioritisation.
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["document_id"],
+            set_={c: stmt.excluded[c] for c in ("application_id", "candidate_id", "requirement_id", "priority")},
+        )
+    )
+
+
+def forget_application(session, application_id: str) -> None:
+    session.query(ReviewQueueItem).filter(ReviewQueueItem.application_id == application_id).delete(
+        synchronize_session=False
+    )
+
+
+def escalate_overdue(session) -> int:
+    """Move documents waiting past the SLA to tier 0 (their age changed, not their application)."""
+    cutoff = _now() - timedelta(hours=REVIEW_SLA_HOURS)
+    return (
+        session.query(ReviewQueueItem)
+        .filter(ReviewQueueItem.priority > 0, ReviewQueueItem.queued_at < cutoff)
+        .update({ReviewQueueItem.priority: 0}, synchronize_session=False)
+    )
+
+
+#=== Listing
+
+def encode_cursor(item: ReviewQueueItem) -> str:
+    raw = json.dumps([item.priority, item.queued_at.isoformat(), item.document_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        priority, queued_at, document_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(priority), datetime.fromisoformat(queued_at), str(document_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def page(session, *, after: str | None = None, limit: int = 50, claimed_by: str | None = None):
+    """(queue items, cursor of the next page or None) in priority order."""
+    query = session.query(ReviewQueueItem)
+    if claimed_by is not None:
+        query = query.filter(ReviewQueueItem.claimed_by == claimed_by)
+    position = decode_cursor(after)
+    if position is not None:
+        query = query.filter(tuple_(*ORDER) > tuple_(*position))
+    items = query.order_by(*ORDER).limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+
+def counts(session) -> dict[int, int]:
+    return dict(session.query(ReviewQueueItem.priority, func.count()).group_by(ReviewQueueItem.priority).all())
+
+
+#=== Claims
+
+def _claimable(now: datetime):
+    return or_(
+        ReviewQueueItem.claimed_by.is_(None),
+        ReviewQueueItem.claimed_at < now - timedelta(minutes=REVIEW_CLAIM_MINUTES),
+    )
+
+
+def claim_next(session, reviewer_id: str) -> str | None:
+    """Claim the most urgent unclaimed document for a reviewer; returns its id (or the reviewer's open claim)."""
+    now = _now()
+    own = (
+        session.query(ReviewQueueItem.document_id)
+        .filter(
+            ReviewQueueItem.claimed_by == reviewer_id,
+            ReviewQueueItem.claimed_at >= now - timedelta(minutes=REVIEW_CLAIM_MINUTES),
+        )
+        .order_by(*ORDER)
+        .first()
+    )
+    if own:
+        return own.document_id
+    candidates = session.query(ReviewQueueItem).filter(_claimable(now)).order_by(*ORDER)
+    if session.get_bind().dialect.name == "postgresql":
+        # Rows locked by concurrent claimers are skipped, not waited for.
+        item = candidates.with_for_update(skip_locked=True).first()
+        if item is None:
+            return None
+        item.claimed_by = reviewer_id
+        item.claimed_at = now
+        return item.document_id
+    # No row locks: claim with a conditional UPDATE and retry if another
+    # reviewer got there between the SELECT and the UPDATE.
+    for _ in range(CLAIM_ATTEMPTS):
+        row = candidates.with_entities(ReviewQueueItem.document_id).first()
+        if row is None:
+            return None
+        claimed = (
+            session.query(ReviewQueueItem)
+            .filter(ReviewQueueItem.document_id == row.document_id, _claimable(now))
+            .update({ReviewQueueItem.claimed_by: reviewer_id, ReviewQueueItem.claimed_at: now}, synchronize_session=False)
+        )
+        if claimed:
+            return row.document_id
+    return None
+
+
+def claim(session, document_id: str, reviewer_id: str) -> bool:
+    """Claim a given document unless another reviewer holds an active claim."""
+    now = _now()
+    updated = (
+        session.query(ReviewQueueItem)
+        .filter(
+            ReviewQueueItem.document_id == document_id,
+            or_(_claimable(now), ReviewQueueItem.claimed_by == reviewer_id),
+        )
+        .update({ReviewQueueItem.claimed_by: reviewer_id, ReviewQueueItem.claimed_at: now}, synchronize_session=False)
+    )
+    return bool(updated)
+
+
+def release(session, document_id: str, reviewer_id: str) -> bool:
+    updated = (
+        session.query(ReviewQueueItem)
+        .filter(ReviewQueueItem.document_id == document_id, ReviewQueueItem.claimed_by == reviewer_id)
+        .update({ReviewQueueItem.claimed_by: None, ReviewQueueItem.claimed_at: None}, synchronize_session=False)
+    )
+    return bool(updated)
@@ -0,0 +1,347 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.rules_engine
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Executes the declarative STATE_RULES[...]["rules"] blocks against the
+# requirements and documents of an application.
+#
+# compile_plan() turns a state's rules plus the application's requirement
+# rows and profession into a Plan: which requirements must each be
+# satisfied ("all"), which groups need at least one ("any"), and which
+# produce advice (translations, apostilles). Plans are cached per state,
+# profession and requirement set.
+#
+# An Evaluation keeps per-requirement document state; apply() updates one
+# document and re-runs only the checks that reference its requirement.
+# score_applications() evaluates many applications from two queries, for
+# the recruiter dashboard.
+
+#=== Imports
+
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+from backend.datamodule.orm import (
+    Application as ApplicationORM,
+    AppDoc,
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    Profession as ProfessionORM,
+    Requirement,
+    State as StateORM,
+)
+from backend.utils.state_rules import _normalize_state_to_code, get_state_ruleset
+
+logger = logging.getLogger(__name__)
+
+#=== Configuration
+
+# Requirement names (_requirements.name, case-insensitive) -> checklist keys
+# used in STATE_RULES. One requirement can stand for several keys.
+REQUIREMENT_KEYS = {
+    "id": ("id_document",),
+    "passport": ("id_document",),
+    "cv": ("cv",),
+    "qualificationcertificate": ("degree_certificates",),
+    "transcript": ("transcript",),
+    "professionalexperience": ("work_experience",),
+    "languagecertificate": ("language_certificates", "language_b2_pflege"),
+    "licenseregistration": ("license_registration",),
+    "goodstanding": ("good_standing",),
+    "apostille": ("apostille_legalization",),
+    "namechange": ("name_change",),
+}
+
+# Flags referenced by conditional rules, per profession name (case-insensitive).
+PROFESSION_FLAGS = {
+    "nurse": frozenset({"profession_requires_language_level"}),
+    "pflegefachkraft": frozenset({"profession_requires_language_level"}),
+    "physician": frozenset({"profession_requires_language_level", "requires_apostille"}),
+    "doctor": frozenset({"profession_requires_language_level", "requires_apostille"}),
+}
+
+ALL, ANY = "all", "any"
+
+
+#=== Plan
+
+@dataclass(frozen=True)
+class RequirementSpec:
+    id: str
+    name: str
+    optional: bool = False
+    translation_required: bool = False
+
+
+@dataclass(frozen=True)
+class Check:
+    rule: str
+    kind: str  # ALL: every requirement needs a document; ANY: one of them does
+    requirement_ids: frozenset
+
+
+@dataclass(frozen=True)
+class Readiness:
+    ready: bool
+    satisfied: int
+    required: int
+    missing: tuple
+    advice: tuple
+
+    @property
+    def score(self) -> int:
+        return 100 if not self.required else round(100 * self.satisfied / self.required)
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "score": self.score,
+            "satisfied": self.satisfied,
+            "required": self.required,
+            "missing": list(self.missing),
+            "advice": list(self.advice),
+        }
+
+
+class Plan:
+    def __init__(self, state_code: str | None, requirements: tuple, checks: tuple, advice: dict):
+        self.state_code = state_code
+        self.requirements = {r.id: r for r in requirements}
+        self.checks = checks
+        # requirement id -> advice text, shown once a document is linked
+        self.advice = advice
+        self.checks_for: dict[str, tuple[int, ...]] = {}
+        for index, check in enumerate(checks):
+            for rid in check.requirement_ids:
+                self.checks_for[rid] = self.checks_for.get(rid, ()) + (index,)
+        # Units counted for the score: one per ALL requirement, one per ANY group.
+        self.units = sum(len(c.requirement_ids) if c.kind == ALL else 1 for c in checks)
+
+    def label(self, check: Check, rid: str | None = None) -> str:
+        if rid is not None:
+            return self.requirements[rid].name
+        return " or ".join(sorted(self.requirements[r].name for r in check.requirement_ids))
+
+
+def _keys_to_ids(keys, by_key: dict) -> frozenset:
+    ids = set()
+    for key in keys or ():
+        ids |= by_key.get(key, set())
+    return frozenset(ids)
+
+
+@lru_cache(maxsize=256)
+def compile_plan(state_code: str | None, profession: str | None, requirements: tuple) -> Plan:
+    """Evaluation plan for a state, profession and tuple of RequirementSpec (cached)."""
+    rules = (get_state_ruleset(state_code) or {}).get("rules", {}) if state_code else {}
+    flags = PROFESSION_FLAGS.get((profession or "").strip().casefold(), frozenset())
+
+    by_key: dict[str, set] = {}
+    for spec in requirements:
+        for key in REQUIREMENT_KEYS.get(spec.name.strip().casefold(), ()):
+            by_key.setdefault(key, set()).add(spec.id)
+
+    required = {r.id for r in requirements if not r.optional}
+    checks = []
+    advice = {}
+    for rule, value in rules.items():
+        if rule == "at_least_one_id":
+            ids = _keys_to_ids(value, by_key)
+            if ids:
+                required -= ids
+                checks.append(Check(rule, ANY, ids))
+        elif rule == "require_language_b2":
+            required |= _keys_to_ids(value, by_key)
+        elif rule == "require_language_if_profession_demands":
+            ids = _keys_to_ids(value.get("keys"), by_key)
+            if value.get("flag") in flags:
+                required |= ids
+            else:
+                required -= ids
+        elif rule == "must_translate_if_not_de":
+            for rid in _keys_to_ids(value, by_key):
+                advice[rid] = "certified translation needed unless issued in German"
+        elif rule == "require_apostille_if_flag":
+            if value.get("flag") in flags:
+                for rid in _keys_to_ids(value.get("keys"), by_key):
+                    advice[rid] = "apostille or legalization required"
+        else:
+            logger.warning("Unknown rule %r for state %s ignored", rule, state_code)
+    for spec in requirements:
+        if spec.translation_required and spec.id not in advice:
+            advice[spec.id] = "certified translation needed unless issued in German"
+    if required:
+        checks.append(Check("required", ALL, frozenset(required)))
+    return Plan(state_code, requirements, tuple(checks), advice)
+
+
+def clear_plans() -> None:
+    """Forget compiled plans (after editing STATE_RULES or requirements)."""
+    compile_plan.cache_clear()
+
+
+def state_code_for(name: str | None, abbreviation: str | None) -> str | None:
+    """STATE_RULES code for a _states row ("DE-BY" / "Bavaria" -> "BY")."""
+    for candidate in ((abbreviation or "").rsplit("-", 1)[-1], name):
+        code, _ = _normalize_state_to_code(candidate or "")
+        if code:
+            return code
+    return None
+
+
+#=== Evaluation
+
+class Evaluation:
+    """Readiness of one application, updated document by document."""
+
+    def __init__(self, plan: Plan):
+        self.plan = plan
+        # requirement id -> {document id: satisfied}
+        self._documents: dict[str, dict[str, bool]] = {}
+        self._satisfied: set[str] = set()
+        self._missing: dict[int, tuple] = {}
+        for index in range(len(plan.checks)):
+            self._run(index)
+
+    def apply(self, requirement_id: str, document_id: str, satisfied: bool | None) -> Readiness:
+        """Record a document change (satisfied=None: unlinked) and re-run affected checks."""
+        if requirement_id not in self.plan.requirements:
+            return self.result()
+        docs = self._documents.setdefault(requirement_id, {})
+        if satisfied is None:
+            docs.pop(document_id, None)
+        else:
+            docs[document_id] = bool(satisfied)
+        was = requirement_id in self._satisfied
+        now = any(docs.values())
+        if now != was:
+            if now:
+                self._satisfied.add(requirement_id)
+            else:
+                self._satisfied.discard(requirement_id)
+            for index in self.plan.checks_for.get(requirement_id, ()):
+                self._run(index)
+        return self.result()
+
+    def _run(self, index: int) -> None:
+        check = self.plan.checks[index]
+        if check.kind == ALL:
+            self._missing[index] = tuple(sorted(check.requirement_ids - self._satisfied))
+        else:
+            self._missing[index] = () if check.requirement_ids & self._satisfied else (None,)
+
+    def result(self) -> Readiness:
+        missing = []
+        unmet = 0
+        for index, ids in self._missing.items():
+            check = self.plan.checks[index]
+            unmet += len(ids)
+            missing.extend(self.plan.label(check, rid) for rid in ids)
+        advice = tuple(
+            f"{self.plan.requirements[rid].name}: {text}"
+            for rid, text in sorted(self.plan.advice.items(), key=lambda item: self.plan.requirements[item[0]].name)
+            if self._documents.get(rid)
+        )
+        return Readiness(
+            ready=bool(self.plan.checks) and not unmet,
+            satisfied=self.plan.units - unmet,
+            required=self.plan.units,
+            missing=tuple(sorted(missing)),
+            advice=advice,
+        )
+
+
+def document_satisfies(check_ready, review_status) -> bool:
+    return bool(check_ready) and (review_status or "pending") != "declined"
+
+
+def evaluate(plan: Plan, documents) -> Evaluation:
+    """Full evaluation from dicts with requirements_id, document_id, check_ready, review_status."""
+    evaluation = Evaluation(plan)
+    for doc in documents:
+        if doc.get("document_id"):
+            evaluation.apply(
+                doc["requirements_id"],
+                doc["document_id"],
+                document_satisfies(doc.get("check_ready"), doc.get("review_status")),
+            )
+    return evaluation
+
+
+#=== Database access
+
+def load_plans(session, application_ids=None) -> dict[str, Plan]:
+    """Plan of each application (all when application_ids is None), from two queries."""
+    apps = (
+        session.query(
+            ApplicationORM.id,
+            StateORM.name.label("state_name"),
+            StateORM.abbreviation,
+            ProfessionORM.name.label("profession_name"),
+        )
+        .join(StateORM, ApplicationORM.state_id == StateORM.id, isouter=True)
+        .join(ProfessionORM, ApplicationORM.profession_id == ProfessionORM.id, isouter=True)
+    )
+    links = (
+        session.query(
+            AppDoc.application_id,
+            Requirement.id,
+            Requirement.name,
+            Requirement.optional,
+            Requirement.translation_required,
+        )
+        .join(Requirement, AppDoc.requirements_id == Requirement.id)
+        .distinct()
+    )
+    if application_ids is not None:
+        apps = apps.filter(ApplicationORM.id.in_(application_ids))
+        links = links.filter(AppDoc.application_id.in_(application_ids))
+    specs: dict[str, list] = {}
+    for row in links.all():
+        specs.setdefault(row.application_id, []).append(
+            RequirementSpec(row.id, row.name or "", bool(row.optional), bool(row.translation_required))
+        )
+    plans = {}
+    for app in apps.all():
+        requirements = tuple(sorted(specs.get(app.id, ()), key=lambda spec: spec.id))
+        plans[app.id] = compile_plan(state_code_for(app.state_name, app.abbreviation), app.profession_name, requirements)
+    return plans
+
+
+def score_applications(session, application_ids=None) -> dict[str, Readiness]:
+    """Readiness of many applications (all when application_ids is None) in one pass."""
+    if application_ids is not None:
+        application_ids = list(application_ids)
+        if not application_ids:
+            return {}
+    plans = load_plans(session, application_ids)
+    documents = (
+        session.query(
+            AppDoc.application_id,
+            AppDoc.requirements_id,
+            AppDoc.document_id,
+            DocumentDataORM.check_ready,
+            DocumentDataORM.review_status,
+        )
+        .join(DocumentORM, AppDoc.document_id == DocumentORM.id)
+        .join(DocumentDataORM, DocumentORM.document_data_id == DocumentDataORM.id, isouter=True)
+    )
+    if application_ids is not None:
+        documents = documents.filter(AppDoc.application_id.in_(application_ids))
+
+    evaluations = {app_id: Evaluation(plan) for app_id, plan in plans.items()}
+    for row in documents.all():
+        evaluation = evaluations.get(row.application_id)
+        if evaluation is not None:
+            evaluation.apply(
+                row.requirements_id, row.document_id, document_satisfies(row.check_ready, row.review_status)
+            )
+    return {app_id: evaluation.result() for app_id, evaluation in evaluations.items()}
+
+
+def evaluate_application(session, application_id: str) -> Readiness | None:
+    return score_applications(session, [application_id]).get(application_id)
@@ -0,0 +1,119 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        services.validation_issues
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Validation issues as rows: the evaluator's messages in
+# _document_datas.validation_errors ({"errors": ["passport_number is
+# invalid", ...]}) are also stored in _validation_issues, one row per
+# document data, field and code. Every writer of validation_errors replaces
+# them along with it: DocumentData.issues in the DocumentData model,
+# document_evaluation.store_evaluation and the upload pipeline, and a
+# delete / insert per batch in scripts/revalidate_documents.py. Code that
+# updates validation_errors directly has to do the same. They are deleted
+# with their document data.
+#
+# recurring_issues() counts affected documents per field and code in the
+# database (optionally per document type or state), over the
+# ix_validation_issues_code_field index instead of decoding JSON in Python.
+
+#=== Imports
+
+import re
+
+from sqlalchemy import func
+
+from backend.datamodule.orm import (
+    AppDoc,
+    Application as ApplicationORM,
+    Document as DocumentORM,
+    DocumentType,
+    ValidationIssue,
+)
+
+#=== Issue Codes
+
+# Message shapes produced by document_evaluation.DocumentEvaluator.
+ISSUE_RE = re.compile(
+    r"(?P<field>\w+) (?:(?P<missing>is missing)|(?P<invalid>is invalid)"
+    r"|(?P<expired>must be in the future)|(?P<name_mismatch>is required when last name differs from profile))$"
+)
+ISSUE_CODES = ("missing", "invalid", "expired", "name_mismatch")
+OTHER = "other"
+
+GROUPINGS = ("field", "document_type", "state")
+
+
+def parse_issue(message: str) -> tuple[str, str]:
+    """(field, code) of an evaluator message; unknown shapes become (first word, "other")."""
+    match = ISSUE_RE.match(message)
+    if match is None:
+        return (message.split(" ", 1)[0] or OTHER)[:100], OTHER
+    code = next(name for name in ISSUE_CODES if match.group(name))
+    return match.group("field"), code
+
+
+def issue_rows(validation_errors: dict | None) -> list[ValidationIssue]:
+    """ValidationIssue rows for a validation_errors value (for DocumentData.issues)."""
+    rows = {}
+    for message in (validation_errors or {}).get("errors") or ():
+        key = parse_issue(str(message))
+        if key not in rows:
+            rows[key] = ValidationIssue(field=key[0], code=key[1], message=str(message))
+    return list(rows.values())
+
+
+#=== Reports
+
+def recurring_issues(
+    session,
+    *,
+    by: str = "field",
+    state_id=None,
+    profession_id=None,
+    document_type_id=None,
+    limit: int = 20,
+) -> list[dict]:
+    """Most frequent (field, code) issues by number of documents, optionally per document type or state."""
+    if by not in GROUPINGS:
+        raise ValueError(f"Unknown grouping {by!r}")
+    documents = func.count(func.distinct(ValidationIssue.document_data_id))
+    keys = []
+    query = session.query(ValidationIssue)
+    if by != "field" or state_id or profession_id or document_type_id:
+        query = query.join(DocumentORM, DocumentORM.document_data_id == ValidationIssue.document_data_id)
+    if by == "document_type":
+        query = query.outerjoin(DocumentType, DocumentORM.document_type_id == DocumentType.id)
+        keys += [DocumentORM.document_type_id.label("group_id"), DocumentType.name.label("group_name")]
+    if by == "state" or state_id or profession_id:
+        query = query.join(AppDoc, AppDoc.document_id == DocumentORM.id).join(
+            ApplicationORM, AppDoc.application_id == ApplicationORM.id
+        )
+    if by == "state":
+        keys.append(ApplicationORM.state_id.label("group_id"))
+    if state_id:
+        query = query.filter(ApplicationORM.state_id == state_id)
+    if profession_id:
+        query = query.filter(ApplicationORM.profession_id == profession_id)
+    if document_type_id:
+        query = query.filter(DocumentORM.document_type_id == document_type_id)
+    keys += [ValidationIssue.field, ValidationIssue.code]
+    rows = (
+        query.with_entities(*keys, documents.label("documents"))
+        .group_by(*keys)
+        .order_by(documents.desc(), *keys)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "group_id": getattr(row, "group_id", None),
+            "group_name": getattr(row, "group_name", None),
+            "field": row.field,
+            "code": row.code,
+            "documents": int(row.documents),
+        }
+        for row in rows
+    ]
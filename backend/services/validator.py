@@ -8,16 +8,20 @@
 #=== Imports
 
 import re
+import threading
+from bisect import bisect_right
 
 #=== Canonical Document Keywords
 
 CANONICAL_DOCS = {
     "Passport": ["passport", "pass", "reiseausweis"],
+    "ID Card": ["id card", "id_card", "identity card", "personalausweis"],
     "Nursing Diploma": ["diploma", "degree", "nurse_certificate"],
     "Diploma Transcript": ["transcript", "marksheet", "course_list"],
     "License/Registration": ["license", "registration", "reg", "prc"],
     "Birth Certificate": ["birth", "geburtsurkunde"],
     "CV (German)": ["cv", "lebenslauf"],
+    "Work Experience": ["work reference", "work_reference", "arbeitszeugnis", "employment certificate"],
     "Proof of Language B2": ["b2", "sprachzertifikat"],
     "Proof of Language B2 Pflege": ["b2_pflege", "pflege_b2", "sprachzertifikat_pflege"],
     "Good Standing Certificate": ["good_standing", "gsc"],
@@ -26,19 +30,118 @@ CANONICAL_DOCS = {
 }
 
 
+# Extra keywords per Bundesland (STATE_RULES code), merged over
+# CANONICAL_DOCS by matcher_for(state). Add packs with register_keyword_pack.
+KEYWORD_PACKS = {
+    "BY": {
+        "Proof of Language B2 Pflege": ["fachsprachpruefung", "fachsprachprüfung", "fsp"],
+        "Good Standing Certificate": ["unbedenklichkeitsbescheinigung"],
+    },
+    "NW": {
+        "Proof of Language B2 Pflege": ["fachsprachpruefung", "fachsprachprüfung", "fsp"],
+        "Good Standing Certificate": ["unbedenklichkeitsbescheinigung"],
+    },
+    "BE": {
+        "Certified Translations": ["beglaubigte_uebersetzung"],
+    },
+}
+
+
+#=== Compiled Matcher
+
+class KeywordMatcher:
+    """
+    All keywords of a canonical-doc mapping in one compiled alternation.
+    A keyword matches as a whole word (regex \b on both sides, as before);
+    where several keywords start at the same position the longest one wins.
+    """
+
+    def __init__(self, canonical_docs: dict):
+        self.keyword_to_docs: dict[str, set] = {}
+        for canon, keywords in canonical_docs.items():
+            for kw in keywords:
+                self.keyword_to_docs.setdefault(kw.lower(), set()).add(canon)
+        alternation = "|".join(re.escape(kw) for kw in sorted(self.keyword_to_docs, key=len, reverse=True))
+        # Zero-width lookahead so overlapping keywords at different positions all match.
+        self.pattern = re.compile(rf"(?=\b({alternation})\b)") if alternation else None
+
+    def classify(self, filenames) -> list[set]:
+        """Canonical documents per filename, in one scan over all of them."""
+        names = [f.lower() for f in filenames]
+        results = [set() for _ in names]
+        if self.pattern is None or not names:
+            return results
+        text = "\n".join(names)
+        starts = []
+        offset = 0
+        for name in names:
+            starts.append(offset)
+            offset += len(name) + 1
+        for match in self.pattern.finditer(text):
+            results[bisect_right(starts, match.start()) - 1] |= self.keyword_to_docs[match.group(1)]
+        return results
+
+    def present(self, filenames) -> set:
+        found = set()
+        for docs in self.classify(filenames):
+            found |= docs
+        return found
+
+
+_matchers: dict = {}
+_matchers_lock = threading.Lock()
+
+
+def _state_code(state: str | None) -> str | None:
+    if not state:
+        return None
+    from backend.utils.state_rules import _normalize_state_to_code
+
+    code, _ = _normalize_state_to_code(state)
+    return code
+
+
+def matcher_for(state: str | None = None) -> KeywordMatcher:
+    """Compiled matcher for CANONICAL_DOCS plus the state's keyword pack (cached)."""
+    code = _state_code(state)
+    if code not in KEYWORD_PACKS:
+        code = None
+    matcher = _matchers.get(code)
+    if matcher is None:
+        docs = {canon: list(keywords) for canon, keywords in CANONICAL_DOCS.items()}
+        for canon, keywords in KEYWORD_PACKS.get(code, {}).items():
+            docs.setdefault(canon, []).extend(keywords)
+        matcher = KeywordMatcher(docs)
+        with _matchers_lock:
+            _matchers[code] = matcher
+    return matcher
+
+
+def register_keyword_pack(state: str, pack: dict) -> None:
+    """Add keywords for a state (merged with an existing pack) and drop compiled matchers."""
+    code = _state_code(state) or state
+    merged = KEYWORD_PACKS.setdefault(code, {})
+    for canon, keywords in pack.items():
+        merged.setdefault(canon, []).extend(keywords)
+    with _matchers_lock:
+        _matchers.clear()
+
+
 #=== Document Inference Function
 
-def infer_present_docs(filenames):
+def infer_present_docs(filenames, state=None):
     """
     Infers which canonical documents are present based on filenames.
     :param filenames: List of uploaded filenames
+    :param state: Optional state (code or name) whose keyword pack is added
     :return: Set of canonical document names inferred from filenames
     """
-    present = set()
-    lower_files = [f.lower() for f in filenames]
-    for canon, keywords in CANONICAL_DOCS.items():
-        for kw in keywords:
-            if any(re.search(rf"\b{re.escape(kw)}\b", f) for f in lower_files):
-                present.add(canon)
-                break
-    return present
+    return matcher_for(state).present(filenames)
+
+
+def classify_filenames(filenames, state=None):
+    """
+    Canonical documents per filename, e.g. for a bulk upload.
+    :return: List of sets, one per filename, in input order
+    """
+    return matcher_for(state).classify(filenames)
@@ -1,7 +1,48 @@
 import os
+import threading
+import time
+from collections import deque
 from urllib.parse import urlparse
 
-import boto3
+from backend.utils.ttl_cache import TTLCache
+
+# One S3 client per process, created on first use. botocore clients are
+# thread-safe and building one (loading service models) costs tens of
+# milliseconds, so it is shared by all request threads. The client is tied
+# to the pid it was built in: a forked worker builds its own.
+#
+# DOCS_S3_ENDPOINT_URL points the client at an S3 stand-in (moto server,
+# MinIO); tests running under moto's mock_aws call reset_client() first.
+#
+# boto3/botocore are imported on first use: they add ~150 ms to worker boot
+# and most requests never touch S3.
+
+_MAX_POOL = int(os.getenv("DOCS_S3_MAX_POOL", "16"))
+
+# Files above the threshold go up as a multipart upload, read from disk part
+# by part instead of being loaded into memory.
+_MULTIPART_MB = int(os.getenv("DOCS_S3_MULTIPART_MB", "8"))
+_UPLOAD_CONCURRENCY = int(os.getenv("DOCS_S3_UPLOAD_CONCURRENCY", "4"))
+
+# Presigned URLs are cached per (uri, disposition, expiry). An entry is dropped
+# PRESIGN_MIN_REMAINING seconds before its signature expires, so a cached
+# link always stays valid at least that long after it is handed out.
+PRESIGN_EXPIRES = int(os.getenv("DOCS_S3_PRESIGN_EXPIRES", "3600"))
+PRESIGN_MIN_REMAINING = int(os.getenv("DOCS_S3_PRESIGN_MIN_REMAINING", "300"))
+# A link also stops working when temporary signing credentials (STS, instance
+# or task role) expire. botocore refreshes those while at least ten minutes
+# are left, so links signed with them are cached for at most this long.
+PRESIGN_TEMPORARY_TTL = int(os.getenv("DOCS_S3_PRESIGN_TEMPORARY_TTL", "300"))
+_presign_cache = TTLCache(
+    maxsize=int(os.getenv("DOCS_S3_PRESIGN_CACHE_SIZE", "4096")),
+    ttl=max(PRESIGN_EXPIRES - PRESIGN_MIN_REMAINING, 0),
+)
+
+_client_lock = threading.Lock()
+_cached_client = None
+_cached_session = None
+_cached_pid = None
+_transfer_config = None
 
 
 def _bucket() -> str | None:
@@ -15,11 +56,116 @@ def _prefix() -> str:
     return prefix
 
 
-def _client():
+def _build_client():
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=_MAX_POOL,
+        connect_timeout=float(os.getenv("DOCS_S3_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("DOCS_S3_READ_TIMEOUT", "60")),
+        retries={"max_attempts": int(os.getenv("DOCS_S3_MAX_ATTEMPTS", "3")), "mode": "standard"},
+    )
+    kwargs = {"config": config}
     region = os.getenv("AWS_REGION")
     if region:
-        return boto3.client("s3", region_name=region)
-    return boto3.client("s3")
+        kwargs["region_name"] = region
+    endpoint_url = os.getenv("DOCS_S3_ENDPOINT_URL")
+    if endpoint_url:
+        kwargs["endpoint_url"] = endpoint_url
+    # A private session: the default boto3 session is not thread-safe.
+    session = boto3.session.Session()
+    return session, session.client("s3", **kwargs)
+
+
+def _client():
+    global _cached_client, _cached_session, _cached_pid
+    if _cached_client is None or _cached_pid != os.getpid():
+        with _client_lock:
+            if _cached_client is None or _cached_pid != os.getpid():
+                _cached_session, _cached_client = _build_client()
+                _cached_pid = os.getpid()
+    return _cached_client
+
+
+def _transfer():
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+
+        _transfer_config = TransferConfig(
+            multipart_threshold=_MULTIPART_MB * 1024 * 1024,
+            multipart_chunksize=_MULTIPART_MB * 1024 * 1024,
+            # Each part holds a pooled connection; stay below the pool size.
+            max_concurrency=min(_UPLOAD_CONCURRENCY, _MAX_POOL),
+        )
+    return _transfer_config
+
+
+def reset_client() -> None:
+    """Drop the cached client; the next call builds a new one (tests, config changes)."""
+    global _cached_client, _cached_session, _cached_pid
+    with _client_lock:
+        _cached_client = None
+        _cached_session = None
+        _cached_pid = None
+
+
+#=== Upload metrics (per process)
+
+class _UploadMetrics:
+    def __init__(self, window: int = 512):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def record(self, elapsed: float, size: int, ok: bool) -> None:
+        with self._lock:
+            if not ok:
+                self.errors += 1
+                return
+            self.count += 1
+            self.bytes += size
+            self.seconds += elapsed
+            self._latencies.append(elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._latencies)
+            count, errors, total_bytes, seconds = self.count, self.errors, self.bytes, self.seconds
+
+        def pct(p: float) -> float | None:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 1)
+
+        return {
+            "uploads": count,
+            "errors": errors,
+            "bytes": total_bytes,
+            "mean_ms": round(seconds / count * 1000, 1) if count else None,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+            "mb_per_s": round(total_bytes / seconds / 1e6, 2) if seconds else None,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latencies.clear()
+            self.count = self.errors = self.bytes = 0
+            self.seconds = 0.0
+
+
+upload_metrics = _UploadMetrics()
+
+
+def upload_stats() -> dict:
+    """Upload count, error count, bytes and latency percentiles of recent uploads."""
+    return upload_metrics.snapshot()
 
 
 def is_s3_uri(path: str | None) -> bool:
@@ -33,24 +179,108 @@ def build_s3_key(filename: str, *, user_id: str | None = None) -> str:
     return f"{base}{filename}"
 
 
+def _timed_upload(size: int, upload) -> None:
+    started = time.perf_counter()
+    try:
+        upload()
+    except Exception:
+        upload_metrics.record(time.perf_counter() - started, size, ok=False)
+        raise
+    upload_metrics.record(time.perf_counter() - started, size, ok=True)
+
+
 def upload_bytes(file_bytes: bytes, filename: str, *, user_id: str | None = None) -> str | None:
     bucket = _bucket()
     if not bucket:
         return None
     key = build_s3_key(filename, user_id=user_id)
     client = _client()
-    client.put_object(Bucket=bucket, Key=key, Body=file_bytes)
+    _timed_upload(len(file_bytes), lambda: client.put_object(Bucket=bucket, Key=key, Body=file_bytes))
     return f"s3://{bucket}/{key}"
 
 
-def presign_url(s3_uri: str, *, expires: int = 3600, inline: bool = True) -> str | None:
-    if not is_s3_uri(s3_uri):
+def upload_file(path: str, filename: str, *, user_id: str | None = None, content_type: str | None = None) -> str | None:
+    bucket = _bucket()
+    if not bucket:
         return None
-    parsed = urlparse(s3_uri)
-    bucket = parsed.netloc
-    key = parsed.path.lstrip("/")
+    key = build_s3_key(filename, user_id=user_id)
+    upload_file_to(bucket, key, path, content_type=content_type)
+    return f"s3://{bucket}/{key}"
+
+
+def upload_file_to(bucket: str, key: str, path: str, *, content_type: str | None = None) -> None:
     client = _client()
-    params = {"Bucket": bucket, "Key": key}
+    extra_args = {"ContentType": content_type} if content_type else None
+    _timed_upload(
+        os.path.getsize(path),
+        lambda: client.upload_file(path, bucket, key, ExtraArgs=extra_args, Config=_transfer()),
+    )
+
+
+def upload_fileobj_to(bucket: str, key: str, fileobj, *, content_type: str | None = None) -> None:
+    client = _client()
+    extra_args = {"ContentType": content_type} if content_type else None
+    # Size is unknown up front for streams; record 0 bytes.
+    _timed_upload(
+        0, lambda: client.upload_fileobj(fileobj, bucket, key, ExtraArgs=extra_args, Config=_transfer())
+    )
+
+
+def _temporary_credentials() -> bool:
+    """Whether the client signs with temporary credentials (they carry a session token)."""
+    credentials = _cached_session.get_credentials() if _cached_session is not None else None
+    return bool(credentials is not None and credentials.get_frozen_credentials().token)
+
+
+def _sign(client, s3_uri: str, expires: int, inline: bool) -> str:
+    parsed = urlparse(s3_uri)
+    params = {"Bucket": parsed.netloc, "Key": parsed.path.lstrip("/")}
     if inline:
         params["ResponseContentDisposition"] = "inline"
     return client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+
+def _cache_ttl(expires: int) -> float:
+    ttl = expires - PRESIGN_MIN_REMAINING
+    if _temporary_credentials():
+        ttl = min(ttl, PRESIGN_TEMPORARY_TTL)
+    return ttl
+
+
+def presign_url(s3_uri: str, *, expires: int = PRESIGN_EXPIRES, inline: bool = True) -> str | None:
+    if not is_s3_uri(s3_uri):
+        return None
+    cache_key = (s3_uri, inline, expires)
+    url = _presign_cache.get(cache_key)
+    if url is None:
+        client = _client()
+        url = _sign(client, s3_uri, expires, inline)
+        _presign_cache.set(cache_key, url, ttl=_cache_ttl(expires))
+    return url
+
+
+def presign_urls(s3_uris, *, expires: int = PRESIGN_EXPIRES, inline: bool = True) -> dict[str, str]:
+    """Presign many URIs in one pass (cache hits are reused); non-S3 URIs are skipped."""
+    urls = {}
+    client = None
+    ttl = None
+    for s3_uri in s3_uris:
+        if not is_s3_uri(s3_uri) or s3_uri in urls:
+            continue
+        cache_key = (s3_uri, inline, expires)
+        url = _presign_cache.get(cache_key)
+        if url is None:
+            if client is None:
+                client = _client()
+                ttl = _cache_ttl(expires)
+            url = _sign(client, s3_uri, expires, inline)
+            _presign_cache.set(cache_key, url, ttl=ttl)
+        urls[s3_uri] = url
+    return urls
+
+
+def forget_presigned(s3_uris) -> None:
+    """Drop every cached link of the URIs, whatever the disposition or expiry, e.g. after the objects were deleted."""
+    uris = set(s3_uris)
+    if uris:
+        _presign_cache.discard_where(lambda key: key[0] in uris)
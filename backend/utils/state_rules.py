@@ -481,47 +481,236 @@ STATE_RULES["BY"] = {
 # Fallback helpers: prefer STATE_RULES; otherwise use STATE_CHECKLISTS
 # ---------------------------------------------------------------------------
 
+import threading
 from typing import Dict, List, Optional, Tuple
 
+# All 16 Bundesländer: code -> (German name, English name, extra aliases).
+# Lookups are case- and umlaut-insensitive ("thueringen", "THÜRINGEN") and
+# ignore spaces, dashes and dots ("Nordrhein Westfalen", "N.R.W.").
+LAENDER: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "BW": ("Baden-Württemberg", "Baden-Wuerttemberg", ()),
+    "BY": ("Bayern", "Bavaria", ()),
+    "BE": ("Berlin", "Berlin", ()),
+    "BB": ("Brandenburg", "Brandenburg", ()),
+    "HB": ("Bremen", "Bremen", ("Freie Hansestadt Bremen",)),
+    "HH": ("Hamburg", "Hamburg", ("Freie und Hansestadt Hamburg",)),
+    "HE": ("Hessen", "Hesse", ()),
+    "MV": ("Mecklenburg-Vorpommern", "Mecklenburg-Western Pomerania", ()),
+    "NI": ("Niedersachsen", "Lower Saxony", ()),
+    "NW": ("Nordrhein-Westfalen", "North Rhine-Westphalia", ("NRW",)),
+    "RP": ("Rheinland-Pfalz", "Rhineland-Palatinate", ()),
+    "SL": ("Saarland", "Saarland", ()),
+    "SN": ("Sachsen", "Saxony", ("Freistaat Sachsen",)),
+    "ST": ("Sachsen-Anhalt", "Saxony-Anhalt", ()),
+    "SH": ("Schleswig-Holstein", "Schleswig-Holstein", ()),
+    "TH": ("Thüringen", "Thuringia", ()),
+}
+
 # Common aliases so callers can pass "Berlin", "BE", "NRW", etc.
 # Not neccessary for ui because of dropdown, but useful for backend calls.
-# TODO: Add more aliases as needed
-
-STATE_ALIASES: Dict[str, str] = {
-    # Berlin
-    "BE": "BE", "Berlin": "BE",
-    # Bavaria / Bayern (prepared for future expansion)
-    "BY": "BY", "Bavaria": "BY", "Bayern": "BY",
-    # North Rhine-Westphalia / NRW (prepared for future expansion)
-    "NW": "NW", "NRW": "NW", "North Rhine-Westphalia": "NW", "Nordrhein-Westfalen": "NW",
-}
+STATE_ALIASES: Dict[str, str] = {}
+for _code, (_de, _en, _extra) in LAENDER.items():
+    for _alias in (_code, _de, _en, *_extra):
+        STATE_ALIASES[_alias] = _code
+del _code, _de, _en, _extra, _alias
+
+# Shortest prefix accepted as an abbreviation ("Meck", "Schlesw").
+MIN_PREFIX = 4
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+
+def _fold(text: str) -> str:
+    """Lookup key: case-folded, umlauts spelled out, letters and digits only."""
+    folded = text.casefold().translate(_UMLAUTS)
+    return "".join(ch for ch in folded if ch.isalnum())
+
+
+class _FrozenDict(dict):
+    """Read-only dict; still a dict, so jsonify and Jinja handle it as usual."""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("state rules payloads are read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __hash__(self):
+        return id(self)
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _AliasTrie:
+    """Character trie over folded aliases; resolves exact names and unique prefixes."""
+
+    _END = ""
+
+    def __init__(self):
+        self._root: dict = {}
+
+    def add(self, alias: str, target: str) -> None:
+        node = self._root
+        for ch in alias:
+            node = node.setdefault(ch, {})
+        node[self._END] = target
+
+    def lookup(self, key: str) -> Optional[str]:
+        node = self._root
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return None
+        if self._END in node:
+            return node[self._END]
+        if len(key) < MIN_PREFIX:
+            return None
+        targets = set()
+        stack = [node]
+        while stack and len(targets) < 2:
+            current = stack.pop()
+            for ch, child in current.items():
+                if ch == self._END:
+                    targets.add(child)
+                else:
+                    stack.append(child)
+        # An ambiguous prefix ("Sachs" -> SN or ST) resolves to nothing.
+        return targets.pop() if len(targets) == 1 else None
+
+
+def _build_sections(rules: dict) -> list:
+    sections_cfg = rules.get("sections", [])
+    by_section: Dict[str, List[dict]] = {s["key"]: [] for s in sections_cfg}
+    for item in rules.get("checklist", []):
+        by_section.setdefault(item["section"], []).append({
+            "key": item.get("key"),
+            "label": item.get("label"),
+            "required": bool(item.get("required", False)),
+        })
+    # Preserve declared order of sections
+    return [
+        {"key": s["key"], "title": s["title"], "items": by_section.get(s["key"], [])}
+        for s in sections_cfg
+    ]
+
+
+def _checklist_sections(labels: List[str]) -> list:
+    return [{
+        "key": "checklist",
+        "title": "Checklist",
+        "items": [
+            {"key": f"item_{i+1}", "label": label, "required": True}
+            for i, label in enumerate(labels)
+        ],
+    }]
+
+
+class RulesIndex:
+    """
+    STATE_RULES and STATE_CHECKLISTS compiled for lookups:
+      - folded aliases of all Länder, rule codes/labels and checklist labels
+        in one trie, so normalising a state name is a single walk;
+      - the UI payload and flat label list of every state, built once and
+        frozen, so rendering a checklist is a dict lookup.
+    Targets are either a state code ("BE") or "label:<checklist label>" for
+    checklists that no Land alias points to.
+    """
+
+    def __init__(self, rules: dict, checklists: dict):
+        self.trie = _AliasTrie()
+        self.labels: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.payloads: Dict[Tuple[str, str], dict] = {}
+        self.default_locale: Dict[str, str] = {}
+        self.flat: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+        for alias, code in STATE_ALIASES.items():
+            self.trie.add(_fold(alias), code)
+        for code, cfg in rules.items():
+            self.trie.add(_fold(code), code)
+            if cfg.get("state_label"):
+                self.trie.add(_fold(cfg["state_label"]), code)
+
+        # Checklists only serve states without structured rules.
+        checklist_for: Dict[str, str] = {}
+        for label in checklists:
+            target = self.trie.lookup(_fold(label))
+            if target is None or target.startswith("label:"):
+                target = f"label:{label}"
+                self.trie.add(_fold(label), target)
+            checklist_for.setdefault(target, label)
+
+        for code, (de_label, _, _) in LAENDER.items():
+            if code not in rules:
+                label = checklist_for.get(code)
+                self.labels[code] = (code, label or de_label)
+                self._add(code, "en-DE", {
+                    "state_code": code,
+                    "state_label": label or de_label,
+                    "sections": _checklist_sections(checklists.get(label, [])),
+                    "emails": {},
+                })
+        for target, label in checklist_for.items():
+            if target.startswith("label:"):
+                self.labels[target] = (None, label)
+                self._add(target, "en-DE", {
+                    "state_code": None,
+                    "state_label": label,
+                    "sections": _checklist_sections(checklists[label]),
+                    "emails": {},
+                })
+        for code, cfg in rules.items():
+            label = cfg.get("state_label", code)
+            self.labels[code] = (code, label)
+            self._add(code, cfg.get("locale", "en-DE"), {
+                "state_code": cfg.get("state_code", code),
+                "state_label": label,
+                "sections": _build_sections(cfg),
+                "emails": cfg.get("emails", {}),
+            })
+
+    def _add(self, target: str, locale: str, payload: dict) -> None:
+        frozen = _freeze(payload)
+        self.payloads[(target, locale)] = frozen
+        self.default_locale[target] = locale
+        self.flat[(target, locale)] = tuple(
+            item.get("label", "") for section in frozen["sections"] for item in section["items"]
+        )
+
+    def resolve(self, state: str) -> Optional[str]:
+        return self.trie.lookup(_fold(state)) if state else None
+
+    def key(self, target: str, locale: str) -> Tuple[str, str]:
+        if (target, locale) in self.payloads:
+            return target, locale
+        return target, self.default_locale[target]
+
+
+_index_lock = threading.Lock()
+_index = RulesIndex(STATE_RULES, STATE_CHECKLISTS)
+
+
+def reload_rules() -> None:
+    """Recompile the index after STATE_RULES / STATE_CHECKLISTS were edited."""
+    global _index
+    with _index_lock:
+        _index = RulesIndex(STATE_RULES, STATE_CHECKLISTS)
+
 
 def _normalize_state_to_code(state: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Returns (state_code, state_label_guess).
     If the state is only in STATE_CHECKLISTS (no code), returns (None, label_from_input_or_match).
     """
-    if not state:
+    target = _index.resolve(state)
+    if target is None:
         return None, None
-    s = state.strip()
-    # 1) Exact alias to code if we know it
-    code = STATE_ALIASES.get(s)
-    if code:
-        return code, STATE_RULES.get(code, {}).get("state_label", s)
-    # 2) Try direct code match
-    if s in STATE_RULES:
-        return s, STATE_RULES[s].get("state_label", s)
-    # 3) Try label match inside STATE_RULES (case-insensitive)
-    for code_key, cfg in STATE_RULES.items():
-        if cfg.get("state_label", "").lower() == s.lower():
-            return code_key, cfg.get("state_label")
-    # 4) Fall back to checklist keys (exact or case-insensitive)
-    if s in STATE_CHECKLISTS:
-        return None, s
-    for label in STATE_CHECKLISTS.keys():
-        if label.lower() == s.lower():
-            return None, label
-    return None, None
+    return _index.labels[target]
 
 def get_state_ruleset(state: str) -> Optional[dict]:
     """
@@ -550,69 +739,37 @@ def get_ui_payload(state: str, locale: str = "en-DE") -> dict:
         ],
         "emails": {...}  # if available in structured ruleset
     }
+
+    Payloads are precompiled and read-only (sections/items are tuples);
+    copy before modifying. Unknown locales fall back to the ruleset's own.
     """
-    code, label_guess = _normalize_state_to_code(state)
-    rules = STATE_RULES.get(code) if code else None
-
-    if rules:
-        # Build sections in configured order
-        sections_cfg = rules.get("sections", [])
-        by_section: Dict[str, List[dict]] = {s["key"]: [] for s in sections_cfg}
-        for item in rules.get("checklist", []):
-            by_section.setdefault(item["section"], []).append({
-                "key": item.get("key"),
-                "label": item.get("label"),
-                "required": bool(item.get("required", False)),
-            })
-        # Preserve declared order of sections
-        sections_out = []
-        for s in sections_cfg:
-            items = by_section.get(s["key"], [])
-            sections_out.append({
-                "key": s["key"],
-                "title": s["title"],
-                "items": items,
-            })
-        return {
-            "state_code": rules.get("state_code"),
-            "state_label": rules.get("state_label", label_guess or state),
-            "sections": sections_out,
-            "emails": rules.get("emails", {}),
-        }
-
-    # Fallback to simple list
-    _, checklist_label = _normalize_state_to_code(state)
-    simple_items = STATE_CHECKLISTS.get(checklist_label or state, [])
-    return {
-        "state_code": code,  # likely None in fallback
-        "state_label": checklist_label or state,
-        "sections": [{
-            "key": "checklist",
-            "title": "Checklist",
-            "items": [
-                {"key": f"item_{i+1}", "label": label, "required": True}
-                for i, label in enumerate(simple_items)
-            ],
-        }],
-        "emails": {},
-    }
+    index = _index
+    target = index.resolve(state)
+    if target is None:
+        return _freeze({
+            "state_code": None,
+            "state_label": state,
+            "sections": _checklist_sections([]),
+            "emails": {},
+        })
+    return index.payloads[index.key(target, locale)]
 
-def get_flat_checklist(state: str) -> List[str]:
+def get_flat_checklist(state: str, locale: str = "en-DE") -> List[str]:
     """
     Convenience: return a flattened list of labels for quick displays or CSV exports.
     Prefers structured rules if present; else uses simple checklist.
     """
-    payload = get_ui_payload(state)
-    out: List[str] = []
-    for section in payload.get("sections", []):
-        for item in section.get("items", []):
-            out.append(item.get("label", ""))
-    return out
+    index = _index
+    target = index.resolve(state)
+    if target is None:
+        return []
+    return list(index.flat[index.key(target, locale)])
 
 # --------------------------
 # Example usage (keep as docs or remove in production):
 # --------------------------
 # >>> get_state_ruleset("Berlin")        # returns full dict for BE (structured)
 # >>> get_ui_payload("BE")               # UI-ready data with sections/items
-# >>> get_ui_payload("NRW")              # falls back to simple STATE_CHECKLISTS["NRW"]
+# >>> get_ui_payload("nordrhein westf")  # prefix of an alias -> NW
 # >>> get_flat_checklist("Bavaria")      # flat list of labels
+# >>> reload_rules()                     # after editing STATE_RULES at runtime
@@ -0,0 +1,373 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        utils.storage
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Document blob storage behind one interface.
+#
+# _files.filepath holds a storage URI: "s3://bucket/key" for S3, "mem://key"
+# for the in-memory backend (tests), anything else is a local filesystem
+# path (older rows hold plain paths). backend_for(uri) picks the backend
+# that owns a URI, get_storage() the one new uploads are written to:
+#
+#   DOCS_STORAGE=s3|local|memory   (default: s3 if DOCS_S3_BUCKET is set)
+#
+# Routes only talk to this module, so blobs can move between backends
+# (copy_blob + updating filepath) without route changes.
+
+#=== Imports
+
+import io
+import os
+import shutil
+import threading
+import time
+from urllib.parse import urlparse
+
+from backend.config import HerokuConfig
+from backend.utils import s3_docs
+
+#=== Configuration
+
+STREAM_CHUNK = 1024 * 1024
+# S3 DeleteObjects accepts at most 1000 keys per call.
+S3_DELETE_BATCH = 1000
+
+
+class StorageError(Exception):
+    pass
+
+
+#=== Backends
+
+class StorageBackend:
+    """Interface; URIs returned by put_* are stored in _files.filepath."""
+
+    def put_file(self, path: str, key: str, *, content_type: str | None = None, move: bool = False) -> str:
+        """Store a local file. move=True may consume the source file."""
+        with open(path, "rb") as f:
+            uri = self.put_stream(f, key, content_type=content_type)
+        if move:
+            os.remove(path)
+        return uri
+
+    def put_stream(self, fileobj, key: str, *, content_type: str | None = None) -> str:
+        raise NotImplementedError
+
+    def open(self, uri: str):
+        """Readable binary stream of the blob."""
+        raise NotImplementedError
+
+    def read_range(self, uri: str, start: int, end: int | None = None) -> bytes:
+        """Bytes start..end inclusive (HTTP Range semantics); end=None reads to the end."""
+        raise NotImplementedError
+
+    def exists(self, uri: str) -> bool:
+        raise NotImplementedError
+
+    def delete_many(self, uris: list[str]) -> list[str]:
+        """Delete blobs; returns the URIs that could not be deleted."""
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        """Yield (uri, size, modified epoch seconds) for every stored blob."""
+        raise NotImplementedError
+
+    def local_path(self, uri: str) -> str | None:
+        """Filesystem path for send_file, if the blob lives on local disk."""
+        return None
+
+    def url_for(self, uri: str, *, inline: bool = True) -> str | None:
+        """Direct download URL, if the backend can serve blobs itself."""
+        return None
+
+    def url_for_many(self, uris: list[str], *, inline: bool = True) -> dict[str, str]:
+        urls = {}
+        for uri in uris:
+            url = self.url_for(uri, inline=inline)
+            if url:
+                urls[uri] = url
+        return urls
+
+    def delete(self, uri: str) -> bool:
+        return not self.delete_many([uri])
+
+
+class LocalStorage(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(os.path.abspath(self.root) + os.sep):
+            raise StorageError(f"key escapes storage root: {key}")
+        return path
+
+    @staticmethod
+    def _from_uri(uri: str) -> str:
+        return uri[len("file://"):] if uri.startswith("file://") else uri
+
+    def put_file(self, path: str, key: str, *, content_type: str | None = None, move: bool = False) -> str:
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if move:
+            try:
+                # Spooled uploads live in the same folder: a rename, no copy.
+                os.replace(path, dest)
+                return dest
+            except OSError:
+                pass
+        shutil.copyfile(path, dest)
+        if move:
+            os.remove(path)
+        return dest
+
+    def put_stream(self, fileobj, key: str, *, content_type: str | None = None) -> str:
+        dest = self._path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        with open(dest, "wb") as out:
+            shutil.copyfileobj(fileobj, out, STREAM_CHUNK)
+        return dest
+
+    def open(self, uri: str):
+        return open(self._from_uri(uri), "rb")
+
+    def read_range(self, uri: str, start: int, end: int | None = None) -> bytes:
+        with open(self._from_uri(uri), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+    def exists(self, uri: str) -> bool:
+        return os.path.isfile(self._from_uri(uri))
+
+    def delete_many(self, uris: list[str]) -> list[str]:
+        failed = []
+        for uri in uris:
+            try:
+                os.remove(self._from_uri(uri))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                failed.append(uri)
+        return failed
+
+    def iter_blobs(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.abspath(path), st.st_size, st.st_mtime
+
+    def local_path(self, uri: str) -> str | None:
+        return self._from_uri(uri)
+
+
+class S3Storage(StorageBackend):
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+
+    def _key(self, uri: str) -> str:
+        parsed = urlparse(uri)
+        if parsed.netloc != self.bucket:
+            raise StorageError(f"{uri} is not in bucket {self.bucket}")
+        return parsed.path.lstrip("/")
+
+    def _uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def put_file(self, path: str, key: str, *, content_type: str | None = None, move: bool = False) -> str:
+        key = s3_docs.build_s3_key(key)
+        s3_docs.upload_file_to(self.bucket, key, path, content_type=content_type)
+        if move:
+            os.remove(path)
+        return self._uri(key)
+
+    def put_stream(self, fileobj, key: str, *, content_type: str | None = None) -> str:
+        key = s3_docs.build_s3_key(key)
+        s3_docs.upload_fileobj_to(self.bucket, key, fileobj, content_type=content_type)
+        return self._uri(key)
+
+    def open(self, uri: str):
+        # StreamingBody: read(n) / iter_chunks() pull from the socket on demand.
+        return s3_docs._client().get_object(Bucket=self.bucket, Key=self._key(uri))["Body"]
+
+    def read_range(self, uri: str, start: int, end: int | None = None) -> bytes:
+        byte_range = f"bytes={start}-" if end is None else f"bytes={start}-{end}"
+        resp = s3_docs._client().get_object(Bucket=self.bucket, Key=self._key(uri), Range=byte_range)
+        return resp["Body"].read()
+
+    def exists(self, uri: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            s3_docs._client().head_object(Bucket=self.bucket, Key=self._key(uri))
+            return True
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete_many(self, uris: list[str]) -> list[str]:
+        client = s3_docs._client()
+        failed = []
+        for i in range(0, len(uris), S3_DELETE_BATCH):
+            batch = uris[i:i + S3_DELETE_BATCH]
+            resp = client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._key(uri)} for uri in batch], "Quiet": True},
+            )
+            failed.extend(self._uri(err["Key"]) for err in resp.get("Errors", []))
+        s3_docs.forget_presigned(uris)
+        return failed
+
+    def iter_blobs(self):
+        paginator = s3_docs._client().get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=s3_docs.build_s3_key("")):
+            for obj in page.get("Contents", []):
+                yield self._uri(obj["Key"]), obj["Size"], obj["LastModified"].timestamp()
+
+    def url_for(self, uri: str, *, inline: bool = True) -> str | None:
+        return s3_docs.presign_url(uri, inline=inline)
+
+    def url_for_many(self, uris: list[str], *, inline: bool = True) -> dict[str, str]:
+        return s3_docs.presign_urls(uris, inline=inline)
+
+
+class MemoryStorage(StorageBackend):
+    """Process-local backend for tests and development."""
+
+    def __init__(self):
+        self._blobs: dict[str, tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+
+    def put_stream(self, fileobj, key: str, *, content_type: str | None = None) -> str:
+        data = fileobj.read()
+        uri = f"mem://{key}"
+        with self._lock:
+            self._blobs[uri] = (bytes(data), time.time())
+        return uri
+
+    def _get(self, uri: str) -> bytes:
+        with self._lock:
+            entry = self._blobs.get(uri)
+        if entry is None:
+            raise FileNotFoundError(uri)
+        return entry[0]
+
+    def open(self, uri: str):
+        return io.BytesIO(self._get(uri))
+
+    def read_range(self, uri: str, start: int, end: int | None = None) -> bytes:
+        data = self._get(uri)
+        return data[start:] if end is None else data[start:end + 1]
+
+    def exists(self, uri: str) -> bool:
+        with self._lock:
+            return uri in self._blobs
+
+    def delete_many(self, uris: list[str]) -> list[str]:
+        with self._lock:
+            for uri in uris:
+                self._blobs.pop(uri, None)
+        return []
+
+    def iter_blobs(self):
+        with self._lock:
+            items = list(self._blobs.items())
+        for uri, (data, modified) in items:
+            yield uri, len(data), modified
+
+
+#=== Selection
+
+_memory = MemoryStorage()
+_s3_backends: dict[str, S3Storage] = {}
+
+
+def local_root() -> str:
+    return HerokuConfig.UPLOAD_FOLDER
+
+
+def _storage_kind() -> str:
+    kind = os.getenv("DOCS_STORAGE")
+    if kind:
+        return kind.lower()
+    return "s3" if s3_docs._bucket() else "local"
+
+
+def s3_backend(bucket: str) -> S3Storage:
+    backend = _s3_backends.get(bucket)
+    if backend is None:
+        backend = _s3_backends.setdefault(bucket, S3Storage(bucket))
+    return backend
+
+
+def get_storage(root: str | None = None) -> StorageBackend:
+    """Backend for new uploads. root overrides the local upload folder."""
+    kind = _storage_kind()
+    if kind == "s3":
+        bucket = s3_docs._bucket()
+        if not bucket:
+            raise StorageError("DOCS_STORAGE=s3 needs DOCS_S3_BUCKET")
+        return s3_backend(bucket)
+    if kind == "memory":
+        return _memory
+    return LocalStorage(root or local_root())
+
+
+def backend_for(uri: str, root: str | None = None) -> StorageBackend:
+    """Backend that owns an existing URI."""
+    if s3_docs.is_s3_uri(uri):
+        return s3_backend(urlparse(uri).netloc)
+    if uri.startswith("mem://"):
+        return _memory
+    return LocalStorage(root or local_root())
+
+
+def _group_by_backend(uris, root: str | None = None) -> list[tuple[StorageBackend, list[str]]]:
+    groups: dict[tuple, tuple[StorageBackend, list[str]]] = {}
+    for uri in uris:
+        if not uri:
+            continue
+        backend = backend_for(uri, root)
+        # LocalStorage instances are built per call; group them by type.
+        group_key = (type(backend), getattr(backend, "bucket", None))
+        groups.setdefault(group_key, (backend, []))[1].append(uri)
+    return list(groups.values())
+
+
+def direct_urls(uris, *, inline: bool = True) -> dict[str, str]:
+    """Direct links for the URIs that have one (presigned for S3), in one pass per backend."""
+    urls = {}
+    for backend, group in _group_by_backend(uris):
+        urls.update(backend.url_for_many(group, inline=inline))
+    return urls
+
+
+def delete_uris(uris, root: str | None = None) -> list[str]:
+    """Delete blobs across backends, batched per backend. Returns failures."""
+    failed = []
+    for backend, group in _group_by_backend(uris, root):
+        try:
+            failed.extend(backend.delete_many(group))
+        except Exception:
+            failed.extend(group)
+    return failed
+
+
+def copy_blob(uri: str, dest: StorageBackend, key: str) -> str:
+    """Stream a blob into another backend; returns the new URI."""
+    source = backend_for(uri)
+    path = source.local_path(uri)
+    if path:
+        return dest.put_file(path, key)
+    body = source.open(uri)
+    try:
+        return dest.put_stream(body, key)
+    finally:
+        body.close()
@@ -0,0 +1,104 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        utils.ttl_cache
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Small in-process cache with a time-to-live and an LRU size bound.
+# Per worker process: entries are not shared between gunicorn workers, so
+# the TTL bounds how long another worker can serve stale data.
+#
+# A value loaded from the database can be older than an invalidation that
+# happened while it was being read. Readers take version(key) before the
+# read and pass it to set(..., version=...): invalidating a key (pop,
+# discard_where, clear) moves its version on, and the set is then skipped.
+
+#=== Imports
+
+import threading
+import time
+from collections import OrderedDict
+
+#=== Cache
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Invalidations per key since the last reset, and the number of resets.
+        self._versions: dict = {}
+        self._epoch = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def version(self, key):
+        """Token for set(..., version=...); changes whenever key is invalidated."""
+        with self._lock:
+            return self._epoch, self._versions.get(key, 0)
+
+    def set(self, key, value, ttl: float | None = None, version=None) -> None:
+        """
+        Store value; ttl overrides the cache-wide time-to-live for this entry.
+        With version (taken by version(key) before loading value), nothing is
+        stored if key was invalidated since.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        if self.maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions.get(key, 0)):
+                return
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def _invalidated(self, key) -> None:
+        # Called with the lock held.
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if len(self._versions) > max(self.maxsize, 1):
+            # A new epoch also moves every outstanding token on.
+            self._versions.clear()
+            self._epoch += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            self._invalidated(key)
+        return default if entry is _MISSING else entry[1]
+
+    def discard_where(self, predicate) -> int:
+        """Drop the entries whose key matches predicate(key); returns how many."""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+                self._invalidated(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._epoch += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -61,12 +61,7 @@ def load_user(user_id: str):
     Flask-Login calls this automatically.
     """
     try:
-        # if your primary key is int, cast here
-        user_tuple = User.get_by_id(user_id)
+        # user and role name in one (cached) query
+        return User.get_principal(user_id)
     except (ValueError, TypeError):
         return None
-
-    if user_tuple is None:
-        return None
-
-    return User.from_tuple(user_tuple)
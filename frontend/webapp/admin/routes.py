@@ -6,7 +6,9 @@
 #****************************************************************************
 
 #=== Imports
-from flask import flash, redirect, render_template, url_for, request
+import os
+
+from flask import flash, jsonify, redirect, render_template, url_for, request
 from flask_login import login_required
 from backend.datamodule.models.country import Country
 from backend.datamodule.models.profession import Profession
@@ -18,6 +20,11 @@ from frontend.webapp.admin import admin_bp
 from frontend.webapp.forms import DocumentTypeForm, RequirementForm, UserForm
 from frontend.webapp.utils import admin_required
 from backend.datamodule.models.user import User
+from backend.utils.s3_docs import upload_stats
+from backend.datamodule.sa import session_scope
+from backend.services.password_hashing import HashingOverloaded
+from backend.services.metrics import INSIGHTS_DAYS, insights
+from backend.services.validation_issues import GROUPINGS, recurring_issues
 
 # --- Admin dashboard
 # User Management
@@ -61,7 +68,14 @@ def user_new():
                       b_admin=form.role_name.data == 'admin')
         if new_user:
             print(f'Creating new user: {new_user.username}, role_id: {new_user.role_id}, is_admin: {new_user.b_admin}')
-            new_user.insert()
+            try:
+                new_user.insert()
+            except HashingOverloaded:
+                flash('Password hashing is busy right now. Please try again in a moment.', 'error')
+                return render_template("admin_usermanagement.html",
+                                       users=users,
+                                       form=form,
+                                       selected_user=None), 429, {"Retry-After": "5"}
             flash('User created successfully.', 'success')
         else:
             flash('Error creating user.', 'error')
@@ -101,7 +115,14 @@ def user_edit(user_id):
         user.username = form.username.data
         user.email = form.email.data
         if form.password.data:
-            user.password = form.password.data
+            try:
+                user.password = User.hash_password(form.password.data)
+            except HashingOverloaded:
+                flash('Password hashing is busy right now. Please try again in a moment.', 'error')
+                return render_template("admin_usermanagement.html",
+                                       users=all_users,
+                                       form=form,
+                                       selected_user=user), 429, {"Retry-After": "5"}
         # get role id from role name
         role_id = Role.get_role_id_by_name(form.role_name.data)
         user.role_id = role_id
@@ -570,3 +591,76 @@ def document_type_delete(doc_id: str):
 @admin_bp.get("/dashboard/admin/systemlogs")
 def system_logs():
     return render_template("admin_systemlogs.html")
+
+
+# Document storage upload metrics (this worker process only)
+@admin_bp.get("/dashboard/admin/storage/metrics")
+@login_required
+@admin_required
+def storage_metrics():
+    return jsonify({"pid": os.getpid(), "s3_uploads": upload_stats()})
+
+
+# Insights: time-to-decision, time-to-ready and predicted completion, from
+# the daily rollups (scripts/refresh_metrics.py)
+@admin_bp.get("/dashboard/admin/insights")
+@login_required
+@admin_required
+def insights_dashboard():
+    try:
+        days = min(max(int(request.args.get("days") or INSIGHTS_DAYS), 1), 366)
+    except ValueError:
+        days = INSIGHTS_DAYS
+    state_id = request.args.get("state_id") or None
+    profession_id = request.args.get("profession_id") or None
+    with session_scope() as session:
+        data = insights(session, days=days, state_id=state_id, profession_id=profession_id)
+        data["recurring_issues"] = recurring_issues(
+            session, state_id=state_id, profession_id=profession_id, limit=10
+        )
+
+    profession_map = {p.id: p.name for p in (Profession.from_tuple(r) for r in (Profession.get_all() or []))}
+    state_map = {s.id: s.name for s in (State.from_tuple(r) for r in (State.get_all() or []))}
+    for group in data["groups"]:
+        group["state_name"] = state_map.get(group["state_id"], group["state_id"])
+        group["profession_name"] = profession_map.get(group["profession_id"], group["profession_id"])
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(data)
+    return render_template(
+        "admin_insights.html",
+        insights=data,
+        days=days,
+        state_id=state_id,
+        profession_id=profession_id,
+        states=sorted(state_map.items(), key=lambda item: item[1]),
+        professions=sorted(profession_map.items(), key=lambda item: item[1]),
+    )
+
+
+# Recurring validation issues: documents per field and code, optionally per
+# document type or state (from _validation_issues)
+@admin_bp.get("/dashboard/admin/insights/issues")
+@login_required
+@admin_required
+def insights_issues():
+    by = request.args.get("by") or "field"
+    if by not in GROUPINGS:
+        return jsonify({"error": f"by must be one of {', '.join(GROUPINGS)}."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit") or 20), 1), 500)
+    except ValueError:
+        limit = 20
+    with session_scope() as session:
+        issues = recurring_issues(
+            session,
+            by=by,
+            state_id=request.args.get("state_id") or None,
+            profession_id=request.args.get("profession_id") or None,
+            document_type_id=request.args.get("document_type_id") or None,
+            limit=limit,
+        )
+    if by == "state":
+        state_map = {s.id: s.name for s in (State.from_tuple(r) for r in (State.get_all() or []))}
+        for issue in issues:
+            issue["group_name"] = state_map.get(issue["group_id"], issue["group_id"])
+    return jsonify({"by": by, "issues": issues})
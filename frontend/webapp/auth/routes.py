@@ -13,6 +13,12 @@ from backend.datamodule.models import user
 from backend.datamodule.models.basemodel import InsertError
 from frontend.webapp.auth import auth_bp
 from backend.datamodule.models.user import User
+from backend.services.password_hashing import HashingOverloaded
+
+
+def _overloaded(template: str):
+    flash('Too many sign-in requests right now. Please try again in a moment.', 'error')
+    return render_template(template), 429, {"Retry-After": "5"}
 
 # --- Login page
 @auth_bp.get("/login")
@@ -35,7 +41,11 @@ def login_submit():
     else:
         user = User.from_tuple(user_tuple)
         # check password
-        if not user.check_password(password):
+        try:
+            password_ok = user.check_password(password)
+        except HashingOverloaded:
+            return _overloaded("login.html")
+        if not password_ok:
             print('Password check failed.')
             flash('Invalid username or password.', 'error')
             redirect_url = url_for('auth.login')
@@ -85,6 +95,8 @@ def register_submit():
     new_user = User(username=username, password=password, email=email)
     try:
         new_user.insert()
+    except HashingOverloaded:
+        return _overloaded("register.html")
     except InsertError as error:
         print(f'User creation failed: {error}')
         flash('Registration failed. Please check your details.', 'error')
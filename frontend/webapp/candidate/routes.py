@@ -6,40 +6,47 @@
 #****************************************************************************
 
 #=== Imports
+from contextlib import ExitStack
 from uuid import uuid4
-from types import SimpleNamespace
-from flask import render_template, request, redirect, url_for, flash, current_app, send_file
+from flask import render_template, request, redirect, url_for, flash, current_app, jsonify, Response, stream_with_context
 from flask_login import login_required, current_user
 from backend.datamodule.models.document import Document
 from frontend.webapp.candidate import candidate_bp
-from frontend.webapp.utils import candidate_required
+from frontend.webapp.utils import candidate_required, send_stored_file
 from backend.datamodule.models.profession import Profession
 from backend.datamodule.models.country import Country
 from backend.datamodule.models.state import State 
 from backend.datamodule.models.application import Application
-from backend.datamodule.models.requirements import Requirements
-from backend.datamodule.models.document_data import DocumentData
-from backend.datamodule.models.file import File as FileModel
-from backend.datamodule.models.file_type import FileType
-from backend.datamodule.models.status import Status
-from backend.datamodule.models.document_type import DocumentType as DocumentTypeModel
 from backend.datamodule.orm import AppDoc, Document as DocumentORM, DocumentData as DocumentDataORM, DocumentType, File, Status as StatusORM, Requirement, UserProfile as UserProfileORM
 from backend.datamodule.sa import session_scope
-from backend.services.ocr import (
-    analyze_bytes_with_layoutlm_fields,
-    _extract_mrz_from_text,
-    _postprocess_passport_fields,
-    extract_diploma_fields,
+# The OCR stack (cv2, pytesseract, ...) is imported on first upload only,
+# through the facade the dossier pipeline uses.
+from backend.services import dossier, progress
+from backend.services.document_evaluation import (
+    apply_evaluation,
+    mandatory_fields_for_doc_type,
+    needs_profile,
+    normalize_date_field,
+    reevaluate_document,
 )
-from backend.utils.s3_docs import upload_bytes, presign_url, is_s3_uri
+from backend.services.ingest import spool_upload
+from backend.services.readiness import (
+    document_changed,
+    documents_of_data_changed,
+    links_for_documents,
+    refresh,
+    refresh_links,
+    stored_readiness,
+)
+from backend.utils.storage import delete_uris, get_storage
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from sqlalchemy import func
-from sqlalchemy.orm.attributes import flag_modified
 import difflib
+import json
+import math
 import re
 import os
-import requests
 
 
 #=== helpers
@@ -81,9 +88,7 @@ def get_documents_for_application(application_id) -> list[Document]:
                     DocumentType.name.label("document_type_name"),
                     File.filename,
                     File.filepath,
-                    DocumentDataORM.ocr_full_text,
                     DocumentDataORM.review_status,
-                    DocumentDataORM.id.label("document_data_id"),
                     DocumentDataORM.ocr_extracted_data,
                     DocumentDataORM.check_ready,
                     DocumentDataORM.validation_errors,
@@ -103,20 +108,6 @@ def get_documents_for_application(application_id) -> list[Document]:
                 print(f"Fetched {len(rows)} documents for application {application_id}")
                 documents = []
                 for row in rows:
-                    computed_ready = row.check_ready
-                    computed_errors = row.validation_errors
-                    if row.ocr_extracted_data is not None and (row.check_ready is None or row.validation_errors is None):
-                        updated_fields, computed_ready, computed_errors = _evaluate_document_fields(
-                            doc_type_name=row.document_type_name,
-                            fields=row.ocr_extracted_data,
-                        )
-                        if row.document_data_id:
-                            dd = session.query(DocumentDataORM).filter_by(id=row.document_data_id).first()
-                            if dd:
-                                dd.ocr_extracted_data = updated_fields
-                                dd.check_ready = computed_ready
-                                dd.validation_errors = computed_errors
-                                flag_modified(dd, "ocr_extracted_data")
                     documents.append(
                         {
                             "document_id": row.document_id,
@@ -124,10 +115,9 @@ def get_documents_for_application(application_id) -> list[Document]:
                             "document_type_name": row.document_type_name,
                             "filename": row.filename,
                             "filepath": row.filepath,
-                            "ocr_full_text": row.ocr_full_text,
                             "ocr_extracted_data": row.ocr_extracted_data or {},
-                            "check_ready": computed_ready,
-                            "validation_errors": computed_errors,
+                            "check_ready": row.check_ready,
+                            "validation_errors": row.validation_errors,
                             "review_status": row.review_status,
                             "status_id": row.status_id,
                             "status_name": row.status_name,
@@ -165,19 +155,6 @@ def get_requirements_for_application(application_id) -> list[dict]:
         return []
 
 
-def _requirement_allows_multiple(requirement_id: str) -> bool:
-    req_tuple = Requirements.get_by_id(requirement_id)
-    req = Requirements.from_tuple(req_tuple) if req_tuple else None
-    if not req or not req.name:
-        return False
-    if getattr(req, "allow_multiple", None) is not None:
-        return bool(req.allow_multiple)
-    name = req.name.lower()
-    if name in ("id", "cv", "proofofberlinresponsibility", "passport"):
-        return False
-    return True
-
-
 def get_document_details(document_id) -> Document:
     """Fetch detailed information for a specific document by its ID."""
     try:
@@ -189,7 +166,6 @@ def get_document_details(document_id) -> Document:
                     DocumentType.name.label("document_type_name"),
                     File.filename,
                     File.filepath,
-                    DocumentDataORM.id.label("document_data_id"),
                     DocumentDataORM.ocr_full_text,
                     DocumentDataORM.ocr_extracted_data,
                     DocumentDataORM.ocr_source,
@@ -199,8 +175,6 @@ def get_document_details(document_id) -> Document:
                     DocumentDataORM.review_comment,
                     DocumentDataORM.reviewed_by,
                     DocumentDataORM.reviewed_at,
-                    DocumentDataORM.check_ready,
-                    DocumentDataORM.validation_errors,
                     DocumentORM.last_modified,
                     DocumentORM.status_id,
                     StatusORM.name.label("status_name"),
@@ -213,21 +187,6 @@ def get_document_details(document_id) -> Document:
                 .first()
             )
             if row:
-                computed_ready = row.check_ready
-                computed_errors = row.validation_errors
-                updated_fields = row.ocr_extracted_data or {}
-                if row.ocr_extracted_data is not None:
-                    updated_fields, computed_ready, computed_errors = _evaluate_document_fields(
-                        doc_type_name=row.document_type_name,
-                        fields=row.ocr_extracted_data,
-                    )
-                    if row.document_data_id:
-                        dd = session.query(DocumentDataORM).filter_by(id=row.document_data_id).first()
-                        if dd:
-                            dd.ocr_extracted_data = updated_fields
-                            dd.check_ready = computed_ready
-                            dd.validation_errors = computed_errors
-                            flag_modified(dd, "ocr_extracted_data")
                 print(f"Fetched details for document {document_id}")
                 return {
                     "document_id": row.document_id,
@@ -236,16 +195,14 @@ def get_document_details(document_id) -> Document:
                     "filename": row.filename,
                     "filepath": row.filepath,
                     "ocr_full_text": row.ocr_full_text,
-                    "ocr_extracted_data": updated_fields,
+                    "ocr_extracted_data": row.ocr_extracted_data or {},
                     "ocr_source": row.ocr_source,
-                    "check_ready": computed_ready,
-                    "validation_errors": computed_errors,
+                    "check_ready": row.check_ready,
+                    "validation_errors": row.validation_errors,
                     "review_status": row.review_status,
                     "review_comment": row.review_comment,
                     "reviewed_by": row.reviewed_by,
                     "reviewed_at": row.reviewed_at,
-                    "check_ready": row.check_ready,
-                    "validation_errors": row.validation_errors,
                     "last_modified": row.last_modified,
                     "status_id": row.status_id,
                     "status_name": row.status_name,
@@ -277,132 +234,31 @@ def document_management():
         if not filename:
             flash("Invalid filename.", "danger")
             return redirect(url_for("candidate.document_management", application_id=application_id))
-
-        file_bytes = file.read()
-        if not file_bytes:
-            flash("Empty file upload.", "danger")
-            return redirect(url_for("candidate.document_management", application_id=application_id))
+        if not _owns_application(application_id):
+            flash("Application not found.", "danger")
+            return redirect(url_for("candidate.document_management"))
 
         upload_dir = current_app.config.get("UPLOAD_FOLDER", "backend/uploads")
         os.makedirs(upload_dir, exist_ok=True)
-        stored_name = f"{uuid4().hex}_{filename}"
-        stored_path = os.path.join(upload_dir, stored_name)
-        with open(stored_path, "wb") as f:
-            f.write(file_bytes)
-        s3_uri = upload_bytes(file_bytes, stored_name, user_id=current_user.id)
-        if s3_uri:
-            stored_path = s3_uri
-            try:
-                os.remove(os.path.join(upload_dir, stored_name))
-            except Exception:
-                pass
-
-        filetype_name = _infer_filetype(filename, file_bytes)
-        filetype_tuple = FileType.get_by_name(filetype_name)
-        filetype = FileType.from_tuple(filetype_tuple) if filetype_tuple else None
-
-        doc_hint = _doc_hint_from_requirement(requirement_id) or _doc_hint_from_filename(filename)
-        token_model_dir = _select_token_model_dir(doc_hint)
-        ocr_service_url = os.getenv("OCR_SERVICE_URL")
-        ocr_res = None
-        fields = {}
-        ocr_source = "local"
-        if ocr_service_url:
-            try:
-                remote = _call_ocr_service(ocr_service_url, file_bytes, filename, doc_hint)
-                fields = remote.get("fields", remote)
-                ocr_res = _coerce_remote_ocr(remote)
-                ocr_source = "remote"
-            except Exception:
-                current_app.logger.warning("OCR service failed; using local OCR.", exc_info=True)
-                ocr_res, fields = analyze_bytes_with_layoutlm_fields(file_bytes, token_model_dir=token_model_dir)
-        if ocr_res is None:
-            ocr_res, fields = analyze_bytes_with_layoutlm_fields(file_bytes, token_model_dir=token_model_dir)
-        if not fields and getattr(ocr_res, "fields", None):
-            fields = ocr_res.fields
-        fields, check_ready, validation_errors = _evaluate_document_fields(doc_type_name=_map_doc_type(ocr_res.doc_type, requirement_id), fields=fields)
-        ocr_text = getattr(ocr_res, "ocr_text", "") or ""
-        current_app.logger.warning(
-            "OCR result (%s) for %s: doc_type=%s text_len=%s fields=%s",
-            ocr_source,
-            filename,
-            getattr(ocr_res, "doc_type", "unknown"),
-            len(ocr_text),
-            len(fields or {}),
+        # Spool the request stream to disk (hashed and sniffed on the way);
+        # storage and OCR read that file instead of an in-memory copy.
+        item = dossier.DossierFile(
+            filename, spool_upload(file.stream, filename, directory=upload_dir), requirement_id, "form"
         )
-        if not ocr_text:
-            current_app.logger.warning("OCR text is empty for %s", filename)
-        if not fields:
-            current_app.logger.warning("OCR extracted fields are empty for %s", filename)
-            if ocr_text:
-                mrz_fields = _extract_mrz_from_text(ocr_text)
-                if mrz_fields:
-                    fields = _postprocess_passport_fields(mrz_fields)
-                    if fields.get("mrz_checksum_ok") is False:
-                        fields = _drop_mrz_fields(fields)
-                        fields.update(_extract_passport_text_fields(ocr_text))
-                    current_app.logger.info("OCR fallback extracted MRZ fields for %s", filename)
-                elif doc_hint in ("diploma", "degree"):
-                    diploma_fields = extract_diploma_fields(ocr_text)
-                    if diploma_fields:
-                        fields = diploma_fields
-                        current_app.logger.info("OCR fallback extracted diploma fields for %s", filename)
-                if not fields:
-                    fields = {"ocr_text": ocr_text}
-        doc_type_name = _map_doc_type(ocr_res.doc_type, requirement_id)
-        doc_type_tuple = DocumentTypeModel.get_by_name(doc_type_name) if doc_type_name else None
-        doc_type = DocumentTypeModel.from_tuple(doc_type_tuple) if doc_type_tuple else None
-
-        status_tuple = Status.get_by_name("new")
-        status = Status.from_tuple(status_tuple) if status_tuple else None
-
-        dd = DocumentData(
-            ocr_doc_type_prediction=ocr_res.doc_type,
-            ocr_predictions_str="\n".join(ocr_res.predictions) if isinstance(ocr_res.predictions, list) else ocr_res.predictions,
-            ocr_full_text=ocr_res.ocr_text,
-            ocr_extracted_data=fields,
-            ocr_source=ocr_source,
-            check_ready=check_ready,
-            validation_errors=validation_errors,
-            review_status="pending",
+        dossier.process(
+            current_user.id,
+            application_id,
+            [item],
+            storage=get_storage(upload_dir),
+            on_stage=progress.emitter(application_id, _upload_id()),
         )
-        dd_tuple = dd.insert()
 
-        file_model = FileModel(
-            filename=filename,
-            filepath=stored_path,
-            filetype_id=filetype.id if filetype else None,
-        )
-        file_tuple = file_model.insert()
-
-        doc = Document(
-            file_id=file_tuple[0],
-            document_type_id=doc_type.id if doc_type else None,
-            document_data_id=dd_tuple[0],
-            user_id=current_user.id,
-            status_id=status.id if status else None,
-        )
-        doc_tuple = doc.insert()
-
-        with session_scope() as session:
-            link = (
-                session.query(AppDoc)
-                .filter_by(application_id=application_id, requirements_id=requirement_id)
-                .first()
-            )
-            if link and not _requirement_allows_multiple(requirement_id):
-                link.document_id = doc_tuple[0]
-            else:
-                session.add(
-                    AppDoc(
-                        id=str(uuid4()),
-                        application_id=application_id,
-                        document_id=doc_tuple[0],
-                        requirements_id=requirement_id,
-                    )
-                )
-
-        flash("Document uploaded and processed.", "success")
+        if item.status == "stored":
+            flash("Document uploaded and processed.", "success")
+        elif item.status == "empty":
+            flash("Empty file upload.", "danger")
+        else:
+            flash(f"Upload failed: {item.error}", "danger")
         return redirect(url_for("candidate.document_management", application_id=application_id))
 
     # Get the application_id from the URL or session
@@ -416,6 +272,7 @@ def document_management():
     requirements = []
     documents = []
     review_alerts = []
+    readiness = None
     application_check_ready = False
     if application_id:
         # Get requirements associated with the selected application
@@ -426,7 +283,9 @@ def document_management():
         review_alerts = [
             d for d in documents if (d.get("review_status") or "pending") in ("approved", "declined")
         ]
-        application_check_ready = _application_check_ready(application_id, requirements, documents)
+        with session_scope() as session:
+            readiness = stored_readiness(session, [application_id]).get(application_id)
+        application_check_ready = bool(readiness and readiness.ready)
 
     return render_template(
         "candidate_documentmanagement.html",
@@ -436,9 +295,144 @@ def document_management():
         application_id=application_id,  # Pass the application_id to the template
         review_alerts=review_alerts,
         application_check_ready=application_check_ready,
+        readiness=readiness,
+    )
+
+
+@candidate_bp.post("/dashboard/candidate/documentmanagement/batch")
+@login_required
+@candidate_required
+def document_batch_upload():
+    """
+    Upload several files at once; each is assigned to a requirement of the
+    application (filename, then detected document type) and analysed in
+    parallel. ZIP archives are unpacked into the same batch. Answers with
+    the per-file report as JSON when asked for it.
+    """
+    application_id = request.form.get("application_id")
+    files = [f for f in request.files.getlist("documents") if f and f.filename]
+    wants_json = request.accept_mimetypes.best == "application/json"
+
+    def _fail(message: str, status: int = 400):
+        if wants_json:
+            return jsonify({"error": message}), status
+        flash(message, "danger")
+        return redirect(url_for("candidate.document_management", application_id=application_id))
+
+    if not application_id or not files:
+        return _fail("Missing application or files.")
+    max_files = current_app.config.get("MAX_FILES_PER_UPLOAD", 20)
+    if len(files) > max_files:
+        return _fail(f"At most {max_files} files per upload.")
+    if not _owns_application(application_id):
+        return _fail("Application not found.", 404)
+
+    upload_dir = current_app.config.get("UPLOAD_FOLDER", "backend/uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    items = []
+    upload_id = _upload_id()
+    # ZIP archives stay open until the batch is processed: their entries
+    # are extracted as the analysis reaches them.
+    with ExitStack() as archives:
+        for f in files:
+            filename = secure_filename(f.filename)
+            if not filename:
+                items.append(dossier.DossierFile(f.filename, None).fail("invalid", "Invalid filename."))
+                continue
+            upload = spool_upload(f.stream, filename, directory=upload_dir)
+            if not filename.lower().endswith(".zip"):
+                items.append(dossier.DossierFile(filename, upload))
+                continue
+            archives.callback(upload.discard)
+            try:
+                items.extend(archives.enter_context(dossier.zip_entries(upload.path, upload_dir)))
+            except dossier.ArchiveError as exc:
+                items.append(dossier.DossierFile(filename, None).fail("failed", str(exc)))
+        report = dossier.process(
+            current_user.id,
+            application_id,
+            items,
+            storage=get_storage(upload_dir),
+            on_stage=progress.emitter(application_id, upload_id),
+        )
+
+    if wants_json:
+        return jsonify(dict(report, upload_id=upload_id))
+    stored = report["counts"].get("stored", 0)
+    flash(f"{stored} of {len(items)} documents uploaded and processed.", "success" if stored else "warning")
+    for entry in report["files"]:
+        if entry["status"] != "stored":
+            flash(f"{entry['filename']}: {entry['error']}", "warning")
+    return redirect(url_for("candidate.document_management", application_id=application_id))
+
+
+def _owns_application(application_id: str) -> bool:
+    row = Application.get_by_id(application_id)
+    application = Application.from_tuple(row) if row else None
+    return bool(application) and str(application.user_id) == str(current_user.id)
+
+
+def _upload_id() -> str:
+    # Chosen by the page so it can subscribe to the progress events before posting.
+    upload_id = (request.form.get("upload_id") or "").strip()
+    return upload_id if re.fullmatch(r"[0-9a-fA-F-]{8,36}", upload_id) else str(uuid4())
+
+
+def _event_cursor() -> int:
+    raw = request.headers.get("Last-Event-ID") or request.args.get("after") or "0"
+    return int(raw) if raw.isdigit() else 0
+
+
+@candidate_bp.get("/dashboard/candidate/documentmanagement/events")
+@login_required
+@candidate_required
+def document_events():
+    """
+    Server-Sent Events: pipeline stages of the application's uploads
+    (optionally one upload_id). The stream ends after a minute; EventSource
+    reconnects with Last-Event-ID. Holds a worker thread while open, so the
+    page uses document_events_poll unless the app runs on an async worker.
+    """
+    application_id = request.args.get("application_id")
+    if not application_id or not _owns_application(application_id):
+        return jsonify({"error": "Application not found."}), 404
+    upload_id = request.args.get("upload_id") or None
+    after_id = _event_cursor()
+
+    def stream():
+        yield "retry: 2000\n\n"
+        for event in progress.listen(application_id, after_id, upload_id):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            event_id = f"id: {event['id']}\n" if event["id"] is not None else ""
+            yield f"{event_id}event: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@candidate_bp.get("/dashboard/candidate/documentmanagement/events/poll")
+@login_required
+@candidate_required
+def document_events_poll():
+    """Polling variant of document_events: new events, waiting up to `wait` seconds (default 0, capped) for some."""
+    application_id = request.args.get("application_id")
+    if not application_id or not _owns_application(application_id):
+        return jsonify({"error": "Application not found."}), 404
+    wait = request.args.get("wait", 0, type=float)
+    if not math.isfinite(wait):
+        wait = 0
+    wait = min(max(wait, 0), progress.MAX_WAIT_SECONDS)
+    after_id = _event_cursor()
+    events = progress.wait(application_id, after_id, request.args.get("upload_id") or None, seconds=wait)
+    last_id = max([after_id] + [e["id"] for e in events if e["id"] is not None])
+    return jsonify({"events": events, "last_id": last_id})
+
+
 @login_required
 @candidate_required
 @candidate_bp.route("/dashboard/candidate/documentmanagement/details/<document_id>")
@@ -471,18 +465,11 @@ def view_document(document_id):
         filepath = file_row.filepath if file_row else None
         filename = file_row.filename if file_row else "document"
 
-    if is_s3_uri(filepath):
-        url = presign_url(filepath)
-        if url:
-            return redirect(url)
+    response = send_stored_file(filepath, filename)
+    if response is None:
         flash("Document file not found.", "danger")
         return redirect(url_for("candidate.document_details", document_id=document_id))
-
-    if not filepath or not os.path.exists(filepath):
-        flash("Document file not found.", "danger")
-        return redirect(url_for("candidate.document_details", document_id=document_id))
-
-    return send_file(filepath, as_attachment=False, download_name=filename)
+    return response
 
 
 @login_required
@@ -522,19 +509,14 @@ def document_details_save(document_id):
             return redirect(url_for("candidate.document_details", document_id=document_id, application_id=application_id))
         existing = dict(dd.ocr_extracted_data or {})
         existing.update(payload)
-        updated_fields, check_ready, validation_errors = _evaluate_document_fields(
-            doc_type_name=doc.document_type.name if doc.document_type else None,
-            fields=existing,
-        )
-        dd.ocr_extracted_data = dict(updated_fields)
-        flag_modified(dd, "ocr_extracted_data")
-        dd.check_ready = check_ready
-        dd.validation_errors = validation_errors
+        dd.ocr_extracted_data = existing
+        reevaluate_document(session, doc, dd)
         if dd.review_status == "declined":
             dd.review_status = "pending"
             dd.review_comment = None
             dd.reviewed_by = None
             dd.reviewed_at = None
+        document_changed(session, document_id)
 
     flash("Fields updated.", "success")
     return redirect(url_for("candidate.document_details", document_id=document_id, application_id=application_id))
@@ -555,6 +537,7 @@ def delete_document(document_id):
             return redirect(url_for("candidate.document_management", application_id=application_id))
 
         app_docs = session.query(AppDoc).filter_by(document_id=document_id).all()
+        links = links_for_documents(session, [document_id])
         if not application_id and app_docs:
             application_id = app_docs[0].application_id
         for ad in app_docs:
@@ -562,14 +545,17 @@ def delete_document(document_id):
 
         file_id = doc.file_id
         data_id = doc.document_data_id
-        filepath = doc.file.filepath if doc.file else None
+        orphaned_blobs = []
         session.delete(doc)
+        # autoflush is off: flush so the reference checks below no longer see doc.
+        session.flush()
 
         if file_id:
             still_used = session.query(DocumentORM).filter_by(file_id=file_id).first()
             if not still_used:
                 file_row = session.query(File).filter_by(id=file_id).first()
                 if file_row:
+                    orphaned_blobs.append(file_row.filepath)
                     session.delete(file_row)
         if data_id:
             still_used = session.query(DocumentORM).filter_by(document_data_id=data_id).first()
@@ -577,28 +563,17 @@ def delete_document(document_id):
                 data_row = session.query(DocumentDataORM).filter_by(id=data_id).first()
                 if data_row:
                     session.delete(data_row)
+        refresh_links(session, links)
 
-    if filepath and not is_s3_uri(filepath) and os.path.exists(filepath):
-        try:
-            os.remove(filepath)
-        except Exception:
-            pass
+    # Only after the commit; blobs that fail here are left for scripts/gc_orphaned_blobs.py.
+    failed = delete_uris(orphaned_blobs)
+    if failed:
+        current_app.logger.warning("Could not delete stored blobs %s", failed)
 
     flash("Document deleted.", "success")
     return redirect(url_for("candidate.document_management", application_id=application_id))
 
 
-def _infer_filetype(filename: str, file_bytes: bytes) -> str:
-    if file_bytes[:4] == b"%PDF":
-        return "PDF"
-    ext = os.path.splitext(filename.lower())[1]
-    if ext in (".jpg", ".jpeg"):
-        return "JPEG"
-    if ext == ".png":
-        return "PNG"
-    return "PDF"
-
-
 def _pick_field_value(fields: dict, keys: list[str], default: str = "") -> str:
     for key in keys:
         if key in fields and fields[key] not in (None, ""):
@@ -648,7 +623,7 @@ def _sanitize_field_value(key: str, value: str, fields: dict) -> str:
                 return ""
     elif "date" in lower_key:
         cleaned = cleaned.replace("<", "")
-        normalized = _normalize_date_field(cleaned)
+        normalized = normalize_date_field(cleaned)
         if normalized:
             cleaned = normalized
         else:
@@ -678,53 +653,6 @@ def _sanitize_field_value(key: str, value: str, fields: dict) -> str:
     return cleaned
 
 
-def _extract_passport_text_fields(ocr_text: str) -> dict:
-    if not ocr_text:
-        return {}
-    out: dict = {}
-    m = re.search(r"\bname\s*[:\-]\s*([A-ZÄÖÜ][A-Za-zÄÖÜäöüß.\-\s]{2,80})", ocr_text, re.I)
-    if m:
-        full = " ".join(m.group(1).split())
-        parts = full.split()
-        if parts:
-            out["surname"] = parts[-1]
-            out["given_names"] = " ".join(parts[:-1]) if len(parts) > 1 else ""
-            out["full_name"] = full
-    m = re.search(r"\bnationality\s*[:\-]\s*([A-Z]{3})\b", ocr_text, re.I)
-    if m:
-        out["nationality"] = m.group(1).upper()
-    m = re.search(r"\b(passport|passnummer|passport no)\s*[:\-]?\s*([A-Z0-9]{6,9})\b", ocr_text, re.I)
-    if m:
-        out["passport_number"] = m.group(2).upper()
-    return out
-
-
-def _drop_mrz_fields(fields: dict) -> dict:
-    if not isinstance(fields, dict):
-        return {}
-    cleaned = dict(fields)
-    for key in (
-        "document_code",
-        "issuing_country",
-        "passport_number",
-        "passport_number_check",
-        "nationality",
-        "birth_date",
-        "birth_date_check",
-        "expiry_date",
-        "expiry_date_check",
-        "sex",
-        "personal_number",
-        "personal_number_check",
-        "final_check",
-        "surname",
-        "given_names",
-        "full_name",
-    ):
-        cleaned.pop(key, None)
-    return cleaned
-
-
 def _document_form_schema(doc_type_name: str | None) -> list[dict]:
     dtype = (doc_type_name or "").lower()
     if "passport" in dtype or "id" in dtype:
@@ -761,7 +689,7 @@ def _build_document_form_fields(document: dict | None, profile: dict | None = No
         return []
     fields = document.get("ocr_extracted_data") or {}
     schema = _document_form_schema(document.get("document_type_name"))
-    mandatory = set(_mandatory_fields_for_doc_type(document.get("document_type_name")))
+    mandatory = set(mandatory_fields_for_doc_type(document.get("document_type_name")))
     profile_last = (profile.get("last_name") or "").strip() if profile else ""
     error_list = (document.get("validation_errors") or {}).get("errors", []) if document else []
     if not schema:
@@ -799,192 +727,6 @@ def _build_document_form_fields(document: dict | None, profile: dict | None = No
     return out
 
 
-def _mandatory_fields_for_doc_type(doc_type_name: str | None) -> list[str]:
-    name = (doc_type_name or "").lower()
-    if "passport" in name or name == "id":
-        return [
-            "surname",
-            "given_names",
-            "nationality",
-            "passport_number",
-            "birth_date",
-            "sex",
-            "expiry_date",
-            "issuing_country",
-        ]
-    if "diploma" in name or "degree" in name or "certificate" in name:
-        return [
-            "holder_first_name",
-            "holder_last_name",
-            "institution_name",
-            "program_or_field",
-            "graduation_date",
-            "location",
-        ]
-    return []
-
-
-def _normalize_date_field(value: str) -> str | None:
-    cleaned = (value or "").strip()
-    if not cleaned:
-        return None
-    # Accept YYYY-MM-DD
-    if re.fullmatch(r"\d{4}-\d{2}-\d{2}", cleaned):
-        return cleaned
-    # Accept DD.MM.YYYY
-    m = re.fullmatch(r"(\d{2})\.(\d{2})\.(\d{4})", cleaned)
-    if m:
-        return f"{m.group(3)}-{m.group(2)}-{m.group(1)}"
-    # Accept YYYY/MM/DD or DD/MM/YYYY
-    m = re.fullmatch(r"(\d{2,4})/(\d{2})/(\d{2,4})", cleaned)
-    if m:
-        a, b, c = m.group(1), m.group(2), m.group(3)
-        if len(a) == 4:
-            return f"{a}-{b}-{c.zfill(2)}"
-        if len(c) == 4:
-            return f"{c}-{b}-{a.zfill(2)}"
-    return None
-
-
-def _split_full_name(value: str) -> tuple[str, str] | None:
-    cleaned = " ".join((value or "").replace(",", " ").split())
-    if not cleaned or " " not in cleaned:
-        return None
-    parts = cleaned.split()
-    if len(parts) < 2:
-        return None
-    return " ".join(parts[:-1]), parts[-1]
-
-
-def _is_valid_date(value: str) -> bool:
-    if not value or not re.fullmatch(r"\d{4}-\d{2}-\d{2}", value):
-        return False
-    try:
-        year, month, day = (int(part) for part in value.split("-"))
-        datetime(year, month, day)
-    except Exception:
-        return False
-    current_year = datetime.utcnow().year
-    if year < current_year - 250 or year > current_year + 250:
-        return False
-    return True
-
-
-def _is_future_date(value: str) -> bool:
-    if not _is_valid_date(value):
-        return False
-    try:
-        year, month, day = (int(part) for part in value.split("-"))
-        return datetime(year, month, day).date() > datetime.utcnow().date()
-    except Exception:
-        return False
-
-
-def _evaluate_document_fields(doc_type_name: str | None, fields: dict) -> tuple[dict, bool, dict]:
-    errors: list[str] = []
-    updated = dict(fields or {})
-    mandatory = _mandatory_fields_for_doc_type(doc_type_name)
-
-    # Normalize key fields for passport
-    if mandatory:
-        if not updated.get("birth_date") and updated.get("birth_date_raw"):
-            updated["birth_date"] = updated.get("birth_date_raw")
-        if not updated.get("expiry_date") and updated.get("expiry_date_raw"):
-            updated["expiry_date"] = updated.get("expiry_date_raw")
-
-        if "birth_date" in updated:
-            normalized = _normalize_date_field(str(updated.get("birth_date") or ""))
-            if normalized:
-                updated["birth_date"] = normalized
-        if "expiry_date" in updated:
-            normalized = _normalize_date_field(str(updated.get("expiry_date") or ""))
-            if normalized:
-                updated["expiry_date"] = normalized
-
-        if "nationality" in updated and updated.get("nationality"):
-            updated["nationality"] = str(updated["nationality"]).upper().strip()
-        if "issuing_country" in updated and updated.get("issuing_country"):
-            updated["issuing_country"] = str(updated["issuing_country"]).upper().strip()
-        if "passport_number" in updated and updated.get("passport_number"):
-            updated["passport_number"] = str(updated["passport_number"]).upper().strip()
-        if "sex" in updated and updated.get("sex"):
-            updated["sex"] = str(updated["sex"]).upper().strip()
-
-        # Validate mandatory fields
-        for key in mandatory:
-            if not updated.get(key):
-                errors.append(f"{key} is missing")
-
-        if updated.get("nationality") and not re.fullmatch(r"[A-Z]{3}", updated["nationality"]):
-            errors.append("nationality is invalid")
-        if updated.get("issuing_country") and not re.fullmatch(r"[A-Z]{3}", updated["issuing_country"]):
-            errors.append("issuing_country is invalid")
-        if updated.get("passport_number") and not re.fullmatch(r"[A-Z0-9]{6,9}", updated["passport_number"]):
-            errors.append("passport_number is invalid")
-        if updated.get("sex") and updated["sex"] not in {"M", "F", "X"}:
-            errors.append("sex is invalid")
-        if updated.get("birth_date") and not _is_valid_date(updated["birth_date"]):
-            errors.append("birth_date is invalid")
-        if updated.get("expiry_date"):
-            if not _is_valid_date(updated["expiry_date"]):
-                errors.append("expiry_date is invalid")
-            elif not _is_future_date(updated["expiry_date"]):
-                errors.append("expiry_date must be in the future")
-
-    if "diploma" in (doc_type_name or "").lower() or "degree" in (doc_type_name or "").lower():
-        if not updated.get("holder_first_name") or not updated.get("holder_last_name"):
-            full_value = updated.get("holder_name") or updated.get("full_name")
-            split = _split_full_name(str(full_value or ""))
-            if split:
-                first_name, last_name = split
-                updated.setdefault("holder_first_name", first_name)
-                updated.setdefault("holder_last_name", last_name)
-        if not updated.get("institution_name"):
-            updated["institution_name"] = (
-                updated.get("institution_guess")
-                or updated.get("institution_label")
-                or updated.get("institution")
-                or ""
-            )
-        if not updated.get("program_or_field"):
-            updated["program_or_field"] = updated.get("program_guess") or updated.get("field_of_study") or ""
-        if not updated.get("location"):
-            updated["location"] = updated.get("location_guess") or ""
-        if not updated.get("graduation_date"):
-            dates = updated.get("dates_detected") or updated.get("dates") or updated.get("issue_date_guess")
-            if isinstance(dates, list):
-                updated["graduation_date"] = dates[0] if dates else ""
-            else:
-                updated["graduation_date"] = dates or ""
-        if updated.get("graduation_date"):
-            normalized = _normalize_date_field(str(updated.get("graduation_date") or ""))
-            if normalized:
-                updated["graduation_date"] = normalized
-        profile = _get_user_profile(current_user.id)
-        profile_last = (profile.get("last_name") or "").strip() if profile else ""
-        holder_last = (updated.get("holder_last_name") or "").strip()
-        if profile_last and holder_last and holder_last.lower() != profile_last.lower():
-            if not updated.get("holder_birth_name"):
-                errors.append("holder_birth_name is required when last name differs from profile")
-        if updated.get("graduation_date") and not _is_valid_date(updated["graduation_date"]):
-            errors.append("graduation_date is invalid")
-    check_ready = (len(errors) == 0) if mandatory else True
-    return updated, check_ready, {"errors": errors}
-
-
-def _application_check_ready(application_id: str, requirements: list[dict], documents: list[dict]) -> bool:
-    if not application_id:
-        return False
-    required_ids = {r["id"] for r in requirements}
-    if not required_ids:
-        return False
-    ready_requirements = set()
-    for doc in documents:
-        if doc.get("requirements_id") in required_ids and doc.get("check_ready"):
-            ready_requirements.add(doc.get("requirements_id"))
-    return required_ids.issubset(ready_requirements)
-
-
 def _get_user_profile(user_id: str) -> dict | None:
     with session_scope() as session:
         row = session.query(UserProfileORM).filter_by(user_id=user_id).first()
@@ -1047,75 +789,6 @@ def _attach_profile_suggestion(field: dict, profile: dict | None) -> dict:
     return field
 
 
-def _map_doc_type(doc_type: str, requirement_id: str) -> str | None:
-    if doc_type:
-        if doc_type.lower().startswith("passport"):
-            return "passport"
-        if "degree" in doc_type.lower() or "diploma" in doc_type.lower():
-            return "diploma"
-    # fallback: use requirement name
-    req_tuple = Requirements.get_by_id(requirement_id)
-    req = Requirements.from_tuple(req_tuple) if req_tuple else None
-    if req and req.name and "id" in req.name.lower():
-        return "passport"
-    return None
-
-
-def _doc_hint_from_requirement(requirement_id: str) -> str | None:
-    req_tuple = Requirements.get_by_id(requirement_id)
-    req = Requirements.from_tuple(req_tuple) if req_tuple else None
-    if not req or not req.name:
-        return None
-    name = req.name.lower()
-    if "id" in name or "passport" in name:
-        return "passport"
-    if "qualification" in name or "diploma" in name or "certificate" in name or "transcript" in name:
-        return "diploma"
-    return None
-
-
-def _doc_hint_from_filename(filename: str) -> str | None:
-    name = (filename or "").lower()
-    if "passport" in name or name.startswith("pass"):
-        return "passport"
-    if "diploma" in name or "degree" in name or "certificate" in name or "transcript" in name:
-        return "diploma"
-    return None
-
-
-def _select_token_model_dir(doc_type_name: str | None) -> str | None:
-    if not doc_type_name:
-        return os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
-    if "passport" in doc_type_name.lower():
-        return os.getenv("CAESAR_PASSPORT_TOKEN_MODEL_DIR") or os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
-    if "diploma" in doc_type_name.lower():
-        return os.getenv("CAESAR_DIPLOMA_TOKEN_MODEL_DIR") or os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
-    return os.getenv("CAESAR_LAYOUTLM_TOKEN_MODEL_DIR")
-
-
-def _call_ocr_service(base_url: str, file_bytes: bytes, filename: str, doc_hint: str | None) -> dict:
-    url = base_url.rstrip("/") + "/analyze"
-    params = {}
-    if doc_hint:
-        params["doc_hint"] = doc_hint
-    files = {"file": (filename, file_bytes)}
-    timeout_s = int(os.getenv("OCR_SERVICE_TIMEOUT", "15"))
-    resp = requests.post(url, params=params, files=files, timeout=(5, timeout_s))
-    resp.raise_for_status()
-    data = resp.json()
-    if not isinstance(data, dict):
-        raise ValueError("OCR service response must be JSON object")
-    return data
-
-
-def _coerce_remote_ocr(remote: dict) -> SimpleNamespace:
-    doc_type = remote.get("doc_type") or remote.get("document_type") or "unknown"
-    ocr_text = remote.get("ocr_text") or remote.get("text") or remote.get("full_text") or ""
-    predictions = remote.get("predictions") or remote.get("labels") or []
-    return SimpleNamespace(doc_type=doc_type, ocr_text=ocr_text, predictions=predictions)
-
-
-
 #======= Application Management Routes  =======
 
 @login_required
@@ -1268,6 +941,7 @@ def applicationsmanagement_save():
                         document_id=None,
                         requirements_id=req_id,
                     ))
+                refresh(session, selected_id)
     except Exception as e:
         print(f"Error linking requirements to application {selected_id}: {e}")
 
@@ -1321,6 +995,21 @@ def candidate_profile():
                 for key, value in payload.items():
                     setattr(profile, key, value)
             profile.updated_at = func.now()
+            # Diploma checks compare against the profile last name.
+            rows = (
+                session.query(DocumentDataORM, DocumentType.name)
+                .join(DocumentORM, DocumentORM.document_data_id == DocumentDataORM.id)
+                .join(DocumentType, DocumentORM.document_type_id == DocumentType.id)
+                .filter(DocumentORM.user_id == current_user.id)
+                .all()
+            )
+            reevaluated = []
+            for dd, doc_type_name in rows:
+                if needs_profile(doc_type_name):
+                    apply_evaluation(dd, doc_type_name, {"first_name": profile.first_name, "last_name": profile.last_name})
+                    reevaluated.append(dd.id)
+            if reevaluated:
+                documents_of_data_changed(session, reevaluated)
         flash("Profile updated.", "success")
         return redirect(url_for("candidate.candidate_profile"))
 
@@ -6,10 +6,10 @@
 #****************************************************************************
 
 #=== Imports
-from flask import render_template, request, flash, redirect, url_for, send_file
+from flask import render_template, request, flash, redirect, url_for
 from flask_login import login_required, current_user
 from frontend.webapp.recruiter import recruiter_bp
-from frontend.webapp.utils import recruiter_required
+from frontend.webapp.utils import recruiter_required, send_stored_file
 from backend.datamodule.sa import session_scope
 from backend.datamodule.orm import (
     Application as ApplicationORM,
@@ -27,36 +27,107 @@ from backend.datamodule.orm import (
 from backend.datamodule.models.profession import Profession
 from backend.datamodule.models.country import Country
 from backend.datamodule.models.state import State
-from sqlalchemy import func
+from sqlalchemy import func, or_, text
 import os
 from frontend.webapp.candidate.routes import get_document_details, _build_document_form_fields
-from backend.utils.s3_docs import presign_url, is_s3_uri
+from backend.services.document_evaluation import reevaluate_document
+from backend.services.readiness import document_changed, ready_application_ids, stored_readiness
+from backend.services import review_queue
+from backend.utils.storage import direct_urls
+
+#=== Constants
+
+CANDIDATES_PER_PAGE = int(os.getenv("RECRUITER_CANDIDATES_PER_PAGE", "50"))
+REVIEW_QUEUE_PER_PAGE = int(os.getenv("RECRUITER_REVIEW_QUEUE_PER_PAGE", "50"))
+
+#=== Helpers
+
+_sqlite_user_fts_available = None
+
+
+def _sqlite_has_user_fts(session) -> bool:
+    global _sqlite_user_fts_available
+    if _sqlite_user_fts_available is None:
+        row = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '_users_fts'")
+        ).fetchone()
+        _sqlite_user_fts_available = bool(row)
+    return _sqlite_user_fts_available
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _candidate_search_filter(session, search: str):
+    """
+    Build the WHERE clause for the candidate search box.
+    Postgres: ILIKE backed by the pg_trgm GIN indexes on username/email.
+    SQLite: FTS5 trigram table (needs >= 3 chars), else plain LIKE.
+    """
+    if session.bind.dialect.name == "sqlite" and len(search) >= 3 and _sqlite_has_user_fts(session):
+        fts_query = '"' + search.replace('"', '""') + '"'
+        return text(
+            "_users.rowid IN (SELECT rowid FROM _users_fts WHERE _users_fts MATCH :fts_query)"
+        ).bindparams(fts_query=fts_query)
+    pattern = f"%{_escape_like(search)}%"
+    return or_(
+        UserORM.username.ilike(pattern, escape="\\"),
+        UserORM.email.ilike(pattern, escape="\\"),
+    )
+
 
 #=== Routes
 @login_required
 @recruiter_required
 @recruiter_bp.route("/dashboard/recruiter/candidate-management")
 def candidate_management():
-    search = (request.args.get("q") or "").strip().lower()
+    search = (request.args.get("q") or "").strip()
     selected_user_id = request.args.get("user_id")
     selected_app_id = request.args.get("app_id")
+    ready_only = request.args.get("ready") == "1"
+    try:
+        page = max(int(request.args.get("page") or 1), 1)
+    except ValueError:
+        page = 1
     with session_scope() as session:
-        rows = (
-            session.query(
-                UserORM.user_id,
-                UserORM.username,
-                UserORM.email,
-                func.count(ApplicationORM.id).label("application_count"),
-            )
+        candidates_query = (
+            session.query(UserORM.user_id, UserORM.username, UserORM.email)
             .join(RoleORM, UserORM.role_id == RoleORM.role_id)
-            .outerjoin(ApplicationORM, ApplicationORM.user_id == UserORM.user_id)
             .filter(RoleORM.role_name == "candidate")
-            .group_by(UserORM.user_id, UserORM.username, UserORM.email)
-            .order_by(UserORM.username.asc())
+        )
+        if search:
+            candidates_query = candidates_query.filter(_candidate_search_filter(session, search))
+        if ready_only:
+            # Candidates with at least one application whose stored readiness is ready.
+            candidates_query = candidates_query.filter(
+                UserORM.user_id.in_(
+                    session.query(ApplicationORM.user_id).filter(
+                        ApplicationORM.id.in_(ready_application_ids())
+                    )
+                )
+            )
+        total_candidates = candidates_query.order_by(None).count()
+        rows = (
+            candidates_query
+            .order_by(UserORM.username.asc(), UserORM.user_id.asc())
+            .offset((page - 1) * CANDIDATES_PER_PAGE)
+            .limit(CANDIDATES_PER_PAGE)
             .all()
         )
+        # Application counts only for the candidates on this page.
+        page_user_ids = [row.user_id for row in rows]
+        application_counts = {}
+        if page_user_ids:
+            application_counts = dict(
+                session.query(ApplicationORM.user_id, func.count(ApplicationORM.id))
+                .filter(ApplicationORM.user_id.in_(page_user_ids))
+                .group_by(ApplicationORM.user_id)
+                .all()
+            )
         selected_user = None
         applications = []
+        readiness = {}
         documents = []
         if selected_user_id:
             selected_user = (
@@ -76,14 +147,16 @@ def candidate_management():
                 .order_by(ApplicationORM.time_created.desc())
                 .all()
             )
+            readiness = stored_readiness(session, [app.id for app in applications])
             if selected_app_id:
+                # Narrow projection for the list; OCR text is only loaded on the details page.
                 documents = (
                     session.query(
                         AppDoc.document_id,
                         Requirement.name.label("requirement_name"),
                         DocumentType.name.label("document_type_name"),
                         File.filename,
-                        DocumentDataORM.ocr_full_text,
+                        File.filepath,
                         DocumentDataORM.check_ready,
                         DocumentDataORM.review_status,
                         StatusORM.name.label("status_name"),
@@ -110,21 +183,23 @@ def candidate_management():
                 "country_name": country_map.get(app.country_id, app.country_id),
                 "state_name": state_map.get(app.state_id, app.state_id),
                 "time_created": app.time_created,
+                "readiness": readiness.get(app.id),
             }
         )
 
     candidates = []
     for row in rows:
-        if search and search not in (row.username or "").lower() and search not in (row.email or "").lower():
-            continue
         candidates.append(
             {
                 "user_id": row.user_id,
                 "username": row.username,
                 "email": row.email,
-                "application_count": row.application_count,
+                "application_count": application_counts.get(row.user_id, 0),
             }
         )
+    total_pages = max((total_candidates + CANDIDATES_PER_PAGE - 1) // CANDIDATES_PER_PAGE, 1)
+    # Presign all S3 preview links in one pass; other documents go through view_document.
+    preview_urls = direct_urls(row.filepath for row in documents if row.document_id)
     documents_view = []
     for row in documents:
         if not row.document_id:
@@ -132,10 +207,16 @@ def candidate_management():
         documents_view.append(
             {
                 "document_id": row.document_id,
+                "preview_url": preview_urls.get(row.filepath)
+                or url_for(
+                    "recruiter.view_document",
+                    document_id=row.document_id,
+                    user_id=selected_user_id,
+                    app_id=selected_app_id,
+                ),
                 "requirement_name": row.requirement_name,
                 "document_type_name": row.document_type_name,
                 "filename": row.filename,
-                "ocr_full_text": row.ocr_full_text,
                 "check_ready": row.check_ready,
                 "status_name": row.status_name,
                 "review_status": row.review_status,
@@ -154,6 +235,10 @@ def candidate_management():
         "recruiter_candidatemanagement.html",
         candidates=candidates,
         query=search,
+        ready_only=ready_only,
+        page=page,
+        total_pages=total_pages,
+        total_candidates=total_candidates,
         selected_user=selected_user_view,
         selected_app_id=selected_app_id,
         applications=applications_view,
@@ -161,6 +246,101 @@ def candidate_management():
     )
 
 
+@recruiter_bp.get("/dashboard/recruiter/review-queue")
+@login_required
+@recruiter_required
+def review_queue_list():
+    mine = request.args.get("mine") == "1"
+    after = request.args.get("after")
+    with session_scope() as session:
+        items, next_cursor = review_queue.page(
+            session,
+            after=after,
+            limit=REVIEW_QUEUE_PER_PAGE,
+            claimed_by=current_user.id if mine else None,
+        )
+        tier_counts = review_queue.counts(session)
+        # Labels for this page only.
+        labels = {}
+        requirement_names = {}
+        if items:
+            labels = {
+                row.document_id: row
+                for row in session.query(
+                    DocumentORM.id.label("document_id"),
+                    UserORM.username,
+                    DocumentType.name.label("document_type_name"),
+                    File.filename,
+                )
+                .join(UserORM, DocumentORM.user_id == UserORM.user_id, isouter=True)
+                .join(DocumentType, DocumentORM.document_type_id == DocumentType.id, isouter=True)
+                .join(File, DocumentORM.file_id == File.id, isouter=True)
+                .filter(DocumentORM.id.in_([i.document_id for i in items]))
+            }
+            requirement_names = dict(
+                session.query(Requirement.id, Requirement.name)
+                .filter(Requirement.id.in_({i.requirement_id for i in items if i.requirement_id}))
+                .all()
+            )
+        readiness = stored_readiness(session, {i.application_id for i in items})
+        queue_view = []
+        for item in items:
+            label = labels.get(item.document_id)
+            app_readiness = readiness.get(item.application_id)
+            queue_view.append(
+                {
+                    "document_id": item.document_id,
+                    "application_id": item.application_id,
+                    "candidate_id": item.candidate_id,
+                    "username": label.username if label else None,
+                    "requirement_name": requirement_names.get(item.requirement_id),
+                    "document_type_name": label.document_type_name if label else None,
+                    "filename": label.filename if label else None,
+                    "priority": item.priority,
+                    "queued_at": item.queued_at,
+                    "claimed_by": item.claimed_by,
+                    "claimed_by_me": item.claimed_by == current_user.id,
+                    "missing": len(app_readiness.missing) if app_readiness else None,
+                }
+            )
+    return render_template(
+        "recruiter_reviewqueue.html",
+        items=queue_view,
+        next_cursor=next_cursor,
+        first_page=not after,
+        mine=mine,
+        tier_counts=tier_counts,
+        sla_hours=review_queue.REVIEW_SLA_HOURS,
+    )
+
+
+@recruiter_bp.post("/dashboard/recruiter/review-queue/claim")
+@login_required
+@recruiter_required
+def review_queue_claim():
+    document_id = request.form.get("document_id")
+    with session_scope() as session:
+        if document_id:
+            claimed = review_queue.claim(session, document_id, current_user.id)
+        else:
+            document_id = review_queue.claim_next(session, current_user.id)
+            claimed = document_id is not None
+    if not claimed:
+        flash("Nothing to claim." if not document_id else "Another recruiter is reviewing this document.", "info")
+        return redirect(url_for("recruiter.review_queue_list"))
+    return redirect(url_for("recruiter.document_details", document_id=document_id))
+
+
+@recruiter_bp.post("/dashboard/recruiter/review-queue/release/<document_id>")
+@login_required
+@recruiter_required
+def review_queue_release(document_id):
+    with session_scope() as session:
+        review_queue.release(session, document_id, current_user.id)
+    flash("Document released to the queue.", "success")
+    return redirect(url_for("recruiter.review_queue_list", mine=request.form.get("mine") or None))
+
+
 @login_required
 @recruiter_required
 @recruiter_bp.get("/dashboard/recruiter/document/view/<document_id>")
@@ -172,18 +352,11 @@ def view_document(document_id):
 
     filepath = doc.get("filepath")
     filename = doc.get("filename") or "document"
-    if is_s3_uri(filepath):
-        url = presign_url(filepath)
-        if url:
-            return redirect(url)
-        flash("Document file not found.", "danger")
-        return redirect(url_for("recruiter.candidate_management"))
-
-    if not filepath or not os.path.exists(filepath):
+    response = send_stored_file(filepath, filename)
+    if response is None:
         flash("Document file not found.", "danger")
         return redirect(url_for("recruiter.candidate_management"))
-
-    return send_file(filepath, as_attachment=False, download_name=filename)
+    return response
 
 
 @login_required
@@ -220,10 +393,12 @@ def document_review_save(document_id):
         if not dd:
             flash("Document data not found.", "danger")
             return redirect(url_for("recruiter.candidate_management"))
+        reevaluate_document(session, doc, dd)
         dd.review_status = status
         dd.review_comment = comment or None
         dd.reviewed_by = current_user.id
         dd.reviewed_at = func.now()
+        document_changed(session, document_id)
 
     flash("Review saved.", "success")
     return redirect(url_for("recruiter.document_details", document_id=document_id))
@@ -11,6 +11,7 @@ document.addEventListener("DOMContentLoaded", () => {
       if (spinner) {
         spinner.classList.remove("d-none");
       }
+      startUploadProgress(form);
     });
   });
 
@@ -38,3 +39,60 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   });
 });
+
+// Live pipeline stages of a running upload, polled once a second (each
+// poll is a short request, so a watching tab does not hold a server
+// thread). The form posts normally; the page shows the events until the
+// response replaces it.
+const STAGE_LABELS = {
+  queued: "queued",
+  ocr: "text recognised",
+  evaluated: "fields checked",
+  stored: "stored",
+  saved: "saved",
+};
+const PROGRESS_POLL_MS = 1000;
+
+function startUploadProgress(form) {
+  const url = form.getAttribute("data-progress-url");
+  const list = form.querySelector(".upload-progress");
+  const uploadIdInput = form.querySelector('input[name="upload_id"]');
+  if (!url || !list || !uploadIdInput || !window.fetch || !window.crypto || !crypto.randomUUID) return;
+  const uploadId = crypto.randomUUID();
+  uploadIdInput.value = uploadId;
+  const rows = {};
+  let after = 0;
+  let finished = false;
+  const show = (data) => {
+    if (!data.filename) {
+      if (data.stage === "done") finished = true;
+      return;
+    }
+    let row = rows[data.filename];
+    if (!row) {
+      row = document.createElement("li");
+      rows[data.filename] = row;
+      list.appendChild(row);
+    }
+    const label = STAGE_LABELS[data.stage] || data.stage;
+    const target = data.detail && data.detail.requirement ? ` → ${data.detail.requirement}` : "";
+    row.textContent = `${data.filename}: ${label}${target}`;
+  };
+  const poll = async () => {
+    try {
+      const response = await fetch(`${url}&upload_id=${encodeURIComponent(uploadId)}&after=${after}`, {
+        headers: { Accept: "application/json" },
+        credentials: "same-origin",
+      });
+      if (response.ok) {
+        const data = await response.json();
+        after = data.last_id;
+        data.events.forEach(show);
+      }
+    } catch (error) {
+      // Network hiccup: try again on the next tick.
+    }
+    if (!finished) setTimeout(poll, PROGRESS_POLL_MS);
+  };
+  setTimeout(poll, PROGRESS_POLL_MS);
+}
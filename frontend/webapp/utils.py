@@ -1,9 +1,12 @@
 
 
+import os
 from functools import wraps
-from flask import redirect, url_for
+from flask import redirect, send_file, url_for
 from flask_login import current_user
 
+from backend.utils.storage import backend_for
+
 def admin_required(f):
     """
     Decorator to restrict access to admin users.
@@ -45,4 +48,25 @@ def candidate_required(f):
             return redirect(url_for('auth.login'))  # Or 'auth.forbidden' if you want to show a 403 page
         return f(*args, **kwargs)
 
-    return decorated_function
\ No newline at end of file
+    return decorated_function
+
+
+def send_stored_file(filepath: str | None, filename: str):
+    """
+    Response serving a stored document (presigned redirect or file body),
+    or None if the blob is missing.
+    """
+    if not filepath:
+        return None
+    backend = backend_for(filepath)
+    url = backend.url_for(filepath)
+    if url:
+        return redirect(url)
+    path = backend.local_path(filepath)
+    if path is not None:
+        if not os.path.exists(path):
+            return None
+        return send_file(path, as_attachment=False, download_name=filename)
+    if not backend.exists(filepath):
+        return None
+    return send_file(backend.open(filepath), as_attachment=False, download_name=filename)
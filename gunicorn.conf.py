@@ -0,0 +1,118 @@
+#****************************************************************************
+#    Application:   Annerkennung Ai Cockpit
+#    Module:        gunicorn.conf
+#    Author:        Heiko Matamaru, IGS
+#    Version:       0.0.1
+#****************************************************************************
+
+# Production server configuration (Procfile: gunicorn -c gunicorn.conf.py wsgi:app).
+#
+# The app is imported once in the master (preload_app): the _ensure_*
+# migrations in sa.py, log handlers and, with OCR_PRELOAD=1, the OCR stack
+# run once and are shared copy-on-write with the forked workers. Everything
+# allocated so far is frozen before each fork, so collections in the workers
+# do not touch (and copy) those pages. (gunicorn imports the app before any
+# server hook runs, so a hook could not keep the GC off during the import.)
+# Each worker disposes the inherited DB pool without closing the parent's
+# connections.
+#
+# Worker count: WEB_CONCURRENCY (set by Heroku per dyno size) wins.
+# Otherwise min(2 * CPUs + 1, memory that fits), where a worker is budgeted
+# GUNICORN_WORKER_MEMORY_MB on top of GUNICORN_BASE_MEMORY_MB for the master.
+# scripts/worker_memory.py shows what workers really use.
+
+#=== Imports
+
+import gc
+import os
+
+#=== Sizing
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _memory_limit_mb() -> int | None:
+    # cgroup v2, cgroup v1, then physical memory.
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _worker_count() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    by_cpu = 2 * _cpu_count() + 1
+    limit_mb = _memory_limit_mb()
+    if not limit_mb:
+        return by_cpu
+    base_mb = int(os.getenv("GUNICORN_BASE_MEMORY_MB", "128"))
+    worker_mb = int(os.getenv("GUNICORN_WORKER_MEMORY_MB", "256"))
+    by_memory = max(1, (limit_mb - base_mb) // worker_mb)
+    return max(1, min(by_cpu, by_memory))
+
+
+#=== Server settings
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = os.getenv("GUNICORN_PRELOAD", "1").lower() in ("1", "true", "yes")
+workers = _worker_count()
+# gthread: a request holds one of `threads` threads until it returns, so the
+# upload progress page polls instead of keeping an SSE stream open. Set
+# GUNICORN_WORKER_CLASS=gevent (with gevent installed) to serve streams.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# OCR of a large scan can take a while; Heroku's router gives up after 30s anyway.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Recycle workers now and then so slow leaks (OCR buffers) cannot add up.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+# Heartbeat files on tmpfs: a slow disk must not make the master kill workers.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+
+
+#=== Hooks
+
+def when_ready(server):
+    from backend.services import ocr_facade
+
+    if preload_app and ocr_facade.preload_enabled():
+        ocr_facade.preload()
+        server.log.info("OCR stack preloaded in the master")
+    if preload_app:
+        # Connections opened by the startup migrations must not be inherited.
+        from backend.datamodule.sa import engine
+
+        engine.dispose()
+    server.log.info("Starting %s workers x %s threads", workers, threads)
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach so the
+    # workers' collections do not write to (and un-share) those pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from backend.datamodule.sa import engine
+
+        # Drop the pool inherited from the master without closing its sockets.
+        engine.dispose(close=False)
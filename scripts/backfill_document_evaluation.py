@@ -0,0 +1,86 @@
+"""Evaluate legacy document data rows that have no stored check result.
+
+Document evaluation runs at write time (upload, details save, review save).
+Rows written before that have check_ready / validation_errors unset; this
+command evaluates them in batches so page loads stay pure reads.
+
+    python scripts/backfill_document_evaluation.py [--batch-size 500] [--all] [--dry-run]
+
+--all re-evaluates every row, e.g. after the evaluation rules changed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Text, cast, or_  # noqa: E402
+
+from backend.datamodule.orm import Document as DocumentORM, DocumentData as DocumentDataORM, DocumentType  # noqa: E402
+from backend.datamodule.sa import session_scope  # noqa: E402
+from backend.services.document_evaluation import evaluator, load_profiles, needs_profile, store_evaluation  # noqa: E402
+from backend.services.readiness import documents_of_data_changed  # noqa: E402
+
+
+def _batch(session, after_id: str | None, batch_size: int, all_rows: bool) -> list:
+    query = (
+        session.query(DocumentDataORM, DocumentType.name, DocumentORM.user_id)
+        .join(DocumentORM, DocumentORM.document_data_id == DocumentDataORM.id)
+        .outerjoin(DocumentType, DocumentORM.document_type_id == DocumentType.id)
+        .filter(DocumentDataORM.ocr_extracted_data.isnot(None))
+    )
+    if not all_rows:
+        # JSON columns store a Python None as JSON 'null' rather than SQL NULL.
+        query = query.filter(
+            or_(
+                DocumentDataORM.check_ready.is_(None),
+                DocumentDataORM.validation_errors.is_(None),
+                cast(DocumentDataORM.validation_errors, Text) == "null",
+            )
+        )
+    if after_id is not None:
+        query = query.filter(DocumentDataORM.id > after_id)
+    return query.order_by(DocumentDataORM.id).limit(batch_size).all()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill stored document evaluation results.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--all", action="store_true", help="re-evaluate all rows, not only unevaluated ones")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate and report without writing")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    after_id = None
+    total = ready = 0
+    while True:
+        with session_scope() as session:
+            rows = _batch(session, after_id, args.batch_size, args.all)
+            if not rows:
+                break
+            profiles = load_profiles(session, [user_id for _, name, user_id in rows if needs_profile(name)])
+            # A document data row shared by several documents is evaluated once.
+            unique = list({dd.id: (dd, name, user_id) for dd, name, user_id in rows}.values())
+            results = evaluator.evaluate_batch(
+                ((name, dd.ocr_extracted_data, user_id) for dd, name, user_id in unique), profiles
+            )
+            for (dd, _, _), result in zip(unique, results):
+                if store_evaluation(dd, result):
+                    ready += 1
+            total += len(unique)
+            after_id = rows[-1][0].id
+            if args.dry_run:
+                session.rollback()
+            else:
+                documents_of_data_changed(session, [dd.id for dd, _, _ in unique])
+        print(f"Evaluated {total} rows ({ready} check ready) ...")
+
+    elapsed = time.perf_counter() - started
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"{action} {total} document data rows in {elapsed:.1f}s ({ready} check ready).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+"""Fill or rebuild the materialised readiness tables.
+
+Writers keep _requirement_readiness / _application_readiness up to date;
+this command evaluates applications that have no stored row yet (e.g.
+created before the tables existed) or, with --all, every application
+after the state rules or requirement catalogue changed.
+
+    python scripts/backfill_readiness.py [--batch-size 200] [--all] [--dry-run]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.datamodule.orm import Application as ApplicationORM, ApplicationReadiness  # noqa: E402
+from backend.datamodule.sa import session_scope  # noqa: E402
+from backend.services.readiness import refresh  # noqa: E402
+
+
+def _batch(session, after_id: str | None, batch_size: int, all_rows: bool) -> list[str]:
+    query = session.query(ApplicationORM.id)
+    if not all_rows:
+        query = query.outerjoin(
+            ApplicationReadiness, ApplicationReadiness.application_id == ApplicationORM.id
+        ).filter(ApplicationReadiness.application_id.is_(None))
+    if after_id is not None:
+        query = query.filter(ApplicationORM.id > after_id)
+    return [row.id for row in query.order_by(ApplicationORM.id).limit(batch_size)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill materialised application readiness.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--all", action="store_true", help="re-evaluate every application")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate and report without writing")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    after_id = None
+    total = ready = 0
+    while True:
+        with session_scope() as session:
+            ids = _batch(session, after_id, args.batch_size, args.all)
+            if not ids:
+                break
+            for application_id in ids:
+                result = refresh(session, application_id)
+                if result is not None and result.ready:
+                    ready += 1
+            total += len(ids)
+            after_id = ids[-1]
+            if args.dry_run:
+                session.rollback()
+        print(f"Evaluated {total} applications ({ready} ready) ...")
+
+    elapsed = time.perf_counter() - started
+    action = "Would store" if args.dry_run else "Stored"
+    print(f"{action} readiness of {total} applications in {elapsed:.1f}s ({ready} ready).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
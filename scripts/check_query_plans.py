@@ -0,0 +1,265 @@
+"""Fail when a hot query falls back to a sequential scan.
+
+Seeds a large synthetic dataset inside a transaction, runs ANALYZE, EXPLAINs
+the hot lookup queries and rolls everything back. Exits 1 when one of them
+scans a large table instead of using an index.
+
+Run against a scratch database (SQLITE_PATH / DATABASE_URL as for the app):
+
+    python scripts/check_query_plans.py --candidates 20000
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text  # noqa: E402
+
+from backend.datamodule import Base, engine  # noqa: E402
+import backend.datamodule.orm  # noqa: E402,F401  (registers the tables on Base)
+
+
+# Tables that grow with the number of candidates. Lookup tables (roles, statuses,
+# document types, ...) stay small and a scan over them is fine.
+LARGE_TABLES = {"_users", "_applications", "_app_docs", "_documents", "_files", "_document_datas", "_requirements"}
+
+REQUIREMENTS_PER_PROFESSION = 7
+DOCUMENTS_PER_APPLICATION = 5
+
+HOT_QUERIES = {
+    "documents_for_application": (
+        "SELECT ad.document_id, d.file_id, dt.name, f.filename, f.filepath, dd.review_status, "
+        "dd.check_ready, dd.validation_errors, st.name, ad.requirements_id "
+        "FROM _app_docs ad "
+        "JOIN _documents d ON ad.document_id = d.id "
+        "JOIN _document_types dt ON d.document_type_id = dt.id "
+        "JOIN _files f ON d.file_id = f.id "
+        "JOIN _document_datas dd ON d.document_data_id = dd.id "
+        "LEFT OUTER JOIN _statuses st ON d.status_id = st.id "
+        "WHERE ad.application_id = :application_id"
+    ),
+    "app_doc_for_requirement": (
+        "SELECT id FROM _app_docs WHERE application_id = :application_id AND requirements_id = :requirement_id"
+    ),
+    "app_docs_for_document": "SELECT id, application_id FROM _app_docs WHERE document_id = :document_id",
+    "documents_for_file": "SELECT id FROM _documents WHERE file_id = :file_id",
+    "documents_for_document_data": "SELECT id FROM _documents WHERE document_data_id = :document_data_id",
+    "documents_for_user": "SELECT id, document_type_id, last_modified FROM _documents WHERE user_id = :user_id",
+    "applications_for_user": (
+        "SELECT id, profession_id, state_id, time_created FROM _applications "
+        "WHERE user_id = :user_id ORDER BY time_created DESC"
+    ),
+    "requirements_for_application": (
+        "SELECT id, name FROM _requirements "
+        "WHERE country_id = :country_id AND state_id = :state_id AND profession_id = :profession_id"
+    ),
+    "reviewed_documents_for_user": (
+        "SELECT count(*) FROM _document_datas dd JOIN _documents d ON d.document_data_id = dd.id "
+        "WHERE d.user_id = :user_id AND dd.review_status IN ('approved', 'declined')"
+    ),
+    "candidates_page": (
+        "SELECT user_id, username, email FROM _users WHERE role_id = :role_id ORDER BY username LIMIT 50"
+    ),
+}
+
+
+def _uid() -> str:
+    return str(uuid.uuid4())
+
+
+def _insert(conn, table: str, rows: list[dict]) -> None:
+    if not rows:
+        return
+    cols = list(rows[0].keys())
+    sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)})"
+    conn.execute(text(sql), rows)
+
+
+def _seed(conn, candidates: int, professions: int) -> dict:
+    rnd = random.Random(42)
+    now = datetime(2025, 1, 1)
+
+    role_id = _uid()
+    _insert(conn, "_roles", [{"role_id": role_id, "role_name": "plan_check_candidate", "description": None}])
+    country_id = _uid()
+    _insert(conn, "_countries", [{"id": country_id, "name": "Plancheckland", "code": "PC", "description": None}])
+    state_ids = [_uid() for _ in range(16)]
+    _insert(
+        conn,
+        "_states",
+        [
+            {"id": sid, "country_id": country_id, "name": f"State {i}", "abbreviation": f"S{i}", "description": None}
+            for i, sid in enumerate(state_ids)
+        ],
+    )
+    profession_ids = [_uid() for _ in range(professions)]
+    _insert(conn, "_professions", [{"id": pid, "name": f"Profession {i}", "description": None} for i, pid in enumerate(profession_ids)])
+
+    requirements: dict[tuple[str, str], list[str]] = {}
+    req_rows = []
+    for pid in profession_ids:
+        for sid in state_ids:
+            ids = [_uid() for _ in range(REQUIREMENTS_PER_PROFESSION)]
+            requirements[(pid, sid)] = ids
+            req_rows.extend(
+                {
+                    "id": rid,
+                    "profession_id": pid,
+                    "country_id": country_id,
+                    "state_id": sid,
+                    "name": f"req{n}",
+                    "description": None,
+                    "optional": False,
+                    "translation_required": False,
+                    "fullfilled": False,
+                    "allow_multiple": True,
+                }
+                for n, rid in enumerate(ids)
+            )
+    _insert(conn, "_requirements", req_rows)
+
+    doc_type_id = _uid()
+    _insert(conn, "_document_types", [{"id": doc_type_id, "name": "plan_check", "description": None}])
+    file_type_id = _uid()
+    _insert(conn, "_file_types", [{"id": file_type_id, "name": "plan_check", "description": None}])
+    status_id = _uid()
+    _insert(conn, "_statuses", [{"id": status_id, "name": "plan_check", "description": None}])
+
+    sample: dict = {}
+    for start in range(0, candidates, 1000):
+        users, apps, files, datas, docs, links = [], [], [], [], [], []
+        for n in range(start, min(start + 1000, candidates)):
+            user_id = _uid()
+            users.append(
+                {
+                    "user_id": user_id,
+                    "role_id": role_id,
+                    "username": f"plan_check_{n:07d}",
+                    "password": "x",
+                    "email": f"plan_check_{n:07d}@example.invalid",
+                    "b_admin": False,
+                    "salt": "x",
+                    "pepper": "x",
+                }
+            )
+            pid = rnd.choice(profession_ids)
+            sid = rnd.choice(state_ids)
+            app_id = _uid()
+            apps.append(
+                {
+                    "id": app_id,
+                    "user_id": user_id,
+                    "profession_id": pid,
+                    "country_id": country_id,
+                    "state_id": sid,
+                    "time_created": now - timedelta(minutes=n),
+                }
+            )
+            for req_id in requirements[(pid, sid)][:DOCUMENTS_PER_APPLICATION]:
+                file_id, data_id, doc_id = _uid(), _uid(), _uid()
+                files.append({"id": file_id, "filename": "f.pdf", "filepath": f"/tmp/{file_id}.pdf", "filetype_id": file_type_id})
+                datas.append({"id": data_id, "review_status": rnd.choice([None, "approved", "declined"]), "check_ready": False})
+                docs.append(
+                    {
+                        "id": doc_id,
+                        "file_id": file_id,
+                        "document_type_id": doc_type_id,
+                        "document_data_id": data_id,
+                        "user_id": user_id,
+                        "status_id": status_id,
+                    }
+                )
+                links.append({"id": _uid(), "application_id": app_id, "document_id": doc_id, "requirements_id": req_id})
+            if not sample:
+                sample = {
+                    "role_id": role_id,
+                    "user_id": user_id,
+                    "application_id": app_id,
+                    "requirement_id": links[-1]["requirements_id"],
+                    "document_id": docs[-1]["id"],
+                    "file_id": docs[-1]["file_id"],
+                    "document_data_id": docs[-1]["document_data_id"],
+                    "country_id": country_id,
+                    "state_id": sid,
+                    "profession_id": pid,
+                }
+        _insert(conn, "_users", users)
+        _insert(conn, "_applications", apps)
+        _insert(conn, "_files", files)
+        _insert(conn, "_document_datas", datas)
+        _insert(conn, "_documents", docs)
+        _insert(conn, "_app_docs", links)
+    return sample
+
+
+def _sqlite_scans(conn, sql: str, params: dict) -> list[str]:
+    rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+    # SQLite reports joined tables by their alias.
+    aliases = {alias: table for table, alias in re.findall(r"(?:FROM|JOIN)\s+(_\w+)\s+(?!ON\b|WHERE\b)(\w+)", sql)}
+    scans = []
+    for row in rows:
+        detail = str(row[-1])
+        # "SEARCH t USING INDEX ..." is an index lookup and "SCAN t USING INDEX ..." an
+        # ordered index walk (ORDER BY ... LIMIT); a bare "SCAN t" reads the whole table.
+        if not detail.startswith("SCAN ") or " INDEX " in detail:
+            continue
+        name = detail.split()[1]
+        if aliases.get(name, name) in LARGE_TABLES:
+            scans.append(detail)
+    return scans
+
+
+def _postgres_scans(conn, sql: str, params: dict) -> list[str]:
+    raw = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar()
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    scans = []
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        stack.extend(node.get("Plans", []))
+    return scans
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=20000, help="number of seeded candidates (default 20000)")
+    parser.add_argument("--professions", type=int, default=50, help="number of seeded professions (default 50)")
+    args = parser.parse_args()
+
+    failures = 0
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            Base.metadata.create_all(bind=conn)
+            print(f"Seeding {args.candidates} candidates ...")
+            params = _seed(conn, args.candidates, args.professions)
+            conn.execute(text("ANALYZE"))
+
+            is_sqlite = conn.dialect.name == "sqlite"
+            for name, sql in HOT_QUERIES.items():
+                scans = _sqlite_scans(conn, sql, params) if is_sqlite else _postgres_scans(conn, sql, params)
+                if scans:
+                    failures += 1
+                    print(f"FAIL {name}: {'; '.join(scans)}")
+                else:
+                    print(f"ok   {name}")
+        finally:
+            trans.rollback()
+
+    if failures:
+        print(f"{failures} hot queries scan large tables. Check HOT_INDEXES in backend/datamodule/sa.py.")
+        return 1
+    print("All hot queries use indexes.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
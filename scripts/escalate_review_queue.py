@@ -0,0 +1,30 @@
+"""Move review queue items waiting past the SLA to the urgent tier.
+
+Documents only age into tier 0 (REVIEW_SLA_HOURS); every other priority
+change happens when readiness.refresh() syncs the queue. Meant to run on a
+schedule, e.g. every 10 minutes from the Heroku Scheduler, so neither the
+queue page nor claiming has to write:
+
+    python scripts/escalate_review_queue.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.datamodule.sa import session_scope  # noqa: E402
+from backend.services.review_queue import REVIEW_SLA_HOURS, escalate_overdue  # noqa: E402
+
+
+def main() -> int:
+    started = time.perf_counter()
+    with session_scope() as session:
+        escalated = escalate_overdue(session)
+    elapsed = time.perf_counter() - started
+    print(f"Escalated {escalated} documents waiting longer than {REVIEW_SLA_HOURS} hours in {elapsed:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,48 @@
+"""Sync the LayoutLM token models from S3 into the local model cache.
+
+Runs in the release phase (Procfile) when CAESAR_FETCH_MODELS_ON_RELEASE is set.
+
+Local layout per domain (passport, diploma):
+
+    $CAESAR_MODEL_CACHE_DIR/<domain>/<version>/   complete, verified model
+    $CAESAR_MODEL_CACHE_DIR/<domain>/current      symlink to the active version
+    $CAESAR_MODEL_CACHE_DIR/<old dir name>        symlink to <domain>/current, so
+                                                  CAESAR_*_TOKEN_MODEL_DIR keeps working
+
+<version> is CAESAR_<DOMAIN>_MODEL_VERSION (objects under <prefix><version>/)
+or, for unversioned prefixes, a digest of the remote keys and ETags.
+
+A version is downloaded into <domain>/.partial-<version>/ and only renamed
+into place once every file is verified; `current` is then swapped with an
+atomic rename, so a half-downloaded model is never active. A rerun resumes a
+partial download, and files unchanged since the active version (same ETag
+and size) are hard-linked instead of downloaded.
+
+Verification: if the prefix contains manifest.json,
+{"files": {"<relative path>": {"sha256": "...", "size": 123}}}, every file it
+lists must be present and match. Otherwise sizes and single-part ETags (MD5)
+are checked.
+
+    python scripts/fetch_models.py [--domain passport] [--workers 8] [--keep 2]
+"""
+import argparse
+import hashlib
+import json
 import os
-from pathlib import Path
+import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.services.model_registry import CURRENT, MANIFEST as SYNC_STATE, activate  # noqa: E402
 
 
 PASSPORT_PREFIX = os.getenv("CAESAR_S3_PASSPORT_PREFIX", "s3://anerkennung-models/models/passport/passport_layoutlmv3-token/")
@@ -10,6 +50,18 @@ DIPLOMA_PREFIX = os.getenv("CAESAR_S3_DIPLOMA_PREFIX", "s3://anerkennung-models/
 
 LOCAL_BASE = Path(os.getenv("CAESAR_MODEL_CACHE_DIR", "/app/models"))
 
+# domain -> (S3 prefix, legacy local dir name)
+DOMAINS = {
+    "passport": (PASSPORT_PREFIX, "passport_layoutlmv3-token"),
+    "diploma": (DIPLOMA_PREFIX, "diploma_layoutlmv3-token"),
+}
+MANIFEST = "manifest.json"
+REQUIRED_FILES = ("labels.json",)
+
+
+class VerifyError(Exception):
+    pass
+
 
 def _parse_s3_uri(uri: str) -> tuple[str, str]:
     if not uri.startswith("s3://"):
@@ -20,10 +72,15 @@ def _parse_s3_uri(uri: str) -> tuple[str, str]:
     return bucket, prefix
 
 
-def _download_prefix(s3, uri: str, dest: Path) -> None:
-    bucket, prefix = _parse_s3_uri(uri)
-    dest.mkdir(parents=True, exist_ok=True)
+def _version_prefix(prefix: str, version: str | None) -> str:
+    prefix = prefix if not prefix or prefix.endswith("/") else prefix + "/"
+    return f"{prefix}{version}/" if version else prefix
 
+
+#=== Remote listing
+
+def _list_objects(s3, bucket: str, prefix: str) -> dict[str, dict]:
+    objects = {}
     paginator = s3.get_paginator("list_objects_v2")
     for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
         for obj in page.get("Contents", []):
@@ -31,34 +88,247 @@ def _download_prefix(s3, uri: str, dest: Path) -> None:
             if key.endswith("/"):
                 continue
             rel = key[len(prefix):].lstrip("/")
-            target = dest / rel
-            target.parent.mkdir(parents=True, exist_ok=True)
-            s3.download_file(bucket, key, str(target))
+            objects[rel] = {"key": key, "etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+    return objects
+
+
+def _content_version(objects: dict[str, dict]) -> str:
+    digest = hashlib.sha256()
+    for rel in sorted(objects):
+        digest.update(f"{rel}\0{objects[rel]['etag']}\0{objects[rel]['size']}\n".encode("utf-8"))
+    return "sha-" + digest.hexdigest()[:12]
+
+
+def _load_manifest(s3, bucket: str, objects: dict[str, dict]) -> dict[str, dict] | None:
+    if MANIFEST not in objects:
+        return None
+    body = s3.get_object(Bucket=bucket, Key=objects[MANIFEST]["key"])["Body"].read()
+    files = json.loads(body).get("files", {})
+    # Accept {"path": "<sha256>"} as shorthand.
+    return {rel: (entry if isinstance(entry, dict) else {"sha256": entry}) for rel, entry in files.items()}
+
+
+#=== Verification
+
+def _hash_file(path: Path) -> tuple[str, str]:
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def _verify(path: Path, obj: dict, expected: dict | None) -> str:
+    """Check size and checksum of a local file; returns its sha256."""
+    size = path.stat().st_size
+    if size != obj["size"]:
+        raise VerifyError(f"{path.name}: size {size}, expected {obj['size']}")
+    sha256, md5 = _hash_file(path)
+    if expected:
+        if expected.get("size") is not None and expected["size"] != size:
+            raise VerifyError(f"{path.name}: size {size}, manifest says {expected['size']}")
+        if expected.get("sha256") and expected["sha256"] != sha256:
+            raise VerifyError(f"{path.name}: sha256 mismatch")
+    elif "-" not in obj["etag"] and obj["etag"] != md5:
+        # Multipart ETags are not an MD5 of the content; only size is checked then.
+        raise VerifyError(f"{path.name}: ETag/MD5 mismatch")
+    return sha256
+
+
+#=== Local state
+
+def _read_state(version_dir: Path) -> dict:
+    try:
+        with (version_dir / SYNC_STATE).open() as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _swap_symlink(link: Path, target: str) -> None:
+    # os.replace over an existing symlink is atomic.
+    tmp = link.with_name(f".{link.name}.{os.getpid()}")
+    if tmp.is_symlink() or tmp.exists():
+        tmp.unlink()
+    tmp.symlink_to(target)
+    os.replace(tmp, link)
+
+
+def _activate(domain: str, version: str, legacy_name: str) -> None:
+    activate(domain, version, base=LOCAL_BASE)
+    legacy = LOCAL_BASE / legacy_name
+    if legacy.exists() and not legacy.is_symlink():
+        # Pre-versioning download: move it aside once and replace it with a link.
+        aside = LOCAL_BASE / f".{legacy_name}.old"
+        shutil.rmtree(aside, ignore_errors=True)
+        legacy.rename(aside)
+        shutil.rmtree(aside, ignore_errors=True)
+    _swap_symlink(legacy, f"{domain}/{CURRENT}")
+
+
+def _prune(domain: str, keep: int) -> None:
+    domain_dir = LOCAL_BASE / domain
+    active = os.readlink(domain_dir / CURRENT)
+    versions = [
+        p for p in domain_dir.iterdir()
+        if p.is_dir() and not p.is_symlink() and not p.name.startswith(".") and p.name != active
+    ]
+    versions.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in versions[max(keep - 1, 0):]:
+        print(f"  removing old version {domain}/{old.name}")
+        shutil.rmtree(old, ignore_errors=True)
+    # Partial downloads of versions that never became active.
+    for partial in domain_dir.glob(".partial-*"):
+        shutil.rmtree(partial, ignore_errors=True)
+
+
+#=== Sync
+
+def _sync_domain(s3, domain: str, version: str | None, workers: int, keep: int, require_manifest: bool) -> bool:
+    prefix_uri, legacy_name = DOMAINS[domain]
+    bucket, base_prefix = _parse_s3_uri(prefix_uri)
+    prefix = _version_prefix(base_prefix, version)
+    started = time.perf_counter()
+
+    objects = _list_objects(s3, bucket, prefix)
+    if not objects:
+        print(f"[{domain}] no objects under s3://{bucket}/{prefix}")
+        return False
+    missing = [name for name in REQUIRED_FILES if name not in objects]
+    if missing:
+        print(f"[{domain}] required files missing in s3://{bucket}/{prefix}: {missing}")
+        return False
+
+    version = version or _content_version(objects)
+    domain_dir = LOCAL_BASE / domain
+    final_dir = domain_dir / version
+    if final_dir.is_dir():
+        print(f"[{domain}] version {version} already present.")
+        _activate(domain, version, legacy_name)
+        _prune(domain, keep)
+        return True
+
+    manifest = _load_manifest(s3, bucket, objects)
+    if manifest is None and require_manifest:
+        print(f"[{domain}] {MANIFEST} missing and --require-manifest given.")
+        return False
+    if manifest:
+        absent = sorted(set(manifest) - set(objects))
+        if absent:
+            print(f"[{domain}] files listed in {MANIFEST} are missing remotely: {absent[:5]}")
+            return False
+
+    print(f"[{domain}] syncing s3://{bucket}/{prefix} -> {final_dir} ({len(objects)} files)")
+    partial = domain_dir / f".partial-{version}"
+    partial.mkdir(parents=True, exist_ok=True)
+    current_dir = domain_dir / CURRENT
+    previous = _read_state(current_dir) if current_dir.exists() else {}
+    transfer = TransferConfig(max_concurrency=4)
+    counts = {"downloaded": 0, "linked": 0, "resumed": 0}
+    downloaded_bytes = 0
+    lock = threading.Lock()
+
+    def fetch(rel: str, obj: dict) -> tuple[str, dict]:
+        nonlocal downloaded_bytes
+        expected = manifest.get(rel) if manifest else None
+        target = partial / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        entry = {"etag": obj["etag"], "size": obj["size"]}
+
+        if target.exists():
+            try:
+                entry["sha256"] = _verify(target, obj, expected)
+                with lock:
+                    counts["resumed"] += 1
+                return rel, entry
+            except VerifyError:
+                target.unlink()
+
+        prev = previous.get(rel)
+        if (
+            prev
+            and prev.get("etag") == obj["etag"]
+            and prev.get("size") == obj["size"]
+            and (not expected or not expected.get("sha256") or expected["sha256"] == prev.get("sha256"))
+        ):
+            try:
+                os.link(current_dir / rel, target)
+                entry["sha256"] = prev.get("sha256")
+                with lock:
+                    counts["linked"] += 1
+                return rel, entry
+            except OSError:
+                pass
+
+        part = target.with_name(target.name + ".part")
+        s3.download_file(bucket, obj["key"], str(part), Config=transfer)
+        entry["sha256"] = _verify(part, obj, expected)
+        os.replace(part, target)
+        with lock:
+            counts["downloaded"] += 1
+            downloaded_bytes += obj["size"]
+        return rel, entry
+
+    files, failures = {}, []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch, rel, obj): rel for rel, obj in objects.items()}
+        for future in as_completed(futures):
+            try:
+                rel, entry = future.result()
+                files[rel] = entry
+            except Exception as error:
+                failures.append(f"{futures[future]}: {error}")
+
+    if failures:
+        print(f"[{domain}] {len(failures)} files failed; rerun to resume:")
+        for failure in failures[:10]:
+            print(f"  {failure}")
+        return False
+
+    _write_json(partial / SYNC_STATE, {"version": version, "source": f"s3://{bucket}/{prefix}", "files": files})
+    os.rename(partial, final_dir)
+    _activate(domain, version, legacy_name)
+    _prune(domain, keep)
+    elapsed = time.perf_counter() - started
+    print(
+        f"[{domain}] version {version} active: {counts['downloaded']} downloaded "
+        f"({downloaded_bytes / 1e6:.1f} MB), {counts['linked']} unchanged, {counts['resumed']} resumed "
+        f"in {elapsed:.1f}s"
+    )
+    return True
 
 
 def main() -> int:
+    parser = argparse.ArgumentParser(description="Sync OCR models from S3.")
+    parser.add_argument("--domain", action="append", choices=sorted(DOMAINS), help="default: all domains")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CAESAR_MODEL_FETCH_WORKERS", "8")))
+    parser.add_argument("--keep", type=int, default=2, help="versions to keep per domain, including the active one")
+    parser.add_argument("--require-manifest", action="store_true", help=f"fail if the prefix has no {MANIFEST}")
+    args = parser.parse_args()
+
     if os.getenv("CAESAR_FETCH_MODELS_ON_RELEASE", "").lower() not in ("1", "true", "yes"):
         print("CAESAR_FETCH_MODELS_ON_RELEASE is not enabled. Skipping model downloads.")
         return 0
 
-    s3 = boto3.client("s3")
-
-    passport_dest = LOCAL_BASE / "passport_layoutlmv3-token"
-    diploma_dest = LOCAL_BASE / "diploma_layoutlmv3-token"
-
-    if not (passport_dest / "labels.json").exists():
-        print(f"Downloading passport model from {PASSPORT_PREFIX} to {passport_dest} ...")
-        _download_prefix(s3, PASSPORT_PREFIX, passport_dest)
-    else:
-        print("Passport model already present. Skipping download.")
-
-    if not (diploma_dest / "labels.json").exists():
-        print(f"Downloading diploma model from {DIPLOMA_PREFIX} to {diploma_dest} ...")
-        _download_prefix(s3, DIPLOMA_PREFIX, diploma_dest)
-    else:
-        print("Diploma model already present. Skipping download.")
+    config = Config(max_pool_connections=max(args.workers, 1) * 4, retries={"max_attempts": 5, "mode": "standard"})
+    s3 = boto3.session.Session().client("s3", config=config)
 
-    return 0
+    ok = True
+    for domain in args.domain or sorted(DOMAINS):
+        version = os.getenv(f"CAESAR_{domain.upper()}_MODEL_VERSION") or None
+        ok = _sync_domain(s3, domain, version, args.workers, args.keep, args.require_manifest) and ok
+    return 0 if ok else 1
 
 
 if __name__ == "__main__":
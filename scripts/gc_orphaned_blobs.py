@@ -0,0 +1,96 @@
+"""Delete stored document blobs that no _files row references any more.
+
+Scans the local upload folder and, if configured, the S3 document bucket
+(DOCS_S3_BUCKET / DOCS_S3_PREFIX). Blobs younger than --min-age-hours are
+kept: an upload stores its blob a moment before the _files row is committed,
+and spooled temp files belong to requests still in flight.
+
+    python scripts/gc_orphaned_blobs.py --dry-run
+    python scripts/gc_orphaned_blobs.py --min-age-hours 48
+    python scripts/gc_orphaned_blobs.py --backend s3
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select  # noqa: E402
+
+from backend.datamodule.orm import File  # noqa: E402
+from backend.datamodule.sa import engine  # noqa: E402
+from backend.utils import s3_docs  # noqa: E402
+from backend.utils.storage import LocalStorage, S3_DELETE_BATCH, s3_backend, local_root  # noqa: E402
+
+
+def _referenced_paths(root: str) -> set[str]:
+    local = LocalStorage(root)
+    refs = set()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=5000).execute(select(File.filepath))
+        for (filepath,) in result:
+            if not filepath:
+                continue
+            if s3_docs.is_s3_uri(filepath) or filepath.startswith("mem://"):
+                refs.add(filepath)
+            else:
+                refs.add(os.path.abspath(local.local_path(filepath)))
+    return refs
+
+
+def _backends(which: str, root: str):
+    if which in ("all", "local"):
+        yield "local", LocalStorage(root)
+    if which in ("all", "s3") and s3_docs._bucket():
+        yield "s3", s3_backend(s3_docs._bucket())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Garbage-collect orphaned document blobs.")
+    parser.add_argument("--backend", choices=("all", "local", "s3"), default="all")
+    parser.add_argument("--local-root", default=local_root(), help="upload folder to scan")
+    parser.add_argument("--min-age-hours", type=float, default=24.0, help="keep blobs younger than this")
+    parser.add_argument("--dry-run", action="store_true", help="list orphans without deleting")
+    args = parser.parse_args()
+
+    refs = _referenced_paths(args.local_root)
+    print(f"{len(refs)} file rows reference a blob.")
+    cutoff = time.time() - args.min_age_hours * 3600
+
+    for name, backend in _backends(args.backend, args.local_root):
+        scanned = orphaned = freed = failed = 0
+        pending: list[tuple[str, int]] = []
+
+        def flush():
+            nonlocal failed, freed
+            if not pending:
+                return
+            errors = set(backend.delete_many([uri for uri, _ in pending]))
+            failed += len(errors)
+            freed += sum(size for uri, size in pending if uri not in errors)
+            pending.clear()
+
+        for uri, size, modified in backend.iter_blobs():
+            scanned += 1
+            if uri in refs or modified > cutoff:
+                continue
+            orphaned += 1
+            if args.dry_run:
+                print(f"  orphan {uri} ({size} bytes)")
+                freed += size
+                continue
+            pending.append((uri, size))
+            if len(pending) >= S3_DELETE_BATCH:
+                flush()
+        if not args.dry_run:
+            flush()
+
+        verb = "would free" if args.dry_run else "freed"
+        print(f"[{name}] scanned {scanned}, orphaned {orphaned}, {verb} {freed / 1e6:.1f} MB, failed {failed}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""Ingest a candidate dossier delivered as a ZIP archive.
+
+Entries are unpacked one at a time, deduplicated by content hash, assigned
+to the application's requirements (filename, then OCR document type),
+analysed in parallel and linked in one transaction; see
+backend/services/dossier.py. Prints what was matched, what the application
+still misses and which entries were skipped or failed.
+
+    python scripts/ingest_dossier.py APPLICATION_ID dossier.zip [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.config import HerokuConfig  # noqa: E402
+from backend.datamodule.orm import Application as ApplicationORM  # noqa: E402
+from backend.datamodule.sa import session_scope  # noqa: E402
+from backend.services.dossier import ArchiveError, ingest_zip  # noqa: E402
+from backend.utils.storage import get_storage  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ingest a ZIP dossier into an application.")
+    parser.add_argument("application_id")
+    parser.add_argument("archive", type=Path)
+    parser.add_argument("--upload-dir", default=HerokuConfig.UPLOAD_FOLDER)
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args()
+
+    with session_scope() as session:
+        application = session.get(ApplicationORM, args.application_id)
+        user_id = application.user_id if application else None
+    if user_id is None:
+        print(f"Application {args.application_id} not found.", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.upload_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    def progress(item, done, total):
+        if not args.json:
+            print(f"[{done}/{total}] {item.filename}: {item.status}")
+
+    try:
+        report = ingest_zip(
+            user_id,
+            args.application_id,
+            args.archive,
+            storage=get_storage(args.upload_dir),
+            upload_dir=args.upload_dir,
+            on_progress=progress,
+        )
+    except ArchiveError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print()
+    for entry in report["files"]:
+        target = entry["requirement"] or "-"
+        note = f"  ({entry['error']})" if entry["error"] else ""
+        print(f"{entry['status']:<10} {entry['filename']:<40} {target}{note}")
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(report["counts"].items()))
+    print(f"\n{len(report['files'])} entries in {elapsed:.1f}s: {counts}.")
+    readiness = report["readiness"]
+    if readiness:
+        state = "ready" if readiness["ready"] else "not ready"
+        print(f"Application {state}: {readiness['satisfied']}/{readiness['required']} requirements met.")
+        if readiness["missing"]:
+            print("Still missing: " + ", ".join(readiness["missing"]))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
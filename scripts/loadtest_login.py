@@ -0,0 +1,93 @@
+"""Measure login throughput and latency against a running app.
+
+Sends concurrent POST /login requests for one account and reports
+successful logins per second, latency percentiles and how many requests
+were turned away with 429 by the password hashing pool.
+
+    python scripts/loadtest_login.py --url http://localhost:8000 \
+        --username nurse01 --password '...' --requests 500 --concurrency 32
+"""
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Login load test.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    login_url = args.url.rstrip("/") + "/login"
+    local = threading.local()
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+
+    def one_login(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        session.cookies.clear()
+        started = time.perf_counter()
+        try:
+            resp = session.post(
+                login_url,
+                data={"username": args.username, "password": args.password},
+                allow_redirects=False,
+                timeout=args.timeout,
+            )
+            # Success redirects to the dashboard; a failed check redirects back to /login.
+            if resp.status_code == 302 and "/login" not in resp.headers.get("Location", ""):
+                outcome = "ok"
+            elif resp.status_code == 302:
+                outcome = "rejected credentials"
+            else:
+                outcome = str(resp.status_code)
+        except requests.RequestException as error:
+            outcome = type(error).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[outcome] += 1
+            if outcome == "ok":
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one_login, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    ok = statuses.get("ok", 0)
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {wall:.2f}s wall")
+    for outcome, count in statuses.most_common():
+        print(f"  {outcome}: {count}")
+    print(f"logins/sec: {ok / wall:.1f}")
+    if latencies:
+        print(
+            f"latency ms: p50 {_percentile(latencies, 50) * 1000:.0f}  "
+            f"p95 {_percentile(latencies, 95) * 1000:.0f}  "
+            f"p99 {_percentile(latencies, 99) * 1000:.0f}  "
+            f"mean {statistics.mean(latencies) * 1000:.0f}"
+        )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,56 @@
+"""List installed OCR model versions and switch the active one.
+
+    python scripts/model_versions.py list
+    python scripts/model_versions.py activate passport v2
+    python scripts/model_versions.py rollback passport      # previous installed version
+
+Running workers pick up the switch within CAESAR_MODEL_REFRESH_SECONDS
+without a restart (see backend/services/model_registry.py).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.services.model_registry import DOMAINS, activate, list_versions  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage local OCR model versions.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    p_activate = sub.add_parser("activate")
+    p_activate.add_argument("domain", choices=DOMAINS)
+    p_activate.add_argument("version")
+    p_rollback = sub.add_parser("rollback")
+    p_rollback.add_argument("domain", choices=DOMAINS)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for domain in DOMAINS:
+            print(f"{domain}:")
+            for v in list_versions(domain):
+                marker = "*" if v["active"] else " "
+                print(f"  {marker} {v['version']}  {v['files']} files  {v['bytes'] / 1e6:.1f} MB  {v['installed_at']}  {v['source'] or ''}")
+        return 0
+
+    if args.command == "rollback":
+        versions = list_versions(args.domain)
+        inactive = [v["version"] for v in versions if not v["active"]]
+        if not inactive:
+            print(f"No other {args.domain} version installed.")
+            return 1
+        args.version = inactive[0]
+
+    try:
+        activate(args.domain, args.version)
+    except ValueError as error:
+        print(error)
+        return 1
+    print(f"{args.domain}: {args.version} is now active.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
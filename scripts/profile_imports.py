@@ -0,0 +1,103 @@
+"""Measure web worker boot: import time, RSS and which heavy modules load.
+
+Boots the app in a fresh interpreter with -X importtime (the same imports a
+gunicorn worker does) and reports the slowest imports, total boot time and
+peak RSS. With limits it fails, so it can guard CI or a release:
+
+    python scripts/profile_imports.py
+    python scripts/profile_imports.py --max-ms 1500 --max-rss-mb 250
+    python scripts/profile_imports.py --target "import backend.services.ocr" --top 30
+
+By default it also fails if the OCR stack (cv2, numpy, pytesseract, pandas,
+pdf2image, torch, transformers) or boto3 is imported at boot; those are meant
+to load lazily (backend/services/ocr_facade.py, backend/utils/s3_docs.py).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+DEFAULT_TARGET = "from frontend.webapp import create_app; app = create_app()"
+DEFAULT_FORBIDDEN = "cv2,numpy,pytesseract,pandas,pdf2image,torch,transformers,caesar_ocr,boto3"
+
+# Runs in the child: boot, then report wall time, RSS and loaded modules as JSON on the last line.
+_CHILD = """
+import json, resource, sys, time
+started = time.perf_counter()
+exec(compile({target!r}, "<target>", "exec"))
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("PROFILE_RESULT " + json.dumps({{"seconds": elapsed, "rss_kb": rss_kb, "modules": sorted(sys.modules)}}))
+"""
+
+
+def _parse_importtime(stderr: str) -> list[tuple[int, int, int, str]]:
+    """Rows of (self us, cumulative us, nesting depth, module)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|", 2)
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((int(fields[0]), int(fields[1]), depth, name.strip()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Profile web worker import time and memory.")
+    parser.add_argument("--target", default=DEFAULT_TARGET, help="Python code that boots the app")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports to list")
+    parser.add_argument("--max-ms", type=float, help="fail if boot takes longer")
+    parser.add_argument("--max-rss-mb", type=float, help="fail if peak RSS after boot is higher")
+    parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN, help="comma-separated modules that must not load at boot ('' to allow all)")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=str(ROOT) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(target=args.target)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    result_line = next((l for l in proc.stdout.splitlines() if l.startswith("PROFILE_RESULT ")), None)
+    if proc.returncode != 0 or result_line is None:
+        print(proc.stdout[-2000:])
+        print(proc.stderr[-4000:])
+        print("Boot failed.")
+        return 2
+    result = json.loads(result_line[len("PROFILE_RESULT "):])
+
+    rows = _parse_importtime(proc.stderr)
+    # Depth 0 and 1 show which app module drags in which dependency.
+    shallow = [r for r in rows if r[2] <= 1]
+    print("Slowest imports (cumulative, depth <= 1):")
+    for _, cumulative_us, depth, name in sorted(shallow, key=lambda r: r[1], reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+    boot_ms = result["seconds"] * 1000
+    rss_mb = result["rss_kb"] / 1024  # ru_maxrss is KiB on Linux
+    loaded = set(result["modules"])
+    print(f"\nboot {boot_ms:.0f} ms, peak RSS {rss_mb:.0f} MB, {len(loaded)} modules")
+
+    failed = False
+    forbidden = [m.strip() for m in args.forbid.split(",") if m.strip()]
+    present = [m for m in forbidden if m in loaded]
+    if present:
+        print(f"FAIL: loaded at boot but meant to be lazy: {', '.join(present)}")
+        failed = True
+    if args.max_ms is not None and boot_ms > args.max_ms:
+        print(f"FAIL: boot {boot_ms:.0f} ms > {args.max_ms:.0f} ms")
+        failed = True
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        print(f"FAIL: RSS {rss_mb:.0f} MB > {args.max_rss_mb:.0f} MB")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
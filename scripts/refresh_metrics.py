@@ -0,0 +1,35 @@
+"""Refresh the insights rollups in _metrics_daily.
+
+Recomputes the days from the stored watermark up to today (everything with
+--rebuild) and moves the watermark; see backend/services/metrics.py. Meant
+to run on a schedule, e.g. every 10 minutes from the Heroku Scheduler:
+
+    python scripts/refresh_metrics.py [--rebuild]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.datamodule.sa import session_scope  # noqa: E402
+from backend.services.metrics import refresh  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Refresh the daily insights rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every day instead of the days since the watermark")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with session_scope() as session:
+        first_day, rows = refresh(session, rebuild=args.rebuild)
+    elapsed = time.perf_counter() - started
+    scope = f"days since {first_day.isoformat()}" if first_day else "all days"
+    print(f"Refreshed {scope}: {rows} rollup rows in {elapsed:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,284 @@
+"""Re-run document evaluation over stored _document_datas rows.
+
+Use after changing the evaluation rules (mandatory fields, passport patterns,
+MRZ postprocessing) so stored check_ready / validation_errors match them.
+Rows are streamed in id order, evaluated in a process pool and written back
+with bulk UPDATEs, one transaction per batch. Only changed rows are written;
+their _validation_issues rows, and the readiness of the applications they
+are linked to, are refreshed in the same transaction.
+
+    python scripts/revalidate_documents.py --dry-run
+    python scripts/revalidate_documents.py --batch-size 2000 --workers 4
+    python scripts/revalidate_documents.py --resume          # continue after an interruption
+    python scripts/revalidate_documents.py --doc-type passport --postprocess
+
+--postprocess re-runs the passport MRZ postprocessing first. It re-derives
+fields from stored MRZ lines and can override manual corrections.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import delete, insert, select, update  # noqa: E402
+
+from backend.datamodule.orm import (  # noqa: E402
+    Document as DocumentORM,
+    DocumentData as DocumentDataORM,
+    DocumentType,
+    ValidationIssue,
+)
+from backend.datamodule.sa import engine, session_scope  # noqa: E402
+from backend.services.document_evaluation import evaluator, load_profiles, needs_profile  # noqa: E402
+from backend.services.readiness import documents_of_data_changed  # noqa: E402
+from backend.services.validation_issues import issue_rows  # noqa: E402
+
+
+DEFAULT_CHECKPOINT = ".revalidate_documents.checkpoint"
+
+
+#=== Reading
+
+def _select(doc_type: str | None, after_id: str | None):
+    stmt = (
+        select(
+            DocumentDataORM.id,
+            DocumentDataORM.ocr_extracted_data,
+            DocumentDataORM.check_ready,
+            DocumentDataORM.validation_errors,
+            DocumentType.name.label("doc_type_name"),
+            DocumentORM.user_id,
+        )
+        .join(DocumentORM, DocumentORM.document_data_id == DocumentDataORM.id)
+        .outerjoin(DocumentType, DocumentORM.document_type_id == DocumentType.id)
+        .where(DocumentDataORM.ocr_extracted_data.isnot(None))
+        .order_by(DocumentDataORM.id)
+    )
+    if doc_type:
+        stmt = stmt.where(DocumentType.name.ilike(f"%{doc_type}%"))
+    if after_id is not None:
+        stmt = stmt.where(DocumentDataORM.id > after_id)
+    return stmt
+
+
+def _iter_batches(doc_type: str | None, after_id: str | None, batch_size: int):
+    if engine.dialect.name == "sqlite":
+        # No server-side cursors, and an open read cursor would block the
+        # per-batch writes; page by id instead.
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(_select(doc_type, after_id).limit(batch_size)).all()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1].id
+    else:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                _select(doc_type, after_id)
+            )
+            for rows in result.partitions():
+                yield rows
+
+
+#=== Evaluation (runs in worker processes)
+
+def _evaluate_chunk(chunk: list[tuple], profiles: dict, postprocess: bool) -> list[tuple]:
+    """chunk items are (id, doc_type_name, fields, user_id); returns (id, result)."""
+    items = []
+    for _, doc_type_name, fields, user_id in chunk:
+        fields = dict(fields or {})
+        if postprocess and "passport" in (doc_type_name or "").lower():
+            # OCR stack is heavy; only import it when asked to.
+            from backend.services.ocr import _postprocess_passport_fields
+
+            fields = _postprocess_passport_fields(fields)
+        items.append((doc_type_name, fields, user_id))
+    results = evaluator.evaluate_batch(items, profiles)
+    return [(item[0], result) for item, result in zip(chunk, results)]
+
+
+def _chunks(items: list, count: int) -> list[list]:
+    size = max(1, -(-len(items) // max(1, count)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+#=== Diffing
+
+def _diff(row, result) -> dict | None:
+    updated, check_ready, errors = result
+    old_errors = (row.validation_errors or {}).get("errors", []) if isinstance(row.validation_errors, dict) else []
+    new_errors = errors.get("errors", [])
+    old_fields = row.ocr_extracted_data or {}
+    changed_fields = sorted(k for k in set(old_fields) | set(updated) if old_fields.get(k) != updated.get(k))
+    if row.check_ready == check_ready and old_errors == new_errors and not changed_fields:
+        return None
+    return {
+        "id": row.id,
+        "check_ready": (row.check_ready, check_ready),
+        "errors_added": [e for e in new_errors if e not in old_errors],
+        "errors_removed": [e for e in old_errors if e not in new_errors],
+        "fields_changed": changed_fields,
+    }
+
+
+def _print_diff(diff: dict) -> None:
+    old_ready, new_ready = diff["check_ready"]
+    parts = [f"{diff['id']}:"]
+    if old_ready != new_ready:
+        parts.append(f"check_ready {old_ready} -> {new_ready}")
+    if diff["errors_added"]:
+        parts.append(f"+errors {diff['errors_added']}")
+    if diff["errors_removed"]:
+        parts.append(f"-errors {diff['errors_removed']}")
+    if diff["fields_changed"]:
+        parts.append(f"fields {diff['fields_changed']}")
+    print("  " + " ".join(parts))
+
+
+#=== Writing
+
+def _replace_issues(session, changes: list[dict]) -> None:
+    """Rewrite the _validation_issues rows of the changed document data (see DocumentData.issues)."""
+    ids = [change["id"] for change in changes]
+    session.execute(delete(ValidationIssue).where(ValidationIssue.document_data_id.in_(ids)))
+    rows = [
+        {"document_data_id": change["id"], "field": issue.field, "code": issue.code, "message": issue.message}
+        for change in changes
+        for issue in issue_rows(change["validation_errors"])
+    ]
+    if rows:
+        session.execute(insert(ValidationIssue), rows)
+
+
+#=== Checkpoints
+
+def _load_checkpoint(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    with path.open() as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: Path, state: dict) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+#=== Main
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-validate stored documents against the current rules.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes, 0 evaluates inline")
+    parser.add_argument("--doc-type", help="only documents whose type name contains this text")
+    parser.add_argument("--postprocess", action="store_true", help="re-run passport MRZ postprocessing before evaluating")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing")
+    parser.add_argument("--diff-limit", type=int, default=50, help="changed rows to print in the report")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file for --resume")
+    parser.add_argument("--resume", action="store_true", help="continue after the last committed batch")
+    args = parser.parse_args()
+
+    checkpoint_path = Path(args.checkpoint)
+    state = {"last_id": None, "scanned": 0, "changed": 0, "became_ready": 0, "became_not_ready": 0}
+    if args.resume:
+        state.update(_load_checkpoint(checkpoint_path))
+        if state["last_id"]:
+            print(f"Resuming after {state['last_id']} ({state['scanned']} rows already scanned).")
+
+    pool = None
+    if args.workers > 0:
+        # Fork keeps the already-imported modules; workers never touch the database.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=context)
+
+    started = time.perf_counter()
+    scanned_run = 0
+    printed = 0
+    try:
+        for rows in _iter_batches(args.doc_type, state["last_id"], args.batch_size):
+            batch_started = time.perf_counter()
+            # A document data row shared by several documents is evaluated once.
+            unique = list({row.id: row for row in rows}.values())
+
+            with session_scope() as session:
+                profiles = load_profiles(session, [r.user_id for r in unique if needs_profile(r.doc_type_name)])
+                chunk_items = [(r.id, r.doc_type_name, r.ocr_extracted_data, r.user_id) for r in unique]
+                if pool:
+                    futures = [
+                        pool.submit(_evaluate_chunk, chunk, profiles, args.postprocess)
+                        for chunk in _chunks(chunk_items, args.workers)
+                    ]
+                    results = dict(pair for future in futures for pair in future.result())
+                else:
+                    results = dict(_evaluate_chunk(chunk_items, profiles, args.postprocess))
+
+                changes = []
+                for row in unique:
+                    result = results[row.id]
+                    diff = _diff(row, result)
+                    if not diff:
+                        continue
+                    old_ready, new_ready = diff["check_ready"]
+                    if new_ready and not old_ready:
+                        state["became_ready"] += 1
+                    elif old_ready and not new_ready:
+                        state["became_not_ready"] += 1
+                    if args.dry_run and printed < args.diff_limit:
+                        _print_diff(diff)
+                        printed += 1
+                    updated, check_ready, errors = result
+                    changes.append(
+                        {"id": row.id, "ocr_extracted_data": updated, "check_ready": check_ready, "validation_errors": errors}
+                    )
+
+                if changes and not args.dry_run:
+                    session.execute(update(DocumentDataORM), changes)
+                    _replace_issues(session, changes)
+                    documents_of_data_changed(session, [change["id"] for change in changes])
+                if args.dry_run:
+                    session.rollback()
+
+            state["last_id"] = rows[-1].id
+            state["scanned"] += len(unique)
+            state["changed"] += len(changes)
+            scanned_run += len(unique)
+            if not args.dry_run:
+                _save_checkpoint(checkpoint_path, state)
+
+            batch_rate = len(unique) / max(time.perf_counter() - batch_started, 1e-9)
+            total_rate = scanned_run / max(time.perf_counter() - started, 1e-9)
+            print(
+                f"scanned {state['scanned']} changed {state['changed']} "
+                f"(batch {batch_rate:.0f} docs/s, overall {total_rate:.0f} docs/s)"
+            )
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    verb = "would change" if args.dry_run else "changed"
+    print(
+        f"Done: scanned {state['scanned']}, {verb} {state['changed']} "
+        f"({state['became_ready']} became check ready, {state['became_not_ready']} no longer ready) "
+        f"in {elapsed:.1f}s ({scanned_run / max(elapsed, 1e-9):.0f} docs/s)."
+    )
+    if args.dry_run and state["changed"] > printed:
+        print(f"{state['changed'] - printed} more changes not shown (--diff-limit).")
+    if not args.dry_run and checkpoint_path.exists():
+        # Finished cleanly; the next run starts from the beginning.
+        checkpoint_path.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+"""Report the memory used by the gunicorn master and each worker.
+
+Reads /proc/<pid>/smaps_rollup (Linux). PSS splits shared pages between the
+processes mapping them, so the PSS total is what the dyno actually pays;
+"private" is what one more worker would add. With a preloaded app most of
+the imported code and data stays shared until a worker writes to it.
+
+    python scripts/worker_memory.py                 # finds the gunicorn master
+    python scripts/worker_memory.py --pid 1234
+    python scripts/worker_memory.py --limit-mb 1024 # how many workers would fit
+"""
+import argparse
+import os
+import sys
+
+
+def _read(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def _is_gunicorn(pid: int) -> bool:
+    try:
+        argv = _read(f"/proc/{pid}/cmdline").split("\0")
+    except OSError:
+        return False
+    # "gunicorn ..." or "python .../gunicorn ..."; not wrappers such as timeout.
+    return any(os.path.basename(arg).startswith("gunicorn") for arg in argv[:2])
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            stat = _read(f"/proc/{entry}/stat")
+        except OSError:
+            continue
+        # Field 4 (ppid) follows the parenthesised command name.
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def _find_master() -> int | None:
+    candidates = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit() and _is_gunicorn(int(entry)):
+            candidates.append(int(entry))
+    for pid in candidates:
+        stat = _read(f"/proc/{pid}/stat")
+        if int(stat.rsplit(")", 1)[1].split()[1]) not in candidates:
+            return pid
+    return None
+
+
+def memory_of(pid: int) -> dict[str, int]:
+    """RSS, PSS, shared and private memory of a process, in kB."""
+    fields = {}
+    for line in _read(f"/proc/{pid}/smaps_rollup").splitlines()[1:]:
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts and parts[0].isdigit():
+            fields[name] = int(parts[0])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "swap": fields.get("Swap", 0),
+    }
+
+
+def _mb(kb: int) -> str:
+    return f"{kb / 1024:8.1f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Per-worker memory report for gunicorn.")
+    parser.add_argument("--pid", type=int, help="gunicorn master pid (default: search /proc)")
+    parser.add_argument("--limit-mb", type=int, help="dyno memory limit, to estimate how many workers fit")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("smaps_rollup is not available (Linux 4.14+ required).", file=sys.stderr)
+        return 1
+    master = args.pid or _find_master()
+    if not master:
+        print("No gunicorn master found; pass --pid.", file=sys.stderr)
+        return 1
+
+    rows = [("master", master, memory_of(master))]
+    for pid in _children(master):
+        try:
+            rows.append(("worker", pid, memory_of(pid)))
+        except OSError:
+            continue  # exited meanwhile
+
+    print(f"{'role':8} {'pid':>7} {'rss MB':>8} {'pss MB':>8} {'shared':>8} {'private':>8} {'swap':>8}")
+    for role, pid, mem in rows:
+        print(
+            f"{role:8} {pid:>7} {_mb(mem['rss'])} {_mb(mem['pss'])} "
+            f"{_mb(mem['shared'])} {_mb(mem['private'])} {_mb(mem['swap'])}"
+        )
+    total_pss = sum(mem["pss"] for _, _, mem in rows)
+    total_rss = sum(mem["rss"] for _, _, mem in rows)
+    workers = [mem for role, _, mem in rows if role == "worker"]
+    print(f"\ntotal PSS {total_pss / 1024:.1f} MB (sum of RSS {total_rss / 1024:.1f} MB, shared pages counted once in PSS)")
+    if workers:
+        per_worker = sum(mem["private"] for mem in workers) / len(workers)
+        shared = sum(mem["shared"] for mem in workers) / len(workers)
+        print(f"{len(workers)} workers: {per_worker / 1024:.1f} MB private, {shared / 1024:.1f} MB shared on average")
+        if args.limit_mb and per_worker:
+            headroom = args.limit_mb * 1024 - total_pss
+            extra = int(headroom // per_worker)
+            print(f"limit {args.limit_mb} MB: {headroom / 1024:.1f} MB free, room for about {max(extra, 0)} more workers")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())